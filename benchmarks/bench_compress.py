@@ -0,0 +1,44 @@
+"""Benchmark de ImageCompressor : compression en série contre compression multi-processus.
+
+Usage : python -m benchmarks.bench_compress --images 200 --size 1600 1200 --workers 1 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from benchmarks.image_corpus import make_image_corpus
+from tools.tools import ImageCompressor
+
+
+def run_case(input_folder: str, workers: int, quality: int) -> dict:
+    output_folder = os.path.join(input_folder, "images_compressées")
+    shutil.rmtree(output_folder, ignore_errors=True)
+    stats = ImageCompressor(input_folder, output_folder, quality).compress_images_in_folder(workers=workers)
+    return {"workers": workers, **stats}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--size", type=int, nargs=2, default=[1600, 1200], metavar=("LARGEUR", "HAUTEUR"))
+    parser.add_argument("--quality", type=int, default=70)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args(argv)
+
+    corpus = tempfile.mkdtemp(prefix="bench_compress_")
+    try:
+        make_image_corpus(corpus, args.images, tuple(args.size))
+        cases = [run_case(corpus, workers, args.quality) for workers in args.workers]
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
+
+    print(f"{'processus':>10} {'images':>7} {'durée (s)':>10} {'fichiers/s':>11} {'octets gagnés':>14}")
+    for case in cases:
+        print(f"{case['workers']:>10} {case['compressed']:>7} {case['seconds']:>10.2f} "
+              f"{case['files_per_sec']:>11.1f} {case['bytes_saved']:>14}")
+    return cases
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark d'écriture de la table images : connexion par ligne, connexion persistante et écriture par lots.
+
+Usage : python -m benchmarks.bench_image_db --rows 100000 --legacy-rows 2000 --batch-size 1000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from tools.tools import ImageAnalyzer
+
+
+def make_image_infos(count: int, seed: int = 0):
+    """Informations d'images synthétiques, au format renvoyé par ImageAnalyzer.get_image_info."""
+    rng = random.Random(seed)
+    for index in range(count):
+        width, height = rng.choice([(640, 480), (1920, 1080), (4000, 3000), (6000, 4000)])
+        yield {
+            "filename": f"IMG_{index:07d}.jpg",
+            "path": f"/photos/{index % 100:02d}/IMG_{index:07d}.jpg",
+            "mtime": 1_700_000_000 + index,
+            "content_hash": f"{rng.getrandbits(256):064x}",
+            "format": rng.choice(["JPEG", "PNG", "WEBP"]),
+            "size (width, height)": (width, height),
+            "mode": "RGB",
+            "file_size": rng.randrange(50_000, 8_000_000),
+            "exif": {"Make": "Canon", "Model": f"EOS {rng.randrange(100, 999)}D", "ISOSpeedRatings": 100},
+        }
+
+
+def bench_legacy(analyzer: ImageAnalyzer, rows: int) -> float:
+    """Chemin historique : une connexion ouverte, commitée et fermée pour chaque ligne."""
+    start = time.perf_counter()
+    for image_info in make_image_infos(rows):
+        conn = sqlite3.connect(analyzer.db_path)
+        conn.execute(analyzer.INSERT_SQL, analyzer._image_row(image_info))
+        conn.commit()
+        conn.close()
+    return time.perf_counter() - start
+
+
+def bench_pooled(analyzer: ImageAnalyzer, rows: int) -> float:
+    """_insert_image_info : une transaction par ligne, sur la connexion persistante du thread."""
+    start = time.perf_counter()
+    for image_info in make_image_infos(rows):
+        analyzer._insert_image_info(image_info)
+    return time.perf_counter() - start
+
+
+def bench_batched(analyzer: ImageAnalyzer, rows: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    with analyzer.db.batch_writer(analyzer.INSERT_SQL, batch_size) as writer:
+        for image_info in make_image_infos(rows):
+            writer.write(analyzer._image_row(image_info))
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="lignes écrites par lots")
+    parser.add_argument("--legacy-rows", type=int, default=2_000,
+                        help="lignes écrites une à une (échantillon : le chemin historique est très lent)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_image_db_")
+    try:
+        legacy = ImageAnalyzer(workdir, os.path.join(workdir, "legacy.sqlite3"))
+        legacy_seconds = bench_legacy(legacy, args.legacy_rows)
+        pooled = ImageAnalyzer(workdir, os.path.join(workdir, "pooled.sqlite3"))
+        pooled_seconds = bench_pooled(pooled, args.legacy_rows)
+        batched = ImageAnalyzer(workdir, os.path.join(workdir, "batched.sqlite3"))
+        batched_seconds = bench_batched(batched, args.rows, args.batch_size)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "legacy_rows_per_sec": args.legacy_rows / legacy_seconds,
+        "pooled_rows_per_sec": args.legacy_rows / pooled_seconds,
+        "batched_rows_per_sec": args.rows / batched_seconds,
+    }
+    results["speedup"] = results["batched_rows_per_sec"] / results["legacy_rows_per_sec"]
+    print(f"une connexion par ligne : {args.legacy_rows} lignes en {legacy_seconds:.2f} s "
+          f"({results['legacy_rows_per_sec']:.0f} lignes/s)")
+    print(f"connexion persistante   : {args.legacy_rows} lignes en {pooled_seconds:.2f} s "
+          f"({results['pooled_rows_per_sec']:.0f} lignes/s)")
+    print(f"par lots de {args.batch_size}     : {args.rows} lignes en {batched_seconds:.2f} s "
+          f"({results['batched_rows_per_sec']:.0f} lignes/s)")
+    print(f"accélération : x{results['speedup']:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark de l'authentification : connexions/s selon le coût du hachage, à froid et via le cache de sessions.
+
+Usage : python -m benchmarks.bench_login --users 50 --logins 200 --workers 4
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from login.login import UserManager
+from login.passwords import PasswordHasher
+
+# (libellé, paramètres de PasswordHasher)
+COST_SETTINGS = [
+    ("scrypt N=2^12", {"algorithm": "scrypt", "n": 2 ** 12}),
+    ("scrypt N=2^14", {"algorithm": "scrypt", "n": 2 ** 14}),
+    ("scrypt N=2^15", {"algorithm": "scrypt", "n": 2 ** 15}),
+    ("pbkdf2 100k", {"algorithm": "pbkdf2_sha256", "iterations": 100_000}),
+    ("pbkdf2 600k", {"algorithm": "pbkdf2_sha256", "iterations": 600_000}),
+]
+
+
+def bench_setting(workdir: str, label: str, options: dict, users: int, logins: int, workers: int) -> dict:
+    hasher = PasswordHasher(workers=workers, **options)
+    manager = UserManager(os.path.join(workdir, f"{label.replace(' ', '_')}.sqlite3"), hasher=hasher)
+    try:
+        for index in range(users):
+            manager.create_user(f"user{index}", f"password{index}")
+        credentials = [(f"user{i % users}", f"password{i % users}") for i in range(logins)]
+
+        # À froid : chaque connexion recalcule le hash (un seul passage par utilisateur)
+        start = time.perf_counter()
+        results = manager.authenticate_many(credentials[:users])
+        cold_seconds = time.perf_counter() - start
+        assert all(results)
+
+        # À chaud : les identifiants viennent d'être vérifiés, le cache de sessions répond
+        start = time.perf_counter()
+        results = manager.authenticate_many(credentials)
+        warm_seconds = time.perf_counter() - start
+        assert all(results)
+    finally:
+        hasher.close()
+        manager.db.close()
+    return {
+        "setting": label,
+        "cold_logins_per_sec": users / cold_seconds,
+        "cached_logins_per_sec": logins / warm_seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50, help="utilisateurs créés (connexions à froid)")
+    parser.add_argument("--logins", type=int, default=2_000, help="connexions servies par le cache de sessions")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_login_")
+    try:
+        results = [bench_setting(workdir, label, options, args.users, args.logins, args.workers)
+                   for label, options in COST_SETTINGS]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'paramètres':<16} {'à froid (conn/s)':>18} {'en cache (conn/s)':>19}")
+    for result in results:
+        print(f"{result['setting']:<16} {result['cold_logins_per_sec']:>18.1f} {result['cached_logins_per_sec']:>19.0f}")
+    return {"workers": args.workers, "settings": results}
+
+
+if __name__ == "__main__":
+    main()
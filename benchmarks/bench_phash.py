@@ -0,0 +1,83 @@
+"""Benchmark de la recherche de quasi-doublons : comparaison exhaustive contre indexation multiple.
+
+Usage : python -m benchmarks.bench_phash --hashes 100000 --distance 6
+"""
+import argparse
+import time
+
+import numpy as np
+
+from tools.phash import MultiIndexHash, hamming_distances
+
+
+def make_hashes(count: int, duplicates: int, seed: int = 0) -> np.ndarray:
+    """Hashes 64 bits aléatoires, dont `duplicates` copies à 1-3 bits de distance d'un original."""
+    rng = np.random.default_rng(seed)
+    hashes = rng.integers(0, np.iinfo(np.int64).max, count, dtype=np.int64).astype(np.uint64)
+    hashes ^= rng.integers(0, 2, count).astype(np.uint64) << np.uint64(63)
+    for index in range(0, min(2 * duplicates, count - 1), 2):
+        flipped = hashes[index]
+        for bit in rng.choice(64, rng.integers(1, 4), replace=False):
+            flipped ^= np.uint64(1) << np.uint64(bit)
+        hashes[index + 1] = flipped
+    return hashes
+
+
+def brute_force_pairs(hashes: np.ndarray, max_distance: int, rows: int) -> tuple:
+    """Comparaison exhaustive ligne par ligne (vectorisée) sur les `rows` premières lignes."""
+    found = 0
+    start = time.perf_counter()
+    for i in range(rows):
+        distances = hamming_distances(int(hashes[i]), hashes[i + 1:])
+        found += int(np.count_nonzero(distances <= max_distance))
+    return found, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hashes", type=int, default=100_000)
+    parser.add_argument("--duplicates", type=int, default=1_000)
+    parser.add_argument("--distance", type=int, default=6)
+    parser.add_argument("--brute-rows", type=int, default=2_000,
+                        help="lignes comparées exhaustivement (le total est extrapolé)")
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args(argv)
+
+    hashes = make_hashes(args.hashes, args.duplicates)
+
+    start = time.perf_counter()
+    index = MultiIndexHash(hashes, args.distance)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pairs = sum(1 for _ in index.pairs())
+    mih_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in hashes[:args.queries].tolist():
+        index.search(query)
+    query_seconds = time.perf_counter() - start
+
+    rows = min(args.brute_rows, args.hashes)
+    _, brute_seconds = brute_force_pairs(hashes, args.distance, rows)
+    # Le coût d'une ligne décroît linéairement (on compare à i + 1:), d'où le facteur de correction
+    brute_total = brute_seconds * (args.hashes / rows) * (args.hashes / 2) / (args.hashes - rows / 2)
+
+    results = {
+        "hashes": args.hashes,
+        "pairs": pairs,
+        "build_seconds": build_seconds,
+        "mih_pairs_seconds": mih_seconds,
+        "mih_query_ms": query_seconds / args.queries * 1000,
+        "brute_force_pairs_seconds_estimated": brute_total,
+    }
+    print(f"{args.hashes} hashes, distance <= {args.distance} : {pairs} paire(s) trouvée(s)")
+    print(f"construction de l'index      : {build_seconds:.2f} s")
+    print(f"toutes les paires (index)    : {mih_seconds:.2f} s")
+    print(f"toutes les paires (exhaustif): {brute_total:.2f} s (extrapolé depuis {rows} lignes)")
+    print(f"requête unitaire (index)     : {results['mih_query_ms']:.3f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark du pipeline de rendus : décodage réduit (draft/reduce) contre décodage pleine résolution.
+
+Usage : python -m benchmarks.bench_transforms --images 50 --size 3000 2000 --format JPEG PNG
+
+Pour chaque format source, trois stratégies produisent les mêmes rendus (par défaut
+web:1600:WEBP:80 et mini:320:JPEG:75) :
+    - full_per_rendition : un décodage pleine résolution par rendu, puis redimensionnement ;
+    - full_single_decode : un seul décodage pleine résolution partagé par les rendus ;
+    - pipeline : ImageCompressor avec TransformPipeline (un décodage, réduit par draft/reduce).
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import time
+from PIL import Image
+
+from benchmarks.image_corpus import make_image_corpus
+from tools.tools import ImageCompressor
+from tools.transforms import fit_size, parse_rendition, FORMAT_MODES
+
+
+def _encode(img: Image.Image, rendition, source_size: tuple) -> int:
+    output_format = rendition.output_format("JPEG")
+    output = img.resize(fit_size(source_size, rendition.max_size), Image.Resampling.LANCZOS)
+    modes = FORMAT_MODES.get(output_format)
+    if modes and output.mode not in modes:
+        output = output.convert("RGB")
+    buffer = io.BytesIO()
+    output.save(buffer, **rendition.save_options(output_format))
+    return buffer.tell()
+
+
+def full_per_rendition(paths: list, renditions: list) -> dict:
+    decode = 0.0
+    for path in paths:
+        for rendition in renditions:
+            with Image.open(path) as img:
+                start = time.perf_counter()
+                img.load()
+                decode += time.perf_counter() - start
+                _encode(img, rendition, img.size)
+    return {"decode_seconds": decode}
+
+
+def full_single_decode(paths: list, renditions: list) -> dict:
+    decode = 0.0
+    for path in paths:
+        with Image.open(path) as img:
+            start = time.perf_counter()
+            img.load()
+            decode += time.perf_counter() - start
+            for rendition in renditions:
+                _encode(img, rendition, img.size)
+    return {"decode_seconds": decode}
+
+
+def pipeline(paths: list, renditions: list, output_folder: str) -> dict:
+    shutil.rmtree(output_folder, ignore_errors=True)
+    compressor = ImageCompressor(os.path.dirname(paths[0]), output_folder, renditions=renditions)
+    decode = 0.0
+
+    def progress(result: dict) -> None:
+        nonlocal decode
+        decode += result["decode_seconds"] or 0.0
+
+    stats = compressor.compress_images_in_folder(workers=1, progress=progress)
+    return {"decode_seconds": decode, "output_bytes": stats["output_bytes"], "errors": stats["error"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=30)
+    parser.add_argument("--size", type=int, nargs=2, default=[3000, 2000], metavar=("LARGEUR", "HAUTEUR"))
+    parser.add_argument("--format", nargs="+", default=["JPEG", "PNG"], help="formats des images sources")
+    parser.add_argument("--rendition", action="append", metavar="NOM:TAILLE[:FORMAT[:QUALITÉ]]")
+    args = parser.parse_args(argv)
+    renditions = [parse_rendition(spec) for spec in (args.rendition or ["web:1600:WEBP:80", "mini:320:JPEG:75"])]
+
+    cases = []
+    workdir = tempfile.mkdtemp(prefix="bench_transforms_")
+    try:
+        for image_format in args.format:
+            corpus = os.path.join(workdir, image_format.lower())
+            paths = make_image_corpus(corpus, args.images, tuple(args.size), image_format)
+            strategies = (("full_per_rendition", lambda: full_per_rendition(paths, renditions)),
+                          ("full_single_decode", lambda: full_single_decode(paths, renditions)),
+                          ("pipeline", lambda: pipeline(paths, renditions, os.path.join(workdir, "out"))))
+            for name, run in strategies:
+                start = time.perf_counter()
+                case = run()
+                seconds = time.perf_counter() - start
+                cases.append({"format": image_format, "strategy": name, "seconds": seconds,
+                              "files_per_sec": len(paths) / seconds, **case})
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Rendus : {', '.join(map(repr, renditions))}")
+    print(f"{'source':>7} {'stratégie':>20} {'durée (s)':>10} {'fichiers/s':>11} {'décodage (s)':>13}")
+    for case in cases:
+        print(f"{case['format']:>7} {case['strategy']:>20} {case['seconds']:>10.2f} "
+              f"{case['files_per_sec']:>11.1f} {case['decode_seconds']:>13.2f}")
+    return cases
+
+
+if __name__ == "__main__":
+    main()
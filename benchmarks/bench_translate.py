@@ -0,0 +1,61 @@
+"""Benchmark latence/débit du moteur de traduction contre un serveur factice local.
+
+Usage : python -m benchmarks.bench_translate --segments 500 --latency 0.05 --workers 1 4 8
+"""
+import argparse
+import random
+import string
+import time
+
+from benchmarks.mock_translate_server import running_mock_server
+from tools.tools import Translate
+
+
+def make_segments(count: int, length: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    alphabet = string.ascii_lowercase + " "
+    return ["".join(rng.choice(alphabet) for _ in range(length)) for _ in range(count)]
+
+
+def run_case(server, segments: list, max_workers: int, batch_size: int) -> dict:
+    translator = Translate("bench", max_workers=max_workers, batch_size=batch_size, url=server.url)
+    server.reset_counters()
+    start = time.perf_counter()
+    results = translator.translate_segments(segments, "en")
+    elapsed = time.perf_counter() - start
+    translator.close()
+
+    assert all(result is not None for result in results), "segments perdus pendant le benchmark"
+    return {
+        "workers": max_workers,
+        "batch_size": batch_size,
+        "requests": server.request_count,
+        "seconds": elapsed,
+        "segments_per_sec": len(segments) / elapsed if elapsed else float("inf"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=500)
+    parser.add_argument("--length", type=int, default=200, help="caractères par segment")
+    parser.add_argument("--latency", type=float, default=0.05, help="latence simulée par requête (s)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--batch-size", type=int, default=Translate.MAX_SEGMENTS_PER_REQUEST)
+    args = parser.parse_args(argv)
+
+    segments = make_segments(args.segments, args.length)
+    with running_mock_server(latency=args.latency) as server:
+        cases = [run_case(server, segments, max_workers=1, batch_size=1)]
+        for workers in args.workers:
+            cases.append(run_case(server, segments, max_workers=workers, batch_size=args.batch_size))
+
+    print(f"{'workers':>8} {'lot':>5} {'requêtes':>9} {'durée (s)':>10} {'segments/s':>11}")
+    for case in cases:
+        print(f"{case['workers']:>8} {case['batch_size']:>5} {case['requests']:>9} "
+              f"{case['seconds']:>10.3f} {case['segments_per_sec']:>11.1f}")
+    return cases
+
+
+if __name__ == "__main__":
+    main()
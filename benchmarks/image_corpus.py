@@ -0,0 +1,37 @@
+import os
+import random
+from PIL import Image, ImageDraw
+
+
+def make_image(width: int, height: int, rng: random.Random) -> Image.Image:
+    """Image synthétique : dégradé, formes aléatoires et un peu de bruit, pour un encodage réaliste."""
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    draw = ImageDraw.Draw(img)
+    for _ in range(12):
+        x0, y0 = rng.randrange(width), rng.randrange(height)
+        x1, y1 = x0 + rng.randrange(1, width // 2 + 2), y0 + rng.randrange(1, height // 2 + 2)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x0, y0, x1, y1), fill=color)
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    return Image.blend(img, noise, 0.15)
+
+
+def make_image_corpus(directory: str, count: int, size: tuple = (1024, 768), image_format: str = "JPEG",
+                      quality: int = 95, seed: int = 0) -> list:
+    """Génère `count` images synthétiques reproductibles dans `directory`.
+
+    Returns:
+        list: Chemins des images générées
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    extension = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}.get(image_format.upper(), image_format.lower())
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"image_{index:06d}.{extension}")
+        width = max(16, int(size[0] * rng.uniform(0.75, 1.0)))
+        height = max(16, int(size[1] * rng.uniform(0.75, 1.0)))
+        options = {"quality": quality} if image_format.upper() in ("JPEG", "WEBP") else {}
+        make_image(width, height, rng).save(path, format=image_format, **options)
+        paths.append(path)
+    return paths
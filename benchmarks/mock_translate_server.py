@@ -0,0 +1,101 @@
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TRANSLATE_PATH = "/language/translate/v2"
+
+
+class MockTranslateHandler(BaseHTTPRequestHandler):
+    """Imite l'endpoint v2 de Google Translate : chaque segment "q" est renvoyé préfixé de la langue cible.
+
+    Une proportion `error_rate` des requêtes reçoit une réponse 429 ou 503.
+    """
+
+    def _params(self) -> dict:
+        params = parse_qs(urlparse(self.path).query)
+        if self.command == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length).decode("utf-8")
+            for key, values in parse_qs(body, keep_blank_values=True).items():
+                params.setdefault(key, []).extend(values)
+        return params
+
+    def _handle(self):
+        if urlparse(self.path).path != TRANSLATE_PATH:
+            self.send_error(404)
+            return
+
+        params = self._params()
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            failing = server.random.random() < server.error_rate
+            if not failing:
+                server.segment_count += len(params.get("q", []))
+        time.sleep(server.latency)
+
+        if failing:
+            self.send_response(server.random.choice((429, 503)))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        target = params.get("target", ["?"])[0]
+        payload = {
+            "data": {
+                "translations": [{"translatedText": f"[{target}] {q}"} for q in params.get("q", [])]
+            }
+        }
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _handle
+    do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockTranslateServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.05, error_rate: float = 0.0, seed: int = 0,
+                 host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), MockTranslateHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.segment_count = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{TRANSLATE_PATH}"
+
+    def reset_counters(self):
+        with self.lock:
+            self.request_count = 0
+            self.segment_count = 0
+
+
+@contextmanager
+def running_mock_server(latency: float = 0.05, error_rate: float = 0.0):
+    """Démarre le serveur de traduction factice dans un thread et le renvoie."""
+    server = MockTranslateServer(latency=latency, error_rate=error_rate)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,276 @@
+"""Suite de benchmarks hors ligne des chemins critiques, avec comparaison à une référence.
+
+Usage :
+    python -m benchmarks.suite                              # profil 'quick'
+    python -m benchmarks.suite --profile full --save-baseline
+    python -m benchmarks.suite --only compress analyze --tolerance 0.15
+
+Chaque exécution est enregistrée en JSON dans benchmarks/results/. Si une référence
+existe (benchmarks/baseline-<profil>.json par défaut), chaque mesure est comparée à
+celle-ci : une dégradation au-delà de la tolérance est signalée et le code de sortie vaut 1.
+Convention de nommage des mesures : *_per_sec et *_ratio (plus grand = meilleur),
+*_ms et *_seconds (plus petit = meilleur) ; les autres valeurs sont informatives.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+dossier_actuel = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(dossier_actuel, "results")
+
+PROFILES = {
+    "quick": {"segments": 200, "texts": 5, "latency": 0.01, "images": 24, "image_size": (800, 600),
+              "users": 50, "logins": 1000, "db_rows": 20_000, "hashes": 20_000},
+    "full": {"segments": 2000, "texts": 20, "latency": 0.05, "images": 200, "image_size": (1600, 1200),
+             "users": 500, "logins": 20_000, "db_rows": 200_000, "hashes": 200_000},
+}
+
+
+def case_translate(workdir: str, params: dict) -> dict:
+    """Translate.translate_segments et translate_stream contre le serveur factice local.
+
+    translate_text_ms mesure le chemin de translate_text sans sa notification de bureau (plyer).
+    """
+    from benchmarks.bench_translate import make_segments
+    from benchmarks.mock_translate_server import running_mock_server
+    from tools.tools import Translate
+
+    segments = make_segments(params["segments"], 200, seed=params["seed"])
+    with running_mock_server(latency=params["latency"]) as server:
+        translator = Translate("bench", max_workers=8, url=server.url)
+        try:
+            start = time.perf_counter()
+            translator.translate_segments(segments, "en")
+            segments_seconds = time.perf_counter() - start
+            text = ". ".join(segments[:50])
+            start = time.perf_counter()
+            for _ in range(params["texts"]):
+                "".join(translator.translate_stream([text], "en"))
+            text_seconds = (time.perf_counter() - start) / params["texts"]
+        finally:
+            translator.close()
+    return {
+        "segments_per_sec": len(segments) / segments_seconds,
+        "translate_text_ms": text_seconds * 1000,
+    }
+
+
+def case_compress(workdir: str, params: dict) -> dict:
+    """ImageCompressor.compress_images_in_folder : première passe puis passe incrémentale."""
+    from tools.manifest import Manifest
+    from tools.tools import ImageCompressor
+
+    output = os.path.join(workdir, "compressed")
+    os.makedirs(output, exist_ok=True)
+    manifest = Manifest(os.path.join(workdir, "manifest.sqlite3"), table="compression_manifest")
+    compressor = ImageCompressor(params["corpus"], output, quality=70, manifest=manifest)
+    cold = compressor.compress_images_in_folder()
+    warm = compressor.compress_images_in_folder()
+    return {
+        "files_per_sec": cold["files_per_sec"],
+        "incremental_files_per_sec": warm["files_per_sec"],
+        "compression_ratio": cold["input_bytes"] / cold["output_bytes"] if cold["output_bytes"] else 0.0,
+    }
+
+
+def case_analyze(workdir: str, params: dict) -> dict:
+    """ImageAnalyzer.analyze_images_in_folder : indexation puis nouvelle analyse sans changement."""
+    from tools.tools import ImageAnalyzer
+
+    analyzer = ImageAnalyzer(params["corpus"], os.path.join(workdir, "images.sqlite3"))
+    start = time.perf_counter()
+    images = len(analyzer.analyze_images_in_folder())
+    cold_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    analyzer.analyze_images_in_folder()
+    warm_seconds = time.perf_counter() - start
+    return {
+        "images": images,
+        "images_per_sec": images / cold_seconds,
+        "unchanged_images_per_sec": images / warm_seconds,
+    }
+
+
+def case_login(workdir: str, params: dict) -> dict:
+    """UserManager.authenticate (cœur de login) sur une base d'utilisateurs générée avec une graine."""
+    from benchmarks.users_db import make_users_db
+    from login.passwords import PasswordHasher
+
+    hasher = PasswordHasher(n=2 ** 12, workers=4)
+    manager, credentials = make_users_db(os.path.join(workdir, "users.sqlite3"), params["users"],
+                                         params["seed"], hasher)
+    try:
+        pairs = [(username, password) for username, password, _ in credentials]
+        start = time.perf_counter()
+        assert all(manager.authenticate_many(pairs))
+        cold_seconds = time.perf_counter() - start
+        burst = [pairs[index % len(pairs)] for index in range(params["logins"])]
+        start = time.perf_counter()
+        assert all(manager.authenticate_many(burst))
+        cached_seconds = time.perf_counter() - start
+    finally:
+        hasher.close()
+        manager.db.close()
+    return {
+        "logins_per_sec": len(pairs) / cold_seconds,
+        "cached_logins_per_sec": len(burst) / cached_seconds,
+    }
+
+
+def case_image_db(workdir: str, params: dict) -> dict:
+    """Écriture par lots dans la table images."""
+    from benchmarks.bench_image_db import bench_batched
+    from tools.tools import ImageAnalyzer
+
+    analyzer = ImageAnalyzer(workdir, os.path.join(workdir, "image_db.sqlite3"))
+    seconds = bench_batched(analyzer, params["db_rows"], 1000)
+    return {"rows_per_sec": params["db_rows"] / seconds}
+
+
+def case_phash(workdir: str, params: dict) -> dict:
+    """Recherche de toutes les paires de hashes perceptuels proches."""
+    from benchmarks.bench_phash import make_hashes
+    from tools.phash import MultiIndexHash
+
+    hashes = make_hashes(params["hashes"], params["hashes"] // 100, seed=params["seed"])
+    start = time.perf_counter()
+    pairs = sum(1 for _ in MultiIndexHash(hashes, 6).pairs())
+    return {"pairs": pairs, "near_duplicates_seconds": time.perf_counter() - start}
+
+
+CASES = {
+    "translate": case_translate,
+    "compress": case_compress,
+    "analyze": case_analyze,
+    "login": case_login,
+    "image_db": case_image_db,
+    "phash": case_phash,
+}
+
+
+def direction(metric: str) -> int:
+    """+1 si une valeur plus grande est meilleure, -1 si plus petite, 0 si la mesure est informative."""
+    if metric.endswith(("_per_sec", "_ratio")):
+        return 1
+    if metric.endswith(("_ms", "_seconds")):
+        return -1
+    return 0
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compare deux exécutions mesure par mesure.
+
+    Returns:
+        list: dicts {"case", "metric", "baseline", "current", "change", "regression"} ; `change`
+            est la variation relative, positive quand la mesure s'améliore
+    """
+    rows = []
+    for case, metrics in results["cases"].items():
+        reference = baseline.get("cases", {}).get(case, {})
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            if not sign or metric not in reference or not reference[metric]:
+                continue
+            change = sign * (value - reference[metric]) / reference[metric]
+            rows.append({"case": case, "metric": metric, "baseline": reference[metric], "current": value,
+                         "change": change, "regression": change < -tolerance})
+    return rows
+
+
+def environment() -> dict:
+    from PIL import __version__ as pillow_version
+    import numpy
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "pillow": pillow_version, "numpy": numpy.__version__}
+
+
+def run_suite(profile: str = "quick", only: list = None, seed: int = 0, image_format: str = "JPEG",
+              image_size: tuple = None, images: int = None) -> dict:
+    """Exécute les cas demandés dans un dossier temporaire et renvoie les résultats."""
+    from benchmarks.image_corpus import make_image_corpus
+
+    params = dict(PROFILES[profile], seed=seed, image_format=image_format)
+    if image_size:
+        params["image_size"] = tuple(image_size)
+    if images:
+        params["images"] = images
+    names = only or list(CASES)
+    results = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "profile": profile, "params": params,
+               "environment": environment(), "cases": {}, "seconds": {}}
+    workdir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        if {"compress", "analyze"} & set(names):
+            params["corpus"] = os.path.join(workdir, "corpus")
+            make_image_corpus(params["corpus"], params["images"], params["image_size"], image_format, seed=seed)
+        for name in names:
+            case_dir = os.path.join(workdir, name)
+            os.makedirs(case_dir)
+            print(f"[{name}] ...", file=sys.stderr)
+            start = time.perf_counter()
+            results["cases"][name] = CASES[name](case_dir, params)
+            results["seconds"][name] = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    params.pop("corpus", None)
+    return results
+
+
+def save_json(data: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), help="cas à exécuter (tous par défaut)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--images", type=int, help="taille du corpus d'images (selon le profil par défaut)")
+    parser.add_argument("--image-format", default="JPEG", choices=("JPEG", "PNG", "WEBP"))
+    parser.add_argument("--image-size", type=int, nargs=2, metavar=("LARGEUR", "HAUTEUR"))
+    parser.add_argument("--baseline", help="référence à comparer (benchmarks/baseline-<profil>.json par défaut)")
+    parser.add_argument("--save-baseline", action="store_true", help="enregistrer cette exécution comme référence")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="dégradation relative tolérée (0.2 = 20 %%)")
+    parser.add_argument("--output", help="fichier de résultats (benchmarks/results/<profil>-<date>.json par défaut)")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.profile, args.only, args.seed, args.image_format, args.image_size, args.images)
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.profile}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    save_json(results, output)
+    print(f"Résultats enregistrés dans {output}")
+
+    baseline_path = args.baseline or os.path.join(dossier_actuel, f"baseline-{args.profile}.json")
+    rows = []
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, "r", encoding="utf-8") as file:
+            rows = compare(results, json.load(file), args.tolerance)
+        print(f"\nComparaison avec {baseline_path} (tolérance {args.tolerance:.0%}) :")
+        print(f"{'cas':<10} {'mesure':<28} {'référence':>12} {'actuel':>12} {'écart':>8}")
+        for row in rows:
+            flag = "  RÉGRESSION" if row["regression"] else ""
+            print(f"{row['case']:<10} {row['metric']:<28} {row['baseline']:>12.2f} {row['current']:>12.2f} "
+                  f"{row['change']:>+8.1%}{flag}")
+    else:
+        for case, metrics in results["cases"].items():
+            for metric, value in metrics.items():
+                print(f"{case:<10} {metric:<28} {value:>12.2f}")
+    if args.save_baseline:
+        save_json(results, baseline_path)
+        print(f"Référence enregistrée dans {baseline_path}")
+
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} régression(s) détectée(s).")
+    results["comparison"] = rows
+    results["regressions"] = len(regressions)
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main()["regressions"] else 0)
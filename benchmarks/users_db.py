@@ -0,0 +1,72 @@
+"""Base d'utilisateurs synthétique et reproductible pour les benchmarks d'authentification.
+
+Usage : python -m benchmarks.users_db comptes.sqlite3 --users 10000 --seed 0
+"""
+import argparse
+import csv
+import os
+import random
+import string
+import tempfile
+
+from login.login import UserManager
+from login.passwords import PasswordHasher
+
+
+def make_credentials(count: int, seed: int = 0, admin_ratio: float = 0.01) -> list:
+    """Identifiants déterministes : mêmes noms, mots de passe et rôles pour une même graine.
+
+    Returns:
+        list: (username, password, role)
+    """
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    credentials = []
+    for index in range(count):
+        password = "".join(rng.choice(alphabet) for _ in range(12))
+        role = "admin" if rng.random() < admin_ratio else "user"
+        credentials.append((f"user{index:07d}", password, role))
+    return credentials
+
+
+def make_users_db(db_path: str, count: int = 1000, seed: int = 0, hasher: PasswordHasher = None,
+                  admin_ratio: float = 0.01) -> tuple:
+    """Crée (ou complète) une base d'utilisateurs synthétique par l'import en masse de UserManager.
+
+    Seuls les sels des hashes sont aléatoires : les comptes et mots de passe dépendent
+    uniquement de `seed`.
+
+    Returns:
+        tuple: (UserManager ouvert sur la base, liste des (username, password, role))
+    """
+    credentials = make_credentials(count, seed, admin_ratio)
+    manager = UserManager(db_path, hasher=hasher)
+    handle, csv_path = tempfile.mkstemp(prefix="users_", suffix=".csv")
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("username", "password", "role"))
+            writer.writerows(credentials)
+        manager.import_users(csv_path, batch_size=1000)
+    finally:
+        os.remove(csv_path)
+    return manager, credentials
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("db_path")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scrypt-n", type=int, default=2 ** 14, help="coût scrypt des mots de passe générés")
+    args = parser.parse_args(argv)
+
+    hasher = PasswordHasher(n=args.scrypt_n)
+    manager, credentials = make_users_db(args.db_path, args.users, args.seed, hasher)
+    hasher.close()
+    print(f"{len(credentials)} utilisateur(s) dans {args.db_path} (graine {args.seed})")
+    return {"users": len(credentials), "db_path": args.db_path}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""Interface en ligne de commande : exécute les outils sans passer par les menus interactifs.
+
+Exemples :
+    python main.py translate --target en "Bonjour tout le monde"
+    python main.py translate-dir documents --target en --recursive
+    python main.py analyze photos --recursive --near-duplicates
+    python main.py compress photos --quality 80
+    python main.py compress photos --rendition web:1600:webp:80 --rendition mini:320:jpeg:75
+    python main.py compress photos --max-bytes 200000 --quality 90
+    python main.py users import comptes.csv
+    python main.py run taches.json --workers 4
+
+Chaque commande écrit sur la sortie standard des événements JSON, un par ligne
+(progression puis résumé) ; les messages destinés aux humains passent sur la sortie
+d'erreur. Avec --metrics FICHIER (avant la commande), les durées et compteurs mesurés
+sont écrits en fin d'exécution, au format Prometheus ou en JSON.
+
+Fichier de tâches (JSON ou JSONL) pour la commande run : une liste de tâches, chacune
+étant une ligne de commande (chaîne ou liste d'arguments) avec un nom optionnel :
+    {"workers": 2, "jobs": [
+        {"name": "photos", "args": ["compress", "photos", "--quality", "80"]},
+        {"name": "docs", "args": "translate-dir documents --target en"}
+    ]}
+"""
+import os
+import sys
+import json
+import time
+import shlex
+import argparse
+import logging
+import threading
+from contextlib import redirect_stdout
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from logging_config import setup_logging
+from tools.fileio import track_io
+
+dossier_actuel = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(dossier_actuel, 'data', 'app.sqlite3')
+IMAGE_DB_PATH = os.path.join(dossier_actuel, 'data', 'imageAnalyzer.sqlite3')
+API_KEY_PATH = os.path.join(dossier_actuel, 'api_key.txt')
+# Variable d'environnement prioritaire sur le fichier api_key.txt
+API_KEY_ENV = "TRANSLATE_API_KEY"
+
+
+class CommandError(Exception):
+    """Erreur d'une commande, signalée sans trace d'appel (argument invalide, clé API absente,
+    dossier introuvable, traduction impossible...)."""
+
+
+class EventWriter:
+    """Écrit les événements JSON (une ligne chacun) sur un flux, depuis plusieurs threads."""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, job: str = None, **fields) -> None:
+        record = {"event": event, "time": round(time.time(), 3)}
+        if job is not None:
+            record["job"] = job
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def read_api_key(api_key: str = None) -> str:
+    """Clé API : argument, sinon variable d'environnement, sinon fichier api_key.txt."""
+    api_key = api_key or os.environ.get(API_KEY_ENV)
+    if not api_key and os.path.exists(API_KEY_PATH):
+        with open(API_KEY_PATH, 'r') as file:
+            api_key = file.read().strip()
+    if not api_key:
+        raise CommandError(f"Clé API absente : utiliser --api-key, {API_KEY_ENV} ou {API_KEY_PATH}")
+    return api_key
+
+
+def require_directory(path: str) -> None:
+    """Vérifie que le dossier d'entrée d'une commande existe."""
+    if not os.path.isdir(path):
+        raise CommandError(f"Dossier introuvable : {path}")
+
+
+def cmd_translate(args, events: EventWriter, job: str = None) -> dict:
+    from tools.tools import Translate, TranslationError
+    from tools.translation_cache import TranslationCache
+
+    t = Translate(read_api_key(args.api_key), max_workers=args.workers, cache=TranslationCache())
+    try:
+        start = time.perf_counter()
+        if args.file:
+            output_path = args.output or os.path.splitext(args.file)[0] + f"_traduit_{args.target}.txt"
+            t.translate_file(args.file, output_path, args.target)
+            summary = {"file": args.file, "output": output_path}
+        else:
+            text = " ".join(args.text) if args.text else sys.stdin.read()
+            summary = {"translation": "".join(t.translate_stream([text], args.target))}
+        summary["seconds"] = time.perf_counter() - start
+        summary["cache"] = t.cache.stats()
+        return summary
+    except TranslationError as e:
+        raise CommandError(f"Traduction impossible : {e}") from e
+    finally:
+        t.close()
+
+
+def cmd_translate_dir(args, events: EventWriter, job: str = None) -> dict:
+    from tools.tools import Translate
+    from tools.translation_cache import TranslationCache
+
+    require_directory(args.directory)
+    t = Translate(read_api_key(args.api_key), cache=TranslationCache())
+    try:
+        return t.translate_directory(args.directory, args.target, recursive=args.recursive,
+                                     max_files=args.workers,
+                                     progress=lambda info: events.emit("progress", job, **info))
+    finally:
+        t.close()
+
+
+def cmd_analyze(args, events: EventWriter, job: str = None) -> dict:
+    from tools.tools import ImageAnalyzer
+
+    require_directory(args.folder)
+    analyzer = ImageAnalyzer(args.folder, args.db, perceptual_hashes=args.near_duplicates)
+    start = time.perf_counter()
+    done = 0
+    for info in analyzer.iter_images_info(recursive=args.recursive, workers=args.workers,
+                                          use_processes=args.processes):
+        done += 1
+        events.emit("progress", job, file=info.get("path"), status="error" if "error" in info else "indexed",
+                    error=info.get("error"), done=done, total=analyzer.last_scan["total"])
+    summary = dict(analyzer.last_scan)
+    if args.near_duplicates:
+        summary["near_duplicates"] = 0
+        for path_a, path_b, distance in analyzer.index.near_duplicates(args.max_distance):
+            summary["near_duplicates"] += 1
+            events.emit("near_duplicate", job, a=path_a, b=path_b, distance=distance)
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def cmd_compress(args, events: EventWriter, job: str = None) -> dict:
+    from tools.tools import ImageCompressor
+    from tools.manifest import Manifest
+    from tools.transforms import Rendition, parse_rendition, available_formats
+    from tools.quality_cache import QualityCache
+
+    require_directory(args.folder)
+    if not 1 <= args.quality <= 100:
+        raise CommandError(f"Qualité invalide : {args.quality} (1 à 100)")
+    if not 1 <= args.min_quality <= 100:
+        raise CommandError(f"Qualité minimale invalide : {args.min_quality} (1 à 100)")
+    options = {"progressive": args.progressive, "optimize": args.optimize, "max_bytes": args.max_bytes,
+               "min_psnr": args.min_psnr, "min_quality": args.min_quality}
+    try:
+        renditions = [parse_rendition(spec, **options) for spec in args.rendition]
+    except ValueError as e:
+        raise CommandError(str(e)) from e
+    if args.format and args.format.upper() not in available_formats():
+        raise CommandError(f"Format non disponible : {args.format}")
+    if not renditions and (args.max_size or args.format or args.progressive or args.optimize
+                           or args.max_bytes or args.min_psnr):
+        renditions = [Rendition(None, args.max_size, args.format, args.quality, **options)]
+    adaptive = args.max_bytes or args.min_psnr
+    output_folder = args.output or os.path.join(args.folder, "images_compressées")
+    manifest = None if args.no_incremental else Manifest(table='compression_manifest')
+    try:
+        compressor = ImageCompressor(args.folder, output_folder, args.quality, manifest=manifest,
+                                     renditions=renditions or None,
+                                     quality_cache=QualityCache() if adaptive else None)
+    except ValueError as e:
+        raise CommandError(str(e)) from e
+    done = 0
+
+    def progress(result: dict) -> None:
+        nonlocal done
+        done += 1
+        events.emit("progress", job, file=result["file"], status=result["status"],
+                    input_size=result.get("input_size"), output_size=result.get("output_size"), done=done,
+                    total=result.get("total"))
+
+    return compressor.compress_images_in_folder(workers=args.workers, progress=progress)
+
+
+def cmd_users_import(args, events: EventWriter, job: str = None) -> dict:
+    from login.login import UserManager
+
+    try:
+        return UserManager(args.db).import_users(args.file, args.format, batch_size=args.batch_size)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Import impossible : {e}") from e
+
+
+def cmd_users_export(args, events: EventWriter, job: str = None) -> dict:
+    from login.login import UserManager
+
+    start = time.perf_counter()
+    try:
+        count = UserManager(args.db).export_users(args.file, args.format)
+    except (OSError, ValueError) as e:
+        raise CommandError(f"Export impossible : {e}") from e
+    return {"exported": count, "file": args.file, "seconds": time.perf_counter() - start}
+
+
+def cmd_run(args, events: EventWriter, job: str = None) -> dict:
+    jobs, file_workers = read_job_file(args.job_file)
+    workers = args.workers or file_workers or 1
+    summary = {"jobs": len(jobs), "succeeded": 0, "failed": 0}
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job") as executor:
+        futures = {executor.submit(run_command, argv, events, name): name for name, argv in jobs}
+        for future in as_completed(futures):
+            summary["succeeded" if future.result() == 0 else "failed"] += 1
+    summary["workers"] = workers
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def read_job_file(path: str) -> tuple:
+    """Lit un fichier de tâches (JSON ou JSONL).
+
+    Returns:
+        tuple: (liste de (nom, arguments), nombre de workers demandé par le fichier ou None)
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            content = file.read()
+    except OSError as e:
+        raise CommandError(f"Fichier de tâches illisible : {e}") from e
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        try:
+            data = [json.loads(line) for line in content.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise CommandError(f"Fichier de tâches invalide : {e}") from e
+    workers = None
+    if isinstance(data, dict):
+        workers = data.get("workers")
+        data = data.get("jobs", [])
+    jobs = []
+    for index, entry in enumerate(data, start=1):
+        if isinstance(entry, dict):
+            name, argv = entry.get("name"), entry.get("args")
+        else:
+            name, argv = None, entry
+        if isinstance(argv, str):
+            argv = shlex.split(argv)
+        if not argv or not isinstance(argv, list):
+            raise CommandError(f"Tâche {index} sans arguments dans {path}")
+        if argv[0] == "run":
+            raise CommandError(f"Tâche {index} : une tâche ne peut pas lancer un autre fichier de tâches")
+        jobs.append((name or f"{index}:{argv[0]}", [str(arg) for arg in argv]))
+    return jobs, workers
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Outils de traduction, d'analyse et de "
+                                     "compression d'images, sans menus interactifs.")
+    parser.add_argument("--metrics", metavar="FICHIER",
+                        help="écrire les métriques du processus en fin de commande (.json, sinon format Prometheus)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("translate", help="traduire un texte ou un fichier")
+    command.add_argument("text", nargs="*", help="texte à traduire (entrée standard si absent)")
+    command.add_argument("--target", "-t", required=True, help="langue cible (ex: en)")
+    command.add_argument("--file", "-f", help="fichier texte à traduire")
+    command.add_argument("--output", "-o", help="fichier de sortie (<fichier>_traduit_<langue>.txt par défaut)")
+    command.add_argument("--workers", type=int, default=4, help="requêtes simultanées")
+    command.add_argument("--api-key")
+    command.set_defaults(handler=cmd_translate)
+
+    command = commands.add_parser("translate-dir", help="traduire les fichiers .txt d'un dossier")
+    command.add_argument("directory")
+    command.add_argument("--target", "-t", required=True, help="langue cible (ex: en)")
+    command.add_argument("--recursive", "-r", action="store_true")
+    command.add_argument("--workers", type=int, default=4, help="fichiers traduits simultanément")
+    command.add_argument("--api-key")
+    command.set_defaults(handler=cmd_translate_dir)
+
+    command = commands.add_parser("analyze", help="indexer les images d'un dossier")
+    command.add_argument("folder")
+    command.add_argument("--db", default=IMAGE_DB_PATH, help="base SQLite de l'index")
+    command.add_argument("--recursive", "-r", action="store_true")
+    command.add_argument("--workers", type=int, default=8)
+    command.add_argument("--processes", action="store_true", help="lire les images dans des processus")
+    command.add_argument("--near-duplicates", action="store_true", help="rechercher les images similaires")
+    command.add_argument("--max-distance", type=int, default=6, help="distance de Hamming maximale")
+    command.set_defaults(handler=cmd_analyze)
+
+    command = commands.add_parser("compress", help="compresser les images d'un dossier")
+    command.add_argument("folder")
+    command.add_argument("--quality", "-q", type=int, default=85)
+    command.add_argument("--output", "-o", help="dossier de sortie (<dossier>/images_compressées par défaut)")
+    command.add_argument("--workers", type=int, default=None, help="processus (nombre de CPU par défaut)")
+    command.add_argument("--no-incremental", action="store_true", help="recompresser même les images inchangées")
+    command.add_argument("--max-size", type=int, help="plus grand côté des images produites, en pixels")
+    command.add_argument("--format", help="format de sortie (JPEG, WEBP, AVIF si disponible...)")
+    command.add_argument("--progressive", action="store_true", help="JPEG progressifs")
+    command.add_argument("--optimize", action="store_true", help="encodage optimisé (plus lent, plus compact)")
+    command.add_argument("--max-bytes", type=int, help="taille visée par image produite, en octets "
+                         "(qualité cherchée entre --min-quality et --quality)")
+    command.add_argument("--min-psnr", type=float, help="qualité perceptuelle visée, en dB de PSNR "
+                         "(qualité cherchée entre --min-quality et --quality)")
+    command.add_argument("--min-quality", type=int, default=30, help="qualité minimale de la recherche")
+    command.add_argument("--rendition", action="append", default=[], metavar="NOM:TAILLE[:FORMAT[:QUALITÉ]]",
+                         help="rendu supplémentaire produit du même décodage (option répétable)")
+    command.set_defaults(handler=cmd_compress)
+
+    users = commands.add_parser("users", help="gestion des utilisateurs en masse")
+    user_commands = users.add_subparsers(dest="users_command", required=True)
+    command = user_commands.add_parser("import", help="importer des utilisateurs (CSV ou JSONL)")
+    command.add_argument("file")
+    command.add_argument("--format", choices=("csv", "jsonl"), help="déduit de l'extension par défaut")
+    command.add_argument("--batch-size", type=int, default=500)
+    command.add_argument("--db", default=DB_PATH)
+    command.set_defaults(handler=cmd_users_import)
+    command = user_commands.add_parser("export", help="exporter les utilisateurs (CSV ou JSONL)")
+    command.add_argument("file")
+    command.add_argument("--format", choices=("csv", "jsonl"), help="déduit de l'extension par défaut")
+    command.add_argument("--db", default=DB_PATH)
+    command.set_defaults(handler=cmd_users_export)
+
+    command = commands.add_parser("run", help="exécuter un fichier de tâches en parallèle")
+    command.add_argument("job_file")
+    command.add_argument("--workers", type=int, default=None,
+                         help="tâches simultanées (valeur du fichier, sinon 1)")
+    command.set_defaults(handler=cmd_run)
+    return parser
+
+
+def run_command(argv: list, events: EventWriter, job: str = None) -> int:
+    """Analyse et exécute une ligne de commande ; émet son résumé (ou son erreur).
+
+    Returns:
+        int: Code de sortie (0 en cas de succès)
+    """
+    try:
+        args = build_parser().parse_args(argv)
+    except SystemExit as e:
+        # --help (code 0) ou arguments invalides (code 2, message déjà affiché par argparse)
+        if e.code:
+            events.emit("error", job, command=argv[0] if argv else None, error="arguments invalides")
+        return e.code if isinstance(e.code, int) else 2
+    command = args.command if args.command != "users" else f"users {args.users_command}"
+    events.emit("start", job, command=command)
+    try:
+        with track_io() as io_stats:
+            summary = args.handler(args, events, job)
+    except CommandError as e:
+        events.emit("error", job, command=command, error=str(e))
+        return 2
+    except Exception as e:
+        logging.exception(f"Échec de la commande {command}")
+        events.emit("error", job, command=command, error=f"{type(e).__name__}: {e}")
+        return 1
+    # Octets lus par la commande et pic de mémoire résidente du processus à sa fin
+    events.emit("summary", job, command=command, io=io_stats.summary(), **summary)
+    if args.metrics:
+        from tools.metrics import METRICS
+        METRICS.dump(args.metrics)
+        events.emit("metrics", job, file=args.metrics, **METRICS.summary())
+    if command == "run" and summary["failed"]:
+        return 1
+    return 0
+
+
+def main(argv: list = None) -> int:
+    """Point d'entrée : les événements JSON vont sur la sortie standard, tout le reste sur la sortie d'erreur."""
+    setup_logging()
+    events = EventWriter(sys.stdout)
+    with redirect_stdout(sys.stderr):
+        return run_command(sys.argv[1:] if argv is None else argv, events)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
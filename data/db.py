@@ -2,33 +2,214 @@ from contextlib import contextmanager
 import sqlite3 as sqlite
 import logging
 import os
+import time
+import threading
+import weakref
+from tools.metrics import METRICS
 
-dossier_actuel = os.path.dirname(__file__)
-dossier_parent = os.path.dirname(dossier_actuel)
-chemin_log = os.path.join(dossier_parent, 'logs', 'db.log')
+# Pragmas appliqués à chaque nouvelle connexion (surchargeables par base)
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
 
-logging.basicConfig(
-    filename=(chemin_log),
-    filemode="a",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s",
-    datefmt="%d/%m/%Y - %H:%M:%S",
-    encoding='utf-8'
-)
+class TimedCursor(sqlite.Cursor):
+    """Curseur qui chronomètre chaque requête et journalise les requêtes lentes."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.record_query(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.record_query(sql, time.perf_counter() - start)
+
+class PooledConnection(sqlite.Connection):
+    """Connexion d'un thread, en mode autocommit : les transactions sont ouvertes explicitement par DB.transaction."""
+
+    slow_query_ms = None
+    transaction_depth = 0
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def record_query(self, sql: str, elapsed: float) -> None:
+        METRICS.observe("sqlite_query_seconds", elapsed, statement=sql.lstrip().split(None, 1)[0].upper())
+        if self.slow_query_ms is not None and elapsed * 1000 >= self.slow_query_ms:
+            logging.warning(f"Requête lente ({elapsed * 1000:.1f} ms) : {' '.join(sql.split())}")
 
 class DB:
-    def __init__(self, db_path) -> None:
+    """Accès à une base SQLite avec une connexion persistante par thread.
+
+    Chaque thread réutilise sa propre connexion (et donc le cache de requêtes préparées
+    de sqlite3) au lieu d'en ouvrir une à chaque opération. Les transactions sont
+    explicites et peuvent s'imbriquer (SAVEPOINT) ; les requêtes plus lentes que
+    `slow_query_ms` sont journalisées avec leur durée.
+    """
+
+    # Schémas déjà créés dans ce processus, par (chemin absolu de la base, nom du schéma)
+    _schemas = set()
+    _schemas_lock = threading.Lock()
+
+    def __init__(self, db_path, pragmas: dict = None, slow_query_ms: float = 100,
+                 cached_statements: int = 256) -> None:
         self.db_path = db_path
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.slow_query_ms = slow_query_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite.connect(self.db_path, factory=PooledConnection, isolation_level=None,
+                              check_same_thread=False, cached_statements=self.cached_statements)
+        conn.slow_query_ms = self.slow_query_ms
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        with self._lock:
+            self._connections.add(conn)
+        return conn
+
+    def connection(self) -> PooledConnection:
+        """Renvoie la connexion du thread courant (créée au premier appel)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def cursor(self) -> TimedCursor:
+        """Curseur en autocommit sur la connexion du thread courant, pour les lectures simples."""
+        return self.connection().cursor()
+
+    def execute(self, sql: str, parameters=()) -> TimedCursor:
+        return self.cursor().execute(sql, parameters)
+
+    @contextmanager
+    def transaction(self):
+        """Ouvre une transaction (ou un SAVEPOINT si une transaction est déjà en cours).
+
+        Validée en sortie normale, annulée si une exception est levée ; l'exception est propagée.
+        """
+        conn = self.connection()
+        depth = conn.transaction_depth
+        conn.execute("BEGIN" if depth == 0 else f"SAVEPOINT sp_{depth}")
+        conn.transaction_depth = depth + 1
+        try:
+            yield conn.cursor()
+        except BaseException as e:
+            conn.transaction_depth = depth
+            if isinstance(e, GeneratorExit):
+                # Générateur abandonné en cours de lecture : ce n'est pas une erreur
+                conn.execute("COMMIT" if depth == 0 else f"RELEASE sp_{depth}")
+            elif depth == 0:
+                conn.execute("ROLLBACK")
+            else:
+                conn.execute(f"ROLLBACK TO sp_{depth}")
+                conn.execute(f"RELEASE sp_{depth}")
+            raise
+        else:
+            conn.transaction_depth = depth
+            conn.execute("COMMIT" if depth == 0 else f"RELEASE sp_{depth}")
+
+    def ensure_schema(self, name: str, create) -> bool:
+        """Exécute `create(cursor)` dans une transaction, une seule fois par processus et par base.
+
+        Les instances suivantes sur la même base (et le même `name`) ne refont pas les
+        CREATE TABLE / CREATE INDEX, sauf si le fichier a été supprimé entre-temps.
+
+        Returns:
+            bool: True si `create` a été exécuté
+        """
+        key = None if self.db_path == ":memory:" else (os.path.abspath(self.db_path), name)
+        with DB._schemas_lock:
+            if key in DB._schemas and os.path.exists(self.db_path):
+                return False
+            with self.transaction() as cursor:
+                create(cursor)
+            if key is not None:
+                DB._schemas.add(key)
+        return True
 
     @contextmanager
     def db_connect(self):
-        """Gère la connexion à la base de données SQLite."""
+        """Gère la connexion à la base de données SQLite.
+
+        Fournit un curseur dans une transaction validée en fin de bloc ; en cas d'erreur
+        SQLite, la transaction est annulée, l'erreur journalisée puis propagée.
+        """
         try:
-            conn = sqlite.connect(self.db_path)
-            cursor = conn.cursor()
-            yield cursor
+            with self.transaction() as cursor:
+                yield cursor
         except sqlite.Error as e:
-            logging.error(f"Erreur lors de la connexion à la base de données : {e}")
-        finally:
-            conn.commit()
-            conn.close()
\ No newline at end of file
+            logging.error(f"Erreur lors de l'accès à la base de données : {e}")
+            raise
+
+    def batch_writer(self, sql: str, batch_size: int = 1000):
+        """Crée un BatchWriter sur cette base (voir BatchWriter)."""
+        return BatchWriter(self, sql, batch_size)
+
+    def close(self) -> None:
+        """Ferme toutes les connexions ouvertes par cette instance, quel que soit leur thread."""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections = weakref.WeakSet()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+class BatchWriter:
+    """Écriture de lignes en masse.
+
+    Les lignes sont accumulées puis insérées par `executemany`, une transaction par
+    lot de `batch_size` lignes, au lieu d'une transaction par ligne.
+    S'utilise comme gestionnaire de contexte :
+        with db.batch_writer("INSERT INTO t (a, b) VALUES (?, ?)") as writer:
+            writer.write((1, 2))
+    """
+
+    def __init__(self, db: DB, sql: str, batch_size: int = 1000) -> None:
+        self.db = db
+        self.sql = sql
+        self.batch_size = max(1, batch_size)
+        self.rows_written = 0
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def write(self, row) -> None:
+        """Ajoute une ligne ; le lot est écrit dès qu'il atteint `batch_size` lignes."""
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def write_many(self, rows) -> None:
+        for row in rows:
+            self.write(row)
+
+    def flush(self) -> None:
+        """Écrit les lignes en attente dans une transaction."""
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        try:
+            with self.db.transaction() as cursor:
+                cursor.executemany(self.sql, rows)
+            self.rows_written += len(rows)
+        except sqlite.Error as e:
+            logging.error(f"Erreur lors de l'écriture d'un lot de {len(rows)} ligne(s) : {e}")
+            raise
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
@@ -0,0 +1,27 @@
+"""Configuration unique de la journalisation de l'application.
+
+Les modules se contentent d'appeler logging ; seuls les points d'entrée (main.py, cli.py)
+configurent la sortie, une seule fois.
+"""
+import os
+import logging
+
+dossier_actuel = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.path.join(dossier_actuel, 'logs')
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(filename)s - %(message)s"
+DATE_FORMAT = "%d/%m/%Y - %H:%M:%S"
+
+
+def setup_logging(filename: str = 'app.log', level: int = logging.INFO) -> None:
+    """Journalise dans logs/<filename> ; sans effet si la journalisation est déjà configurée."""
+    if logging.getLogger().handlers:
+        return
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logging.basicConfig(
+        filename=os.path.join(LOG_DIR, filename),
+        filemode="a",
+        level=level,
+        format=LOG_FORMAT,
+        datefmt=DATE_FORMAT,
+        encoding='utf-8'
+    )
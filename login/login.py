@@ -1,83 +1,146 @@
 import os
+import time
 import logging
-import hashlib
+import sqlite3
 from data.db import DB
+from login.passwords import PasswordHasher, SessionCache, is_password_hash
+from login.user_io import read_users, write_users
+from tools.metrics import METRICS
 
 dossier_actuel = os.path.dirname(__file__)
 dossier_parent = os.path.dirname(dossier_actuel)
-chemin_log = os.path.join(dossier_parent, 'logs', 'login.log')
-if not os.path.exists(os.path.join(dossier_parent, 'logs')):
-    os.makedirs(os.path.join(dossier_parent, 'logs'))
 
 db_path = os.path.join(dossier_parent, 'data', 'app.sqlite3')
 if not os.path.exists(os.path.join(dossier_parent, 'data')):
     os.makedirs(os.path.join(dossier_parent, 'data'))
 
-logging.basicConfig(
-    filename=(chemin_log),
-    filemode="a",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s",
-    datefmt="%d/%m/%Y - %H:%M:%S",
-    encoding='utf-8'
-)
 logging.info(">> Importation du module login ...")
 
+ROLES = ('user', 'admin')
+
 class UserManager:
-    def __init__(self, db_path) -> None:
+    def __init__(self, db_path, hasher: PasswordHasher = None, session_ttl: float = 300) -> None:
         self.db_path = db_path
         self.db = DB(db_path)
+        self.hasher = hasher or PasswordHasher()
+        self.sessions = SessionCache(ttl=session_ttl)
+        self._dummy_hash = None
         self.init_db()
 
     def init_db(self) -> None:
-        """Initialise la base de données en créant la table users si elle n'existe pas."""
-        with self.db.db_connect() as cursor:
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username VARCHAR(30) NOT NULL UNIQUE,
-                    password VARCHAR(64) NOT NULL,
-                    role VARCHAR(10) NOT NULL DEFAULT 'user'
-                )
-            ''')
-        logging.info("Base de données initialisée avec succès.")
+        """Initialise la base de données en créant la table users si elle n'existe pas (une fois par processus)."""
+        if self.db.ensure_schema("users", self._create_schema):
+            logging.info("Base de données initialisée avec succès.")
 
+    @staticmethod
+    def _create_schema(cursor) -> None:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username VARCHAR(30) NOT NULL UNIQUE,
+                password VARCHAR(64) NOT NULL,
+                role VARCHAR(10) NOT NULL DEFAULT 'user'
+            )
+        ''')
+        # La recherche par préfixe de username utilise l'index de la contrainte UNIQUE
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_role ON users (role, id)")
 
     def hash_password(self, password: str) -> str:
-        """Hash le mot de passe avec sha256."""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash le mot de passe avec un sel aléatoire (scrypt ou PBKDF2, voir PasswordHasher)."""
+        return self.hasher.hash(password)
+
+    def user_exists(self, username: str) -> bool:
+        return self.db.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def create_user(self, username: str, password: str, role: str = 'user') -> bool:
+        """Crée un utilisateur ; renvoie False si le nom d'utilisateur est déjà pris."""
+        if self.user_exists(username):
+            return False
+        try:
+            with self.db.db_connect() as cursor:
+                cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                               (username, self.hash_password(password), role))
+        except sqlite3.IntegrityError:
+            # Inscription concurrente du même nom entre la vérification et l'insertion
+            return False
+        return True
+
+    def authenticate(self, username: str, password: str) -> dict:
+        """Vérifie des identifiants sans interaction.
+
+        Les identifiants vérifiés récemment sont servis par le cache de sessions. Un ancien
+        hash SHA-256 (ou un hash dont le coût a changé) est recalculé après une connexion réussie.
+
+        Returns:
+            dict: {"username", "role"} si les identifiants sont valides, None sinon
+        """
+        user = self.sessions.get(username, password)
+        if user:
+            METRICS.inc("logins_total", result="cached")
+            return user
+        row = self.db.execute("SELECT id, password, role FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            # Même coût qu'un mauvais mot de passe, pour ne pas révéler les noms d'utilisateur existants
+            if self._dummy_hash is None:
+                self._dummy_hash = self.hasher.hash("")
+            self.hasher.verify(password, self._dummy_hash)
+            METRICS.inc("logins_total", result="failure")
+            return None
+        user_id, stored, role = row
+        if not self.hasher.verify(password, stored):
+            METRICS.inc("logins_total", result="failure")
+            return None
+        if self.hasher.needs_rehash(stored):
+            with self.db.db_connect() as cursor:
+                cursor.execute("UPDATE users SET password = ? WHERE id = ? AND password = ?",
+                               (self.hash_password(password), user_id, stored))
+            logging.info(f"Hash du mot de passe de {username} mis à niveau.")
+        user = {"username": username, "role": role}
+        self.sessions.put(username, password, user)
+        METRICS.inc("logins_total", result="success")
+        return user
+
+    def authenticate_async(self, username: str, password: str):
+        """Comme authenticate, mais exécuté dans le pool de vérification ; renvoie un Future."""
+        return self.hasher.submit(self.authenticate, username, password)
+
+    def authenticate_many(self, credentials) -> list:
+        """Vérifie une rafale de couples (username, password) en parallèle, dans l'ordre reçu."""
+        futures = [self.authenticate_async(username, password) for username, password in credentials]
+        return [future.result() for future in futures]
 
     def register(self) -> None:
         """Inscrit un nouvel utilisateur."""
         username = input("Username : ")
-        password = self.hash_password(input("Password : "))
-        role = 'user'
-        with self.db.db_connect() as cursor:
-            cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)", (username, password, role))
-            logging.info(f"Utilisateur '{username}' ajouté avec succès.")
-            print(f"Utilisateur '{username}' ajouté avec succès.")
+        if self.user_exists(username):
+            print(f"L'utilisateur '{username}' existe déjà.")
+            return
+        if not self.create_user(username, input("Password : ")):
+            logging.warning(f"Inscription refusée : l'utilisateur '{username}' existe déjà.")
+            print(f"L'utilisateur '{username}' existe déjà.")
+            return
+        logging.info(f"Utilisateur '{username}' ajouté avec succès.")
+        print(f"Utilisateur '{username}' ajouté avec succès.")
 
     def login(self) -> None:
         """Authentifie un utilisateur par son nom d'utilisateur et son mot de passe."""
         username = input("Username : ")
-        password = self.hash_password(input("Password : "))
-        with self.db.db_connect() as cursor:
-            cursor.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, password))
-            user = cursor.fetchone()
-            if user:
-                logging.info(f"Utilisateur {username} authentifié avec succès.")
-                print(f"Bienvenue, {username}!")
-                return {"username": user[1], "role": user[3]}
-            else:
-                logging.warning(f"Échec d'authentification pour l'utilisateur {username}.")
-                print(f"Échec d'authentification pour l'utilisateur '{username}'.")
-                return None
+        user = self.authenticate(username, input("Password : "))
+        if user:
+            logging.info(f"Utilisateur {username} authentifié avec succès.")
+            print(f"Bienvenue, {username}!")
+            return user
+        else:
+            logging.warning(f"Échec d'authentification pour l'utilisateur {username}.")
+            print(f"Échec d'authentification pour l'utilisateur '{username}'.")
+            return None
 
     def delete_user(self) -> None:
         """Supprime un utilisateur."""
         username = input("Username à supprimer : ")
         with self.db.db_connect() as cursor:
             cursor.execute("DELETE FROM users WHERE username = ?", (username,))
+            self.sessions.invalidate(username)
             if cursor.rowcount > 0:
                 logging.info(f"Utilisateur {username} supprimé avec succès.")
                 print(f"Utilisateur '{username}' supprimé avec succès.")
@@ -91,6 +154,7 @@ class UserManager:
         new_password = self.hash_password(input("Nouveau mot de passe : "))
         with self.db.db_connect() as cursor:
             cursor.execute("UPDATE users SET password = ? WHERE username = ?", (new_password, username))
+            self.sessions.invalidate(username)
             if cursor.rowcount > 0:
                 logging.info(f"Mot de passe de {username} modifié avec succès.")
                 print(f"Mot de passe de '{username}' modifié avec succès.")
@@ -98,24 +162,202 @@ class UserManager:
                 logging.warning(f"L'utilisateur {username} n'a pas été trouvé.")
                 print(f"Utilisateur '{username}' non trouvé.")
 
-    def display_all_users(self) -> str:
-        """Affiche tous les utilisateurs."""
+    def add_user(self) -> None:
+        """Ajoute un utilisateur en choisissant son rôle (menu admin)."""
+        username = input("Username : ")
+        password = input("Password : ")
+        role = input("Role [user/admin] : ").strip() or 'user'
+        if role not in ROLES:
+            print(f"Rôle invalide : '{role}'.")
+            return
+        if self.create_user(username, password, role):
+            logging.info(f"Utilisateur '{username}' ({role}) ajouté avec succès.")
+            print(f"Utilisateur '{username}' ajouté avec succès.")
+        else:
+            print(f"L'utilisateur '{username}' existe déjà.")
+
+    def list_users(self, limit: int = 50, after=None, prefix: str = None, role: str = None) -> list:
+        """Renvoie une page d'utilisateurs (pagination par clé, sans OFFSET).
+
+        Sans préfixe, les utilisateurs sont triés par id et `after` est le dernier id de la
+        page précédente ; avec un préfixe, ils sont triés par username (parcours de l'index
+        UNIQUE) et `after` est le dernier username de la page précédente.
+
+        Args:
+            limit (int): Taille de la page
+            after: Clé du dernier utilisateur de la page précédente (None pour la première page)
+            prefix (str): Début du nom d'utilisateur recherché
+            role (str): Ne garder que les utilisateurs de ce rôle
+
+        Returns:
+            list: dicts {"id", "username", "password", "role"}
+        """
+        clauses, params = [], []
+        if prefix:
+            key = "username"
+            clauses.append("username >= ? AND username < ?")
+            params += [prefix, prefix + '\uffff']
+        else:
+            key = "id"
+        if after is not None:
+            clauses.append(f"{key} > ?")
+            params.append(after)
+        if role:
+            clauses.append("role = ?")
+            params.append(role)
+        sql = "SELECT id, username, password, role FROM users"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {key} LIMIT ?"
+        params.append(limit)
+        cursor = self.db.execute(sql, tuple(params))
+        return [dict(zip(("id", "username", "password", "role"), row)) for row in cursor]
+
+    def iter_users(self, page_size: int = 1000, prefix: str = None, role: str = None):
+        """Parcourt les utilisateurs page par page : au plus `page_size` lignes en mémoire."""
+        key = "username" if prefix else "id"
+        after = None
+        while True:
+            page = self.list_users(page_size, after, prefix, role)
+            yield from page
+            if len(page) < page_size:
+                return
+            after = page[-1][key]
+
+    def import_users(self, path: str, format: str = None, batch_size: int = 500) -> dict:
+        """Importe des utilisateurs depuis un fichier CSV ou JSONL, au fil de l'eau.
+
+        Chaque ligne contient `username`, `role` (optionnel, 'user' par défaut) et soit
+        `password` en clair (haché à l'import, en parallèle), soit `password_hash` (fichier
+        produit par export_users). Les lignes sont insérées par lots, une transaction par
+        lot ; les noms déjà présents sont ignorés.
+
+        Returns:
+            dict: {"imported", "skipped", "invalid", "seconds"}
+        """
+        stats = {"imported": 0, "skipped": 0, "invalid": 0}
+        start = time.perf_counter()
+        batch = []
+        for line_number, record in read_users(path, format):
+            user = self._import_record(record)
+            if user is None:
+                stats["invalid"] += 1
+                logging.warning(f"Import {path} : ligne {line_number} ignorée (invalide).")
+                continue
+            batch.append(user)
+            if len(batch) >= batch_size:
+                self._import_batch(batch, stats)
+                batch = []
+        self._import_batch(batch, stats)
+        stats["seconds"] = time.perf_counter() - start
+        logging.info(f"Import de {path} : {stats['imported']} utilisateur(s) ajouté(s), "
+                     f"{stats['skipped']} existant(s), {stats['invalid']} invalide(s).")
+        return stats
+
+    @staticmethod
+    def _import_record(record: dict):
+        """(username, mot de passe en clair, hash, rôle) d'une ligne importée, ou None si elle est invalide."""
+        if not record:
+            return None
+        username = str(record.get("username") or "").strip()
+        role = str(record.get("role") or "user").strip()
+        password = record.get("password")
+        password_hash = record.get("password_hash")
+        if not username or role not in ROLES:
+            return None
+        if password_hash:
+            return (username, None, password_hash, role) if is_password_hash(password_hash) else None
+        return (username, str(password), None, role) if password else None
+
+    def _import_batch(self, batch: list, stats: dict) -> None:
+        """Insère un lot d'utilisateurs dans une transaction ; seuls les nouveaux noms sont hachés."""
+        if not batch:
+            return
+        placeholders = ", ".join("?" * len(batch))
+        existing = {row[0] for row in self.db.execute(
+            f"SELECT username FROM users WHERE username IN ({placeholders})", [user[0] for user in batch])}
+        seen = set()
+        users = []
+        for user in batch:
+            if user[0] in existing or user[0] in seen:
+                stats["skipped"] += 1
+            else:
+                seen.add(user[0])
+                users.append(user)
+        hashes = iter(self.hasher.hash_many([password for _, password, password_hash, _ in users
+                                             if password_hash is None]))
+        rows = [(username, password_hash or next(hashes), role) for username, _, password_hash, role in users]
         with self.db.db_connect() as cursor:
-            cursor.execute("SELECT * FROM users")
-            users = cursor.fetchall()
-            logging.info("Récupération de tous les utilisateurs réussie.")
-            print(f"Liste des utilisateurs :")
-            for user in users:
-                print(f"""
-                                Utilisateur {user[0]}
+            cursor.executemany(
+                "INSERT INTO users (username, password, role) VALUES (?, ?, ?) ON CONFLICT (username) DO NOTHING",
+                rows)
+            inserted = cursor.rowcount
+        stats["imported"] += inserted
+        stats["skipped"] += len(rows) - inserted
+
+    def export_users(self, path: str, format: str = None, page_size: int = 1000) -> int:
+        """Exporte les utilisateurs (avec le hash de leur mot de passe) en CSV ou JSONL, page par page.
+
+        Returns:
+            int: Nombre d'utilisateurs exportés
+        """
+        rows = ((user["id"], user["username"], user["password"], user["role"])
+                for user in self.iter_users(page_size))
+        count = write_users(path, rows, format)
+        logging.info(f"Export de {count} utilisateur(s) vers {path}.")
+        return count
+
+    def _print_user(self, user: dict) -> None:
+        print(f"""
+                                Utilisateur {user['id']}
                     ====================================================
-                            ID_utilisateur: {user[0]}
-                            Username: {user[1]}
-                            Password: {user[2]}
-                            Role: {user[3]}
+                            ID_utilisateur: {user['id']}
+                            Username: {user['username']}
+                            Password: {user['password']}
+                            Role: {user['role']}
                     ====================================================
                 """)
 
+    def display_all_users(self, page_size: int = 20, prefix: str = None) -> str:
+        """Affiche les utilisateurs page par page, sans charger toute la table."""
+        key = "username" if prefix else "id"
+        after = None
+        print(f"Liste des utilisateurs :")
+        while True:
+            page = self.list_users(page_size, after, prefix)
+            for user in page:
+                self._print_user(user)
+            if len(page) < page_size or input("Page suivante ? [O/n] : ").strip().lower() == "n":
+                break
+            after = page[-1][key]
+        logging.info("Récupération des utilisateurs réussie.")
+
+    def search_users(self) -> None:
+        """Affiche les utilisateurs dont le nom commence par le préfixe saisi."""
+        prefix = input("Début du nom d'utilisateur : ").strip()
+        self.display_all_users(prefix=prefix or None)
+
+    def import_users_input(self) -> None:
+        """Importe des utilisateurs depuis un fichier saisi par l'administrateur."""
+        path = input("Chemin du fichier à importer (.csv ou .jsonl) : ").strip()
+        try:
+            stats = self.import_users(path)
+        except (OSError, ValueError) as e:
+            print(f"Import impossible : {e}")
+            return
+        print(f"Import terminé : {stats['imported']} utilisateur(s) ajouté(s), {stats['skipped']} déjà existant(s), "
+              f"{stats['invalid']} ligne(s) invalide(s) en {stats['seconds']:.1f} s.")
+
+    def export_users_input(self) -> None:
+        """Exporte les utilisateurs vers un fichier saisi par l'administrateur."""
+        path = input("Chemin du fichier d'export (.csv ou .jsonl) : ").strip()
+        try:
+            count = self.export_users(path)
+        except (OSError, ValueError) as e:
+            print(f"Export impossible : {e}")
+            return
+        print(f"{count} utilisateur(s) exporté(s) vers {path}.")
+
     def get_user_by_id(self) -> str:
         """Affiche les informations d'un Utilisateur par son ID"""
         user_id = input("ID de l'utilisateur : ")
@@ -139,6 +381,7 @@ class UserManager:
         role = input("Role [user/admin] : ")
         with self.db.db_connect() as cursor:
             cursor.execute("UPDATE users SET role = ? WHERE username = ?", (role, username))
+            self.sessions.invalidate(username)
             if cursor.rowcount > 0:
                 logging.info(f"Le rôle de l'utilisateur '{username}' a bien été modifié pour '{role}'.")
                 print(f"Le rôle de l'utilisateur '{username}' a bien été modifié pour '{role}'.")
@@ -23,7 +23,10 @@ class Menu:
             5. Afficher un utilisateur par son ID
             6. Changer le role d'un utilisateur
             7. Accéder au menu utilisateur
-            8. Quitter le menu admin
+            8. Rechercher des utilisateurs
+            9. Importer des utilisateurs (CSV/JSONL)
+            10. Exporter les utilisateurs (CSV/JSONL)
+            11. Quitter le menu admin
             """)
         elif role == "user":
             print("""
@@ -31,9 +34,12 @@ class Menu:
                         Menu
             ====================================
             1. Traduire du texte
-            2. Traduire tous les .txt d'un dossier
-            3. Analysé toutes les images d'un dossier
-            4. Comprésser toutes les images d'un dossier
-            5. Quitter
+            2. Traduire tous les .txt d'un dossier (en arrière-plan)
+            3. Analysé toutes les images d'un dossier (en arrière-plan)
+            4. Comprésser toutes les images d'un dossier (en arrière-plan)
+            5. Traduire des fichiers volumineux (asynchrone)
+            6. Suivre les tâches en arrière-plan
+            7. Annuler une tâche
+            8. Quitter
             """)
 
@@ -0,0 +1,188 @@
+import os
+import hmac
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from tools.metrics import METRICS
+
+# Coût par défaut : scrypt N=2^14, r=8, p=1 (16 Mo de mémoire, ~50 ms par hash)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = 600_000
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+
+def is_legacy_hash(stored: str) -> bool:
+    """Indique si `stored` est un ancien hash SHA-256 non salé (64 caractères hexadécimaux)."""
+    return len(stored) == 64 and "$" not in stored
+
+
+def is_password_hash(stored: str) -> bool:
+    """Indique si `stored` ressemble à un hash de mot de passe reconnu (ancien ou nouveau format)."""
+    return is_legacy_hash(stored) or stored.split("$", 1)[0] in PasswordHasher.ALGORITHMS
+
+
+def legacy_hash(password: str) -> str:
+    """Ancien format de mot de passe : SHA-256 non salé, conservé pour la migration."""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+
+class PasswordHasher:
+    """Hachage salé et coûteux en mémoire des mots de passe (scrypt ou PBKDF2 de hashlib).
+
+    Les hashes sont stockés avec leurs paramètres, par exemple
+    `scrypt$16384$8$1$<sel>$<hash>` ou `pbkdf2_sha256$600000$<sel>$<hash>` : augmenter le
+    coût n'invalide pas les mots de passe existants, qui sont recalculés à la connexion
+    suivante (voir needs_rehash). hashlib relâche le GIL pendant le calcul, ce qui permet
+    de vérifier plusieurs mots de passe en parallèle dans le pool de threads.
+
+    Args:
+        algorithm (str): 'scrypt' ou 'pbkdf2_sha256'
+        n, r, p (int): Paramètres de coût de scrypt
+        iterations (int): Nombre d'itérations de PBKDF2
+        workers (int): Nombre de threads de vérification
+    """
+
+    ALGORITHMS = ("scrypt", "pbkdf2_sha256")
+
+    def __init__(self, algorithm: str = "scrypt", n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P,
+                 iterations: int = PBKDF2_ITERATIONS, workers: int = 4) -> None:
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Algorithme de hachage inconnu : {algorithm!r}")
+        self.algorithm = algorithm
+        self.n, self.r, self.p = n, r, p
+        self.iterations = iterations
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    @staticmethod
+    def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        # scrypt utilise 128 * r * n octets ; maxmem par défaut d'OpenSSL (32 Mo) est trop juste au-delà de N=2^14
+        return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * r * n + 1024 * 1024, dklen=KEY_SIZE)
+
+    @staticmethod
+    def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_SIZE)
+
+    def hash(self, password: str) -> str:
+        """Hache un mot de passe avec un sel aléatoire et les paramètres de coût courants."""
+        with METRICS.timer("password_hash_seconds", algorithm=self.algorithm, operation="hash"):
+            return self._hash(password)
+
+    def _hash(self, password: str) -> str:
+        salt = os.urandom(SALT_SIZE)
+        if self.algorithm == "scrypt":
+            key = self._scrypt(password, salt, self.n, self.r, self.p)
+            return f"scrypt${self.n}${self.r}${self.p}${salt.hex()}${key.hex()}"
+        key = self._pbkdf2(password, salt, self.iterations)
+        return f"pbkdf2_sha256${self.iterations}${salt.hex()}${key.hex()}"
+
+    def hash_many(self, passwords) -> list:
+        """Hache plusieurs mots de passe en parallèle dans le pool, dans l'ordre reçu."""
+        return list(self._executor.map(self.hash, passwords))
+
+    def verify(self, password: str, stored: str) -> bool:
+        """Vérifie un mot de passe contre un hash stocké (nouveau format ou ancien SHA-256).
+
+        La comparaison est faite en temps constant.
+        """
+        if not stored:
+            return False
+        algorithm = "sha256" if is_legacy_hash(stored) else stored.split("$", 1)[0]
+        with METRICS.timer("password_hash_seconds", algorithm=algorithm, operation="verify"):
+            return self._verify(password, stored)
+
+    def _verify(self, password: str, stored: str) -> bool:
+        if is_legacy_hash(stored):
+            return hmac.compare_digest(legacy_hash(password), stored)
+        parts = stored.split("$")
+        try:
+            if parts[0] == "scrypt" and len(parts) == 6:
+                n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+                key = self._scrypt(password, bytes.fromhex(parts[4]), n, r, p)
+                return hmac.compare_digest(key.hex(), parts[5])
+            if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+                key = self._pbkdf2(password, bytes.fromhex(parts[2]), int(parts[1]))
+                return hmac.compare_digest(key.hex(), parts[3])
+        except ValueError:
+            pass
+        return False
+
+    def needs_rehash(self, stored: str) -> bool:
+        """Indique si le hash stocké doit être recalculé (ancien format ou paramètres de coût différents)."""
+        if is_legacy_hash(stored):
+            return True
+        parts = stored.split("$")
+        if self.algorithm == "scrypt":
+            return parts[0] != "scrypt" or parts[1:4] != [str(self.n), str(self.r), str(self.p)]
+        return parts[0] != "pbkdf2_sha256" or parts[1] != str(self.iterations)
+
+    def submit(self, fn, *args):
+        """Exécute `fn(*args)` dans le pool de vérification et renvoie un Future."""
+        return self._executor.submit(fn, *args)
+
+
+class SessionCache:
+    """Cache des connexions vérifiées récemment, pour ne pas recalculer le hash à chaque connexion.
+
+    Les clés sont un HMAC du couple (utilisateur, mot de passe) avec une clé aléatoire
+    propre au processus : aucun mot de passe n'est conservé en clair. Les entrées expirent
+    après `ttl` secondes et le cache est limité à `max_size` entrées (LRU).
+    """
+
+    def __init__(self, ttl: float = 300, max_size: int = 10_000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, username: str, password: str) -> bytes:
+        message = username.encode() + b"\x00" + password.encode()
+        return hmac.new(self._secret, message, hashlib.sha256).digest()
+
+    def get(self, username: str, password: str) -> dict:
+        """Renvoie l'utilisateur si ces identifiants ont été vérifiés il y a moins de `ttl` secondes."""
+        if self.ttl <= 0:
+            return None
+        key = self._key(username, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(user)
+
+    def put(self, username: str, password: str, user: dict) -> None:
+        if self.ttl <= 0:
+            return
+        key = self._key(username, password)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str) -> None:
+        """Oublie toutes les sessions de `username` (changement de mot de passe, de rôle, suppression)."""
+        with self._lock:
+            for key in [key for key, (_, user) in self._entries.items() if user["username"] == username]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
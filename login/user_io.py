@@ -0,0 +1,66 @@
+import os
+import csv
+import json
+
+FORMATS = ("csv", "jsonl")
+# Colonnes des fichiers d'export (et colonnes reconnues à l'import, avec 'password' en clair)
+EXPORT_FIELDS = ("id", "username", "password_hash", "role")
+
+
+def detect_format(path: str, format: str = None) -> str:
+    """Format d'un fichier d'utilisateurs, d'après `format` ou l'extension (.csv, .jsonl, .ndjson)."""
+    if format is None:
+        extension = os.path.splitext(path)[1].lower()
+        format = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+    if format not in FORMATS:
+        raise ValueError(f"Format de fichier d'utilisateurs non reconnu : {path} (csv ou jsonl attendu)")
+    return format
+
+
+def read_users(path: str, format: str = None):
+    """Lit un fichier d'utilisateurs ligne à ligne, sans le charger entièrement en mémoire.
+
+    Yields:
+        tuple: (numéro de ligne, dict des champs) ; le dict vaut None si la ligne est illisible
+    """
+    format = detect_format(path, format)
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if format == "csv":
+            for line_number, record in enumerate(csv.DictReader(file), start=2):
+                yield line_number, record
+            return
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            yield line_number, record if isinstance(record, dict) else None
+
+
+def write_users(path: str, rows, format: str = None) -> int:
+    """Écrit des utilisateurs (tuples dans l'ordre de EXPORT_FIELDS) au fil de l'eau.
+
+    Le fichier est écrit sous un nom temporaire puis renommé : une exportation
+    interrompue ne laisse pas de fichier partiel.
+
+    Returns:
+        int: Nombre d'utilisateurs écrits
+    """
+    format = detect_format(path, format)
+    temp_path = path + ".part"
+    count = 0
+    with open(temp_path, "w", encoding="utf-8", newline="") as file:
+        if format == "csv":
+            writer = csv.writer(file)
+            writer.writerow(EXPORT_FIELDS)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                file.write(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) + "\n")
+                count += 1
+    os.replace(temp_path, path)
+    return count
@@ -1,39 +1,134 @@
 import os
+import sys
+import json
+import time
 import logging
-from login.login import UserManager
-from login.menu import Menu
-from tools.tools import translate_input, translate_input_txt_files, ImageAnalyzer, ImageCompressor, imageAnalyzer_input, compress_images_in_directory
+import importlib
+from logging_config import setup_logging
 
-# Chemin de la base de données et des logs
+# Chemin de la base de données
 dossier_actuel = os.path.dirname(__file__)
 DB_PATH = os.path.join(dossier_actuel, 'data', 'app.sqlite3')
-chemin_log = os.path.join(dossier_actuel, 'logs', 'app.log')
-if not os.path.exists(os.path.join(dossier_actuel, 'logs')):
-    os.makedirs(os.path.join(dossier_actuel, 'logs'))
-    
-# Récupérer la clé API Google Translate depuis le fichier api_key.txt
 api_key_path = os.path.join(dossier_actuel, 'api_key.txt')
-with open(api_key_path, 'r') as file:
-    API_KEY = file.read().strip()
-
-logging.basicConfig(
-    filename=(chemin_log),
-    filemode="a",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(filename)s - %(message)s",
-    datefmt="%d/%m/%Y - %H:%M:%S",
-    encoding='utf-8'
-)
+
+# Modules chargés au démarrage, puis modules des outils chargés seulement à la première utilisation
+STARTUP_MODULES = ("data.db", "login.passwords", "login.user_io", "login.login", "login.menu")
+LAZY_MODULES = ("tools.tools", "tools.async_translate")
+
+
+def read_api_key() -> str:
+    """Récupère la clé API Google Translate depuis le fichier api_key.txt, au moment où elle sert."""
+    with open(api_key_path, 'r') as file:
+        return file.read().strip()
+
+
+def profile_startup(include_lazy: bool = True) -> list:
+    """Mesure le temps d'import de chaque module et d'initialisation, et l'affiche sur la sortie d'erreur.
+
+    Le temps d'import d'un module inclut celui de ses dépendances pas encore chargées.
+
+    Args:
+        include_lazy (bool): Mesurer aussi les modules des outils, normalement chargés à la demande
+
+    Returns:
+        list: (étape, durée en secondes)
+    """
+    timings = []
+
+    def measure(label: str, fn) -> None:
+        start = time.perf_counter()
+        fn()
+        timings.append((label, time.perf_counter() - start))
+
+    measure("setup_logging", setup_logging)
+    for name in STARTUP_MODULES:
+        measure(f"import {name}", lambda: importlib.import_module(name))
+    measure("UserManager(DB_PATH)", lambda: importlib.import_module("login.login").UserManager(DB_PATH))
+    if include_lazy:
+        for name in LAZY_MODULES:
+            measure(f"import {name} (à la demande)", lambda: importlib.import_module(name))
+
+    width = max(len(label) for label, _ in timings)
+    for label, seconds in timings:
+        print(f"{label:<{width}}  {seconds * 1000:8.1f} ms", file=sys.stderr)
+    startup = sum(seconds for label, seconds in timings if "(à la demande)" not in label)
+    print(f"{'démarrage':<{width}}  {startup * 1000:8.1f} ms", file=sys.stderr)
+    return timings
 
 class Application:
     def __init__(self):
+        from login.login import UserManager
+        from login.menu import Menu
+
+        # Le schéma de la base est créé ici, une seule fois
         self.user_manager = UserManager(DB_PATH)
         self.menu = Menu()
+        # Planificateur des tâches de fond, créé à la première tâche
+        self._scheduler = None
+
+    @property
+    def scheduler(self):
+        if self._scheduler is None:
+            from tools.jobs import JobScheduler
+            self._scheduler = JobScheduler(workers=2, on_finish=self._job_finished)
+        return self._scheduler
+
+    @staticmethod
+    def _job_finished(job) -> None:
+        from tools.tools import notify_task_done
+        from tools.jobs import STATUS_LABELS
+        notify_task_done(f"Tâche n°{job.id} ({job.name}) : {STATUS_LABELS[job.status]}")
+
+    def submit_job(self, argv: list, name: str) -> None:
+        """Lance une commande de cli.py en tâche de fond, avec la priorité choisie par l'utilisateur."""
+        priority = input("Priorité (0 normale, plus grand = plus urgent) [0] : ").strip()
+        try:
+            job = self.scheduler.submit(argv, name, int(priority) if priority else 0)
+        except ValueError as e:
+            print(f"Tâche refusée : {e}")
+            return
+        print(f"Tâche n°{job.id} lancée en arrière-plan (option 6 pour suivre son avancement).")
+
+    def show_jobs(self) -> None:
+        """Affiche les tâches récentes, leur avancement en direct ou le résultat de l'une d'elles."""
+        from tools.jobs import format_jobs
+        print(format_jobs(self.scheduler.list_jobs()))
+        choix = input("Numéro d'une tâche pour voir son résultat, 's' pour suivre en direct, Entrée pour revenir : ")
+        choix = choix.strip().lower()
+        if choix == "s":
+            try:
+                while self.scheduler.active():
+                    time.sleep(1)
+                    print("\n" + format_jobs(self.scheduler.list_jobs(limit=10)))
+                print("Toutes les tâches sont terminées.")
+            except KeyboardInterrupt:
+                print()
+        elif choix.isdigit():
+            job = self.scheduler.get(int(choix))
+            if job is None:
+                print("Tâche introuvable.")
+            else:
+                print(json.dumps({key: job[key] for key in ("name", "argv", "status", "error", "result")},
+                                 ensure_ascii=False, indent=2, default=str))
+
+    def cancel_job(self) -> None:
+        choix = input("Numéro de la tâche à annuler : ").strip()
+        if choix.isdigit() and self.scheduler.cancel(int(choix)):
+            print(f"Annulation de la tâche n°{choix} demandée.")
+        else:
+            print("Tâche introuvable ou déjà terminée.")
+
+    def stop_jobs(self) -> None:
+        """Annule les tâches de fond restantes avant la fermeture de l'application."""
+        if self._scheduler is None:
+            return
+        active = self._scheduler.active()
+        if active:
+            print(f"Annulation de {len(active)} tâche(s) en cours...")
+        self._scheduler.shutdown(cancel=True, timeout=30)
 
     def run(self):
         """Méthode principale qui démarre l'application et affiche les menus selon les rôles."""
-        self.user_manager.init_db()
-
         while True:
             self.menu.afficher_menu_connexion()
             choix = input("Choisissez une option : ")
@@ -46,7 +141,10 @@ class Application:
                     self.menu.afficher_menu(user['role'])
                     self.menu_actions(user)
             elif choix == "3":
+                self.stop_jobs()
                 print("Merci d'avoir utilisé l'application. Au revoir!")
+                from tools.metrics import METRICS
+                logging.info(f"Métriques de la session :\n{METRICS.format()}")
                 logging.info("Fermeture de l'application.")
                 break
             else:
@@ -72,7 +170,16 @@ class Application:
                     self.user_manager.get_user_by_id()
                 elif choix == "6":
                     self.user_manager.change_role()
+                elif choix == "7":
+                    self.menu.afficher_menu("user")
+                    self.menu_user_actions()
                 elif choix == "8":
+                    self.user_manager.search_users()
+                elif choix == "9":
+                    self.user_manager.import_users_input()
+                elif choix == "10":
+                    self.user_manager.export_users_input()
+                elif choix == "11":
                     break
                 else:
                     print("Option invalide, veuillez réessayer.")
@@ -81,28 +188,59 @@ class Application:
                 break
 
     def menu_user_actions(self):
-        """Méthode pour gérer les actions disponibles pour l'utilisateur."""
+        """Méthode pour gérer les actions disponibles pour l'utilisateur.
+
+        Les modules des outils (requests, Pillow, aiohttp...) ne sont importés qu'au choix de l'action.
+        Les traitements de dossiers (options 2 à 4) s'exécutent en tâches de fond : le menu reste
+        disponible pendant ce temps.
+        """
         while True:
 
             choix = input("Votre choix : ")
             if choix == "1":
-                translate_input(API_KEY)
+                from tools.tools import translate_input
+                translate_input(read_api_key())
             elif choix == "2":
-                translate_input_txt_files(API_KEY)
+                directory = input("Saisir le chemin du dossier contenant les fichiers .txt : ")
+                target_lang = input("Saisir la langue de traduction : ")
+                recursive = input("Inclure les sous-dossiers ? [o/N] : ").strip().lower() == "o"
+                argv = ["translate-dir", directory, "--target", target_lang] + (["--recursive"] if recursive else [])
+                self.submit_job(argv, f"traduction {os.path.basename(os.path.normpath(directory))}")
             elif choix == "3":
                 dossier_images = input("Chemin du dossier contenant les images : ")
-                db_path = os.path.join('data', 'imageAnalyzer.sqlite3')
-                imageAnalyzer_input(dossier_images, db_path)
+                recursive = input("Inclure les sous-dossiers ? [o/N] : ").strip().lower() == "o"
+                doublons = input("Rechercher les images similaires ? [o/N] : ").strip().lower() == "o"
+                argv = ["analyze", dossier_images] + (["--recursive"] if recursive else []) \
+                    + (["--near-duplicates"] if doublons else [])
+                self.submit_job(argv, f"analyse {os.path.basename(os.path.normpath(dossier_images))}")
             elif choix == "4":
                 input_folder = input("Saisir le chemin du dossier contenant les images à compresser : ")
-                quality = int(input("Saisir le niveau de qualité (1 à 100) : "))
-                compress_images_in_directory(input_folder, quality)
-                print("Compression des images terminée.")
+                quality = input("Saisir le niveau de qualité (1 à 100) : ").strip()
+                budget = input("Taille maximale par image en Ko (Entrée : qualité fixe) : ").strip()
+                argv = ["compress", input_folder, "--quality", quality] \
+                    + (["--max-bytes", str(int(budget) * 1024)] if budget.isdigit() else [])
+                self.submit_job(argv, f"compression {os.path.basename(os.path.normpath(input_folder))}")
             elif choix == "5":
+                from tools.async_translate import translate_input_async
+                translate_input_async(read_api_key())
+            elif choix == "6":
+                self.show_jobs()
+            elif choix == "7":
+                self.cancel_job()
+            elif choix == "8":
                 break
             else:
                 print("Option invalide, veuillez réessayer.")
 
 if __name__ == "__main__":
+    setup_logging()
+    argv = sys.argv[1:]
+    if "--profile-startup" in argv:
+        argv.remove("--profile-startup")
+        profile_startup()
+    # Avec des arguments, l'application s'exécute sans menus (voir cli.py)
+    if argv:
+        import cli
+        sys.exit(cli.main(argv))
     app = Application()
     app.run()
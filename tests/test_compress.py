@@ -0,0 +1,25 @@
+import os
+
+from benchmarks.image_corpus import make_image_corpus
+from tools.manifest import Manifest
+from tools.tools import ImageCompressor
+
+
+def test_incremental_compression_with_non_image(tmp_path):
+    input_folder = tmp_path / "photos"
+    make_image_corpus(str(input_folder), 2, (120, 80), "JPEG")
+    (input_folder / "notes.txt").write_text("pas une image", encoding="utf-8")
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"), table="compression_manifest")
+
+    compressor = ImageCompressor(str(input_folder), str(tmp_path / "sortie"), quality=60, manifest=manifest)
+    stats = compressor.compress_images_in_folder(workers=1)
+    assert stats["files"] == 3
+    assert stats["not_image"] == 1
+    assert stats["error"] == 0
+
+    entry = manifest.get(os.path.join(input_folder, "notes.txt"), compressor.variant)
+    assert entry["status"] == "not_image"
+    assert entry["content_hash"]
+
+    stats = compressor.compress_images_in_folder(workers=1)
+    assert stats["unchanged"] == 3
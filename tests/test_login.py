@@ -0,0 +1,32 @@
+from login.login import UserManager
+from login.passwords import PasswordHasher, is_legacy_hash, legacy_hash
+
+
+def _manager(db_path) -> UserManager:
+    # Coût réduit : le test porte sur la migration, pas sur la résistance du hash
+    return UserManager(str(db_path), hasher=PasswordHasher(n=2 ** 10, workers=1))
+
+
+def _stored_password(manager: UserManager, username: str) -> str:
+    return manager.db.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+
+def test_legacy_sha256_password_is_migrated_on_login(tmp_path):
+    db_path = tmp_path / "users.sqlite3"
+    manager = _manager(db_path)
+    with manager.db.db_connect() as cursor:
+        cursor.execute("INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
+                       ("alice", legacy_hash("secret"), "admin"))
+
+    assert manager.authenticate("alice", "mauvais") is None
+    assert is_legacy_hash(_stored_password(manager, "alice"))
+
+    assert manager.authenticate("alice", "secret") == {"username": "alice", "role": "admin"}
+    stored = _stored_password(manager, "alice")
+    assert stored.startswith("scrypt$")
+    assert not manager.hasher.needs_rehash(stored)
+
+    # Nouvelle instance : pas de cache de sessions, la vérification passe par le nouveau hash
+    manager = _manager(db_path)
+    assert manager.authenticate("alice", "secret") == {"username": "alice", "role": "admin"}
+    assert manager.authenticate("alice", "mauvais") is None
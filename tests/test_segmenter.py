@@ -0,0 +1,47 @@
+import random
+
+from tools.fileio import MappedFile
+from tools.segmenter import iter_segments
+
+
+def _text(seed: int) -> str:
+    rng = random.Random(seed)
+    words = ["alpha", "bêta", "gamma.", "delta!", "epsilon?", "zêta…", "«eta»", "theta"]
+    paragraphs = []
+    for _ in range(40):
+        sentences = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 60))) for _ in range(rng.randint(1, 8))]
+        paragraphs.append(". ".join(sentences))
+    separators = ["\n\n", "\n \n", "\n\n\n  ", "\n\t\n"]
+    return "".join(paragraph + rng.choice(separators) for paragraph in paragraphs)
+
+
+def _chunks(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_segments_round_trip_whatever_the_chunk_size():
+    for seed in range(5):
+        text = "  \n" + _text(seed) + "fin sans ponctuation"
+        for chunk_size in (1, 7, 100, 4096, len(text)):
+            pairs = list(iter_segments(_chunks(text, chunk_size), max_length=120))
+            assert "".join(segment + separator for segment, separator in pairs) == text
+            assert all(len(segment) <= 120 for segment, _ in pairs)
+
+
+def test_long_paragraph_is_cut_at_sentence_end():
+    text = "Première phrase assez longue. " * 10 + "Dernière."
+    pairs = list(iter_segments([text], max_length=100))
+    assert len(pairs) > 1
+    assert all(segment.endswith(".") for segment, _ in pairs)
+    assert "".join(segment + separator for segment, separator in pairs) == text
+
+
+def test_mapped_text_chunks_match_text_mode(tmp_path):
+    path = tmp_path / "texte.txt"
+    content = _text(1).replace("\n", "\r\n") + "é\r"
+    path.write_bytes(content.encode("utf-8"))
+    with open(path, "r", encoding="utf-8") as file:
+        expected = file.read()
+    for chunk_size in (1, 3, 64):
+        with MappedFile(str(path)) as source:
+            assert "".join(source.text_chunks("utf-8", chunk_size)) == expected
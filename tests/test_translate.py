@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+from benchmarks.mock_translate_server import running_mock_server
+from tools.async_translate import AsyncTranslateClient
+from tools.manifest import Manifest
+from tools.tools import Translate, TranslationError
+
+# Port fermé : chaque requête échoue immédiatement (connexion refusée)
+UNREACHABLE_URL = "http://127.0.0.1:9/translate"
+
+
+def _write_source(folder) -> str:
+    source = folder / "texte.txt"
+    source.write_text("Bonjour.\n\nComment allez-vous ?", encoding="utf-8")
+    (folder / "texte_traduit_en.txt").write_text("ancienne traduction", encoding="utf-8")
+    return str(source)
+
+
+def test_failed_batch_keeps_previous_output(tmp_path):
+    source = _write_source(tmp_path)
+    output = str(tmp_path / "texte_traduit_en.txt")
+    with Translate("test", url=UNREACHABLE_URL, max_retries=0) as translator:
+        try:
+            translator.translate_file(source, output, "en")
+        except TranslationError:
+            pass
+        else:
+            raise AssertionError("TranslationError attendue")
+    assert open(output, encoding="utf-8").read() == "ancienne traduction"
+    assert not os.path.exists(output + ".part")
+
+
+def test_failed_file_is_retried_on_next_run(tmp_path):
+    _write_source(tmp_path)
+    manifest = Manifest(str(tmp_path / "manifest.sqlite3"))
+    with Translate("test", url=UNREACHABLE_URL, max_retries=0) as translator:
+        summary = translator.translate_directory(str(tmp_path), "en", manifest=manifest)
+    assert summary["failed"] == 1 and summary["translated"] == 0
+    assert manifest.get(str(tmp_path / "texte.txt"), "en") is None
+
+    with running_mock_server(latency=0.0) as server, Translate("test", url=server.url) as translator:
+        summary = translator.translate_directory(str(tmp_path), "en", manifest=manifest)
+    assert summary["translated"] == 1
+    translated = open(tmp_path / "texte_traduit_en.txt", encoding="utf-8").read()
+    assert translated == "[en] Bonjour.\n\n[en] Comment allez-vous ?"
+
+
+def test_async_failed_batch_keeps_previous_output(tmp_path):
+    source = _write_source(tmp_path)
+    output = str(tmp_path / "texte_traduit_en.txt")
+
+    async def run() -> None:
+        async with AsyncTranslateClient("test", url=UNREACHABLE_URL, max_retries=0,
+                                        requests_per_second=100) as client:
+            await client.translate_file(source, output, "en")
+
+    try:
+        asyncio.run(run())
+    except TranslationError:
+        pass
+    else:
+        raise AssertionError("TranslationError attendue")
+    assert open(output, encoding="utf-8").read() == "ancienne traduction"
+    assert not os.path.exists(output + ".part")
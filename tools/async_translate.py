@@ -0,0 +1,332 @@
+"""Client de traduction asynchrone (asyncio + aiohttp) pour les gros volumes.
+
+Usage non interactif :
+    python -m tools.async_translate --target en --rate 10 fichier1.txt fichier2.txt
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+import argparse
+import aiohttp
+from tools.tools import Translate, TranslationError, TRANSLATE_URL, RETRY_STATUSES
+from tools.translation_cache import TranslationCache
+from tools.segmenter import iter_segments, make_batches
+from tools.fileio import MappedFile
+from tools.metrics import METRICS, LatencyHistogram
+
+dossier_actuel = os.path.dirname(__file__)
+dossier_parent = os.path.dirname(dossier_actuel)
+DEFAULT_API_KEY_PATH = os.path.join(dossier_parent, 'api_key.txt')
+
+
+class TokenBucket:
+    """Limiteur de débit à seau de jetons : `rate` jetons par seconde, rafales jusqu'à `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None) -> None:
+        if rate <= 0:
+            raise ValueError("Le débit du limiteur doit être strictement positif.")
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Attend que `tokens` jetons soient disponibles puis les consomme (ordre FIFO)."""
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class AsyncTranslateClient:
+    """Client asynchrone de l'API de traduction v2.
+
+    Les lots de segments sont envoyés en parallèle (au plus `max_in_flight` requêtes
+    simultanées), au rythme imposé par un seau de jetons calé sur le quota de l'API.
+    Les réponses 429/5xx et les erreurs réseau sont rejouées avec un backoff
+    exponentiel à gigue complète ; un lot n'est abandonné qu'après `max_retries`
+    tentatives, et le nombre de segments perdus est comptabilisé dans `stats`.
+
+    S'utilise comme gestionnaire de contexte asynchrone :
+        async with AsyncTranslateClient(api_key) as client:
+            await client.translate_segments(segments, "en")
+    """
+
+    def __init__(self, api_key: str, url: str = TRANSLATE_URL, requests_per_second: float = 10.0,
+                 burst: float = None, max_in_flight: int = 100, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 batch_size: int = Translate.MAX_SEGMENTS_PER_REQUEST, timeout: float = 30.0,
+                 cache: TranslationCache = None) -> None:
+        self.api_key = api_key
+        self.url = url
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = max(1, min(batch_size, Translate.MAX_SEGMENTS_PER_REQUEST))
+        self.timeout = timeout
+        self.cache = cache
+        self.histogram = LatencyHistogram()
+        self.stats = {"requests": 0, "retries": 0, "segments": 0, "failed_segments": 0}
+        self._session = None
+
+    async def __aenter__(self):
+        self._bucket = TokenBucket(self.requests_per_second, self.burst)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight)
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._session.close()
+        self._session = None
+
+    def _backoff(self, attempt: int, retry_after: str = None) -> float:
+        """Délai avant la tentative suivante : Retry-After s'il est fourni, sinon backoff exponentiel avec gigue."""
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def _translate_batch(self, batch: list, target_lang: str) -> list:
+        """Traduit un lot en une requête, avec rejeu des erreurs transitoires.
+
+        Returns:
+            list: Traductions dans l'ordre du lot, ou None pour chaque segment si le lot est abandonné
+        """
+        data = [('q', segment) for segment in batch] + [('target', target_lang), ('key', self.api_key)]
+        for attempt in range(self.max_retries + 1):
+            await self._bucket.acquire()
+            status, retry_after, translations, error = None, None, None, None
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    async with self._session.post(self.url, data=data) as response:
+                        status = response.status
+                        retry_after = response.headers.get('Retry-After')
+                        if status == 200:
+                            payload = await response.json(content_type=None)
+                            translations = [translation['translatedText']
+                                            for translation in payload['data']['translations']]
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    error = e
+                except (ValueError, KeyError, TypeError) as e:
+                    # Réponse 200 au contenu illisible : traitée comme une erreur non récupérable
+                    error = e
+                finally:
+                    elapsed = time.perf_counter() - start
+                    self.histogram.observe(elapsed)
+                    METRICS.observe("translate_request_seconds", elapsed, client="async")
+            self.stats["requests"] += 1
+            METRICS.inc("translate_requests_total", client="async", status=status or "error")
+
+            if translations is not None:
+                METRICS.inc("translate_bytes_total", sum(len(segment.encode()) for segment in batch), client="async")
+                return translations
+            if status is not None and status not in RETRY_STATUSES:
+                reason = f"Réponse invalide ({error!r})" if status == 200 else f"Erreur {status}"
+                logging.error(f"{reason} non récupérable lors de la traduction d'un lot de {len(batch)} segment(s)")
+                break
+            if attempt < self.max_retries:
+                self.stats["retries"] += 1
+                delay = self._backoff(attempt, retry_after)
+                logging.warning(f"Tentative {attempt + 1} échouée ({status or error}), nouvel essai dans {delay:.2f} s")
+                await asyncio.sleep(delay)
+
+        logging.error(f"Abandon de la traduction d'un lot de {len(batch)} segment(s) après {attempt + 1} tentative(s)")
+        self.stats["failed_segments"] += len(batch)
+        return [None] * len(batch)
+
+    async def translate_segments(self, segments: list, target_lang: str) -> list:
+        """Traduit une liste de segments, tous les lots étant envoyés simultanément.
+
+        Returns:
+            list: Traductions alignées sur `segments` (None pour un segment en échec)
+        """
+        if self.cache is not None:
+            results = await asyncio.to_thread(self.cache.get_many, segments, target_lang)
+        else:
+            results = [None] * len(segments)
+
+        pending = {}
+        for index, segment in enumerate(segments):
+            if results[index] is None:
+                pending.setdefault(segment, []).append(index)
+        unique_segments = list(pending)
+        batches = make_batches(unique_segments, self.batch_size, Translate.MAX_CHARS_PER_REQUEST)
+        self.stats["segments"] += len(segments)
+
+        outputs = await asyncio.gather(*(
+            self._translate_batch([unique_segments[i] for i in batch], target_lang) for batch in batches
+        ))
+        translated = []
+        for batch, translations in zip(batches, outputs):
+            for i, translation in zip(batch, translations):
+                if translation is None:
+                    continue
+                translated.append((unique_segments[i], translation))
+                for index in pending[unique_segments[i]]:
+                    results[index] = translation
+
+        if self.cache is not None and translated:
+            await asyncio.to_thread(self.cache.put_many, translated, target_lang)
+        return results
+
+    async def translate_file(self, file_path: str, output_path: str, target_lang: str,
+                             chunk_size: int = 64 * 1024) -> None:
+        """Traduit un fichier texte en streaming, par groupes de `batch_size * max_in_flight` segments.
+
+        Raises:
+            TranslationError: Si un segment n'a pas pu être traduit ; la sortie existante
+                n'est alors pas remplacée
+        """
+        group_size = self.batch_size * self.max_in_flight
+        part_path = output_path + ".part"
+
+        async def flush(group: list, translated_file) -> None:
+            segments = [s for s, _ in group if s]
+            translations = await self.translate_segments(segments, target_lang)
+            failed = translations.count(None)
+            if failed:
+                raise TranslationError(f"{failed} segment(s) sur {len(segments)} n'ont pas pu être traduits")
+            translations = iter(translations)
+            for segment, separator in group:
+                if segment:
+                    translated_file.write(next(translations))
+                translated_file.write(separator)
+
+        try:
+            with MappedFile(file_path) as source, open(part_path, 'w', encoding='utf-8') as translated_file:
+                group = []
+                for pair in iter_segments(source.text_chunks('utf-8', chunk_size), Translate.MAX_SEGMENT_LENGTH):
+                    group.append(pair)
+                    if len(group) >= group_size:
+                        await flush(group, translated_file)
+                        group = []
+                if group:
+                    await flush(group, translated_file)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, output_path)
+
+
+def translated_path(file_path: str, target_lang: str) -> str:
+    return os.path.splitext(file_path)[0] + f"_traduit_{target_lang}.txt"
+
+
+def translate_files(api_key: str, file_paths: list, target_lang: str, **options) -> dict:
+    """Traduit plusieurs fichiers avec le client asynchrone (point d'entrée synchrone).
+
+    Args:
+        api_key (str): Clé de l'API de traduction
+        file_paths (list): Fichiers .txt à traduire
+        target_lang (str): Langue cible pour la traduction
+        **options: Paramètres transmis à AsyncTranslateClient
+
+    Returns:
+        dict: Statistiques du client, nombre de fichiers en échec (sortie non remplacée),
+            durée totale et résumé des latences
+    """
+    failed_files = 0
+
+    async def run() -> AsyncTranslateClient:
+        nonlocal failed_files
+        async with AsyncTranslateClient(api_key, **options) as client:
+            results = await asyncio.gather(*(
+                client.translate_file(path, translated_path(path, target_lang), target_lang)
+                for path in file_paths
+            ), return_exceptions=True)
+            for path, result in zip(file_paths, results):
+                if isinstance(result, BaseException):
+                    if not isinstance(result, Exception):
+                        raise result
+                    failed_files += 1
+                    logging.error(f"Erreur lors de la traduction du fichier {path}: {result}")
+            return client
+
+    start = time.perf_counter()
+    client = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    logging.info(f"Traduction asynchrone de {len(file_paths)} fichier(s) en {target_lang} : {client.stats}")
+    return {
+        **client.stats,
+        "files": len(file_paths),
+        "failed_files": failed_files,
+        "seconds": elapsed,
+        "latency": client.histogram.summary(),
+        "histogram": client.histogram.format(),
+    }
+
+
+def translate_input_async(api_key: str):
+    """Gère la traduction asynchrone de fichiers volumineux saisis par l'utilisateur."""
+    paths = input("Saisir le(s) chemin(s) des fichiers .txt (séparés par des virgules) : ")
+    target_lang = input("Saisir la langue de traduction : ")
+    rate = input("Requêtes par seconde autorisées [10] : ").strip()
+
+    file_paths = [path.strip() for path in paths.split(",") if path.strip()]
+    result = translate_files(api_key, file_paths, target_lang,
+                             requests_per_second=float(rate) if rate else 10.0,
+                             cache=TranslationCache())
+    print(f"""
+        {result['files'] - result['failed_files']} fichier(s) traduit(s) en {target_lang} en {result['seconds']:.1f} s
+        Fichiers en échec : {result['failed_files']}
+        Requêtes : {result['requests']} (dont {result['retries']} nouvel(s) essai(s))
+        Segments en échec : {result['failed_segments']}
+
+{result['histogram']}
+    """)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Traduction asynchrone de fichiers .txt volumineux.")
+    parser.add_argument("files", nargs="+", help="fichiers .txt à traduire")
+    parser.add_argument("--target", required=True, help="langue cible (ex: en)")
+    parser.add_argument("--api-key-file", default=DEFAULT_API_KEY_PATH)
+    parser.add_argument("--url", default=TRANSLATE_URL)
+    parser.add_argument("--rate", type=float, default=10.0, help="requêtes par seconde")
+    parser.add_argument("--burst", type=float, default=None, help="taille maximale d'une rafale")
+    parser.add_argument("--max-in-flight", type=int, default=100)
+    parser.add_argument("--max-retries", type=int, default=5)
+    parser.add_argument("--no-cache", action="store_true", help="désactive la mémoire de traduction")
+    args = parser.parse_args(argv)
+
+    with open(args.api_key_file, 'r') as file:
+        api_key = file.read().strip()
+
+    result = translate_files(
+        api_key, args.files, args.target,
+        url=args.url,
+        requests_per_second=args.rate,
+        burst=args.burst,
+        max_in_flight=args.max_in_flight,
+        max_retries=args.max_retries,
+        cache=None if args.no_cache else TranslationCache()
+    )
+    print(result["histogram"])
+    print(f"{result['files']} fichier(s) dont {result['failed_files']} en échec, {result['segments']} segment(s), "
+          f"{result['requests']} requête(s), {result['retries']} nouvel(s) essai(s), {result['failed_segments']} segment(s) en échec, "
+          f"{result['seconds']:.2f} s")
+    return 1 if result["failed_segments"] or result["failed_files"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
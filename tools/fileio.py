@@ -0,0 +1,176 @@
+"""Lecture des fichiers d'entrée en une seule passe, par projection en mémoire (mmap).
+
+Un MappedFile expose le contenu d'un fichier sous forme d'un seul tampon, partagé par
+l'empreinte SHA-256 (détection des changements), le décodage Pillow et le découpage du
+texte en segments : chaque fichier n'est lu depuis le disque qu'une fois. Au-delà de
+MMAP_THRESHOLD, le fichier est projeté en mémoire plutôt que copié, et les pages ne sont
+lues qu'au moment où elles sont touchées.
+
+Les octets lus sont comptés par tâche (voir track_io) et dans les métriques ; peak_rss
+donne le pic de mémoire résidente du processus.
+"""
+import io
+import os
+import sys
+import mmap
+import codecs
+import hashlib
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from tools.metrics import METRICS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# En dessous de cette taille, une lecture simple coûte moins cher qu'une projection
+MMAP_THRESHOLD = 1024 * 1024
+
+
+class MappedFile:
+    """Contenu d'un fichier, projeté en mémoire s'il est volumineux, lu en une fois sinon.
+
+    Usage :
+        with MappedFile(path) as source:
+            digest = source.sha256()
+            with Image.open(source.stream()) as img:
+                ...
+    """
+
+    def __init__(self, path: str, threshold: int = MMAP_THRESHOLD, record: bool = True) -> None:
+        self.path = path
+        self.threshold = threshold
+        # False dans un processus fils : la lecture est alors rapportée par le parent
+        self.record = record
+        self.size = 0
+        self.mapped = False
+        self._file = None
+        self._mmap = None
+        self._data = None
+        self.buffer = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        try:
+            self.size = os.fstat(self._file.fileno()).st_size
+            if self.size and self.size >= self.threshold:
+                self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    self._mmap.madvise(mmap.MADV_SEQUENTIAL)
+                self.buffer = memoryview(self._mmap)
+                self.mapped = True
+            else:
+                self._data = self._file.read()
+                self.buffer = memoryview(self._data)
+        except BaseException:
+            self.close()
+            raise
+        if self.record:
+            record_read(self.size, self.mapped)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        if self.buffer is not None:
+            self.buffer.release()
+            self.buffer = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._data = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def sha256(self) -> str:
+        """Empreinte SHA-256 du contenu, calculée directement sur le tampon."""
+        return hashlib.sha256(self.buffer).hexdigest()
+
+    def stream(self):
+        """Objet fichier (read/seek/tell) sur le contenu, pour Image.open, sans copie du fichier projeté."""
+        if self._mmap is not None:
+            self._mmap.seek(0)
+            return self._mmap
+        return io.BytesIO(self._data)
+
+    def text_chunks(self, encoding: str = 'utf-8', chunk_size: int = 64 * 1024):
+        """Décode le contenu par morceaux de `chunk_size` octets (pour iter_segments).
+
+        Les fins de ligne sont normalisées en '\\n', comme à la lecture d'un fichier texte
+        ouvert avec open(..., 'r').
+        """
+        decoder = codecs.getincrementaldecoder(encoding)()
+        pending_cr = False
+        for start in range(0, self.size, chunk_size):
+            text = decoder.decode(self.buffer[start:start + chunk_size])
+            if pending_cr:
+                text = "\r" + text
+            pending_cr = text.endswith("\r")
+            if pending_cr:
+                text = text[:-1]
+            if text:
+                yield text.replace("\r\n", "\n").replace("\r", "\n")
+        text = decoder.decode(b"", final=True) + ("\r" if pending_cr else "")
+        if text:
+            yield text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class IOStats:
+    """Octets lus pendant une tâche, éventuellement répartis sur plusieurs threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.files = 0
+        self.bytes_read = 0
+        self.mapped_files = 0
+
+    def add(self, size: int, mapped: bool) -> None:
+        with self._lock:
+            self.files += 1
+            self.bytes_read += size
+            self.mapped_files += mapped
+
+    def summary(self) -> dict:
+        return {"files_read": self.files, "bytes_read": self.bytes_read, "mapped_files": self.mapped_files,
+                "peak_rss_bytes": peak_rss()}
+
+
+_current = ContextVar("io_stats", default=None)
+
+
+@contextmanager
+def track_io():
+    """Compte les octets lus par le code exécuté dans le bloc.
+
+    Les threads lancés dans le bloc n'en héritent que s'ils exécutent leur travail dans une
+    copie du contexte (contextvars.copy_context().run) ; les lectures faites dans des
+    processus fils sont rapportées par le processus parent avec record_read.
+    """
+    stats = IOStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def record_read(size: int, mapped: bool = False) -> None:
+    """Comptabilise la lecture d'un fichier dans les métriques et dans la tâche en cours."""
+    METRICS.inc("file_bytes_read_total", size, mode="mmap" if mapped else "read")
+    stats = _current.get()
+    if stats is not None:
+        stats.add(size, mapped)
+
+
+def peak_rss() -> int:
+    """Pic de mémoire résidente, en octets, du processus et de ses processus fils terminés (None si inconnu)."""
+    if resource is None:
+        return None
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unit
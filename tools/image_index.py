@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import logging
+import numpy as np
+from numbers import Rational
+from data.db import DB
+from tools.phash import MultiIndexHash, to_signed
+
+# Colonnes de la table images, dans l'ordre de UPSERT_SQL
+COLUMNS = ("path", "filename", "format", "width", "height", "file_size", "mtime", "mode",
+           "content_hash", "exif", "ahash", "dhash", "phash", "indexed_at")
+# Hashes perceptuels 64 bits, stockés en entiers signés (voir tools.phash.to_signed)
+PERCEPTUAL_HASHES = ("ahash", "dhash", "phash")
+
+
+def _json_default(value):
+    """Conversion des valeurs EXIF que json ne sait pas sérialiser (IFDRational, bytes...)."""
+    if isinstance(value, Rational):
+        return float(value) if value.denominator else None
+    if isinstance(value, bytes):
+        text = value.rstrip(b"\x00")
+        try:
+            decoded = text.decode("utf-8")
+            if decoded.isprintable():
+                return decoded
+        except UnicodeDecodeError:
+            pass
+        return value.hex()
+    return str(value)
+
+
+def exif_to_json(exif) -> str:
+    """Sérialise un dict EXIF en JSON interrogeable (NULL si l'image n'a pas d'EXIF)."""
+    if not isinstance(exif, dict) or not exif:
+        return None
+    return json.dumps(exif, default=_json_default, ensure_ascii=False)
+
+
+class ImageIndex:
+    """Index des images analysées, une ligne par chemin complet.
+
+    Les lignes sont mises à jour sur place (UPSERT) : relancer une analyse ne crée pas
+    de doublons, et seules les images nouvelles ou modifiées (date ou taille) sont
+    relues. L'EXIF est stocké en JSON et reste interrogeable avec json_extract.
+    """
+
+    # Une analyse sans hashes perceptuels ne remplace pas ceux déjà calculés, tant que
+    # le contenu de l'image n'a pas changé
+    UPSERT_SQL = f'''
+        INSERT INTO images ({", ".join(COLUMNS)})
+        VALUES ({", ".join("?" * len(COLUMNS))})
+        ON CONFLICT (path) DO UPDATE SET
+            {", ".join(
+                f"{column} = COALESCE(excluded.{column}, "
+                f"CASE WHEN images.content_hash = excluded.content_hash THEN images.{column} END)"
+                if column in PERCEPTUAL_HASHES else f"{column} = excluded.{column}"
+                for column in COLUMNS[1:]
+            )}
+    '''
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self.db = DB(db_path)
+        self.create_schema()
+
+    def create_schema(self) -> None:
+        """Création de la table images et de ses index ; l'ancienne table est conservée sous images_legacy."""
+        if self.db.ensure_schema("images", self._create_schema):
+            logging.info("Table 'images' créée avec succès.")
+
+    @staticmethod
+    def _create_schema(cursor) -> None:
+        cursor.execute("PRAGMA table_info(images)")
+        columns = {row[1] for row in cursor.fetchall()}
+        if columns and "path" not in columns:
+            cursor.execute("ALTER TABLE images RENAME TO images_legacy")
+            logging.info("Ancienne table 'images' renommée en 'images_legacy'.")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL UNIQUE,
+                filename TEXT NOT NULL,
+                format TEXT,
+                width INTEGER,
+                height INTEGER,
+                file_size INTEGER,
+                mtime REAL,
+                mode TEXT,
+                content_hash TEXT,
+                exif TEXT,
+                ahash INTEGER,
+                dhash INTEGER,
+                phash INTEGER,
+                indexed_at REAL
+            )
+        ''')
+        cursor.execute("PRAGMA table_info(images)")
+        columns = {row[1] for row in cursor.fetchall()}
+        for column in PERCEPTUAL_HASHES:
+            if column not in columns:
+                cursor.execute(f"ALTER TABLE images ADD COLUMN {column} INTEGER")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_format_width ON images (format, width)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_dimensions ON images (width, height)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_hash ON images (content_hash)")
+
+    def row(self, image_info: dict) -> tuple:
+        """Ligne de la table images correspondant aux informations d'une image."""
+        path = os.path.abspath(image_info.get("path") or image_info["filename"])
+        width, height = image_info["size (width, height)"]
+        return (
+            path,
+            image_info["filename"],
+            image_info.get("format"),
+            width,
+            height,
+            image_info["file_size"],
+            image_info.get("mtime"),
+            image_info.get("mode"),
+            image_info.get("content_hash"),
+            exif_to_json(image_info.get("exif")),
+            *(to_signed(image_info.get(column)) for column in PERCEPTUAL_HASHES),
+            time.time(),
+        )
+
+    def is_indexed(self, cursor, path: str, stat: os.stat_result, with_phash: bool = False) -> bool:
+        """Indique si `path` est déjà indexé avec la même date de modification et la même taille.
+
+        Avec `with_phash`, une image indexée sans hashes perceptuels est à relire.
+        """
+        cursor.execute("SELECT mtime, file_size, phash FROM images WHERE path = ?", (os.path.abspath(path),))
+        row = cursor.fetchone()
+        if row is None or row[0] != stat.st_mtime or row[1] != stat.st_size:
+            return False
+        return not with_phash or row[2] is not None
+
+    def remove_missing(self, folder: str) -> int:
+        """Supprime de l'index les images de `folder` qui n'existent plus sur le disque."""
+        prefix = os.path.join(os.path.abspath(folder), '')
+        with self.db.db_connect() as cursor:
+            cursor.execute("SELECT id, path FROM images WHERE path >= ? AND path < ?", (prefix, prefix + '\uffff'))
+            missing = [(image_id,) for image_id, path in cursor.fetchall() if not os.path.exists(path)]
+            cursor.executemany("DELETE FROM images WHERE id = ?", missing)
+        return len(missing)
+
+    def _query(self, sql: str, params: tuple = ()):
+        # Lecture en autocommit : aucune transaction n'est gardée ouverte pendant l'itération
+        cursor = self.db.execute(sql, params)
+        names = [description[0] for description in cursor.description]
+        for values in cursor:
+            image = dict(zip(names, values))
+            if image.get("exif"):
+                image["exif"] = json.loads(image["exif"])
+            yield image
+
+    def find(self, format: str = None, min_width: int = None, max_width: int = None,
+             min_height: int = None, max_height: int = None, limit: int = None):
+        """Recherche des images par format et dimensions.
+
+        Exemple : index.find(format="JPEG", min_width=4001) pour les JPEG de plus de 4000 px de large.
+
+        Yields:
+            dict: Lignes de l'index (EXIF décodé)
+        """
+        clauses, params = [], []
+        for clause, value in (("format = ?", format.upper() if format else None),
+                              ("width >= ?", min_width), ("width <= ?", max_width),
+                              ("height >= ?", min_height), ("height <= ?", max_height)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        sql = "SELECT * FROM images"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._query(sql, tuple(params))
+
+    def find_by_exif(self, tag: str, value):
+        """Recherche des images dont le champ EXIF `tag` vaut `value` (ex: "Model", "Canon EOS 5D")."""
+        return self._query("SELECT * FROM images WHERE json_extract(exif, ?) = ? ORDER BY id",
+                           (f'$."{tag}"', value))
+
+    def duplicates(self):
+        """Regroupe les images au contenu identique.
+
+        Yields:
+            tuple: (empreinte, liste des chemins) pour chaque contenu présent plusieurs fois
+        """
+        cursor = self.db.execute('''
+            SELECT content_hash, json_group_array(path) FROM images
+            WHERE content_hash IS NOT NULL
+            GROUP BY content_hash HAVING COUNT(*) > 1
+        ''')
+        for content_hash, paths in cursor:
+            yield content_hash, json.loads(paths)
+
+    def near_duplicates(self, max_distance: int = 6, kind: str = "phash"):
+        """Regroupe les images visuellement proches (redimensionnées, recompressées...).
+
+        Args:
+            max_distance (int): Distance de Hamming maximale entre deux hashes
+            kind (str): Hash perceptuel utilisé ('ahash', 'dhash' ou 'phash')
+
+        Yields:
+            tuple: (chemin_a, chemin_b, distance) pour chaque paire d'images proches
+        """
+        if kind not in PERCEPTUAL_HASHES:
+            raise ValueError(f"Hash perceptuel inconnu : {kind!r}")
+        rows = self.db.execute(f"SELECT path, {kind} FROM images WHERE {kind} IS NOT NULL ORDER BY id").fetchall()
+        if len(rows) < 2:
+            return
+        paths = [path for path, _ in rows]
+        index = MultiIndexHash(np.array([value for _, value in rows], dtype=np.int64), max_distance)
+        for i, j, distance in index.pairs():
+            yield paths[i], paths[j], distance
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM images").fetchone()[0]
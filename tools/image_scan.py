@@ -0,0 +1,158 @@
+import os
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from PIL import Image
+from PIL.ExifTags import TAGS
+from tools.manifest import iter_files
+from tools.fileio import MappedFile, record_read
+from tools.phash import compute_hashes
+from tools.metrics import METRICS
+
+# Pointeur vers le sous-répertoire EXIF (date de prise de vue, ISO, exposition...)
+EXIF_IFD_POINTER = 0x8769
+
+
+def image_extensions() -> set:
+    """Extensions de fichiers que Pillow sait ouvrir."""
+    Image.init()
+    return set(Image.registered_extensions())
+
+
+def iter_image_entries(folder: str, recursive: bool = False, extensions: set = None, skip_dirs: tuple = ()):
+    """Parcourt un dossier (récursivement si demandé) et renvoie les entrées os.scandir des images.
+
+    Args:
+        folder (str): Dossier à parcourir
+        recursive (bool): Descendre dans les sous-dossiers
+        extensions (set): Extensions retenues (toutes celles connues de Pillow si None)
+        skip_dirs (tuple): Noms de sous-dossiers à ignorer
+    """
+    extensions = extensions or image_extensions()
+    for entry in iter_files(folder, recursive, skip_dirs):
+        if os.path.splitext(entry.name)[1].lower() in extensions:
+            yield entry
+
+
+def iter_image_paths(folder: str, recursive: bool = False, extensions: set = None, skip_dirs: tuple = ()):
+    """Comme iter_image_entries, mais renvoie les chemins."""
+    for entry in iter_image_entries(folder, recursive, extensions, skip_dirs):
+        yield entry.path
+
+
+def _read_exif(img: Image.Image) -> dict:
+    """Lit les données EXIF déjà présentes dans l'en-tête, sans décoder les pixels."""
+    # Pour un PNG, getexif() décode toute l'image si le bloc eXIf n'a pas été vu dans l'en-tête
+    if img.format == "PNG" and "exif" not in img.info:
+        return None
+    exif = img.getexif()
+    if not exif:
+        return None
+    tags = dict(exif)
+    tags.update(exif.get_ifd(EXIF_IFD_POINTER))
+    return {TAGS.get(tag): value for tag, value in tags.items() if tag in TAGS}
+
+
+def read_image_metadata(image_path: str, with_hash: bool = False, with_phash: bool = False) -> dict:
+    """Lit les métadonnées d'une image à partir de son seul en-tête.
+
+    Image.open ne lit que l'en-tête : tant que load() n'est pas appelé, aucun pixel
+    n'est décodé. Si l'empreinte ou les hashes perceptuels sont demandés, le fichier est
+    lu une seule fois (tools.fileio.MappedFile) pour les deux. Fonction de module pour
+    pouvoir être exécutée dans un pool de processus.
+
+    Args:
+        image_path (str): Chemin de l'image
+        with_hash (bool): Calculer aussi l'empreinte SHA-256 du fichier (lecture complète, sans décodage)
+        with_phash (bool): Calculer aussi les hashes perceptuels (décodage à résolution réduite)
+
+    Returns:
+        dict: Informations de l'image (avec la durée de lecture `read_seconds`, les octets
+            lus en entier `bytes_read`, et `phash_seconds` pour les hashes perceptuels), ou
+            {"filename", "path", "error"} en cas d'échec
+    """
+    start = time.perf_counter()
+    try:
+        if with_hash or with_phash:
+            with MappedFile(image_path, record=False) as source, Image.open(source.stream()) as img:
+                return _read_metadata(image_path, img, start, source, with_hash, with_phash)
+        with Image.open(image_path) as img:
+            return _read_metadata(image_path, img, start, None, with_hash, with_phash)
+    except Exception as e:
+        return {"filename": os.path.basename(image_path), "path": image_path, "error": str(e)}
+
+
+def _read_metadata(image_path: str, img: Image.Image, start: float, source: MappedFile,
+                   with_hash: bool, with_phash: bool) -> dict:
+    """Corps de read_image_metadata, `img` étant ouvert sur le fichier ou sur son tampon `source`."""
+    exif = _read_exif(img)
+    stat = os.stat(image_path)
+    image_info = {
+        "filename": os.path.basename(image_path),
+        "path": image_path,
+        "format": img.format,
+        "size (width, height)": img.size,
+        "mode": img.mode,
+        "file_size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "content_hash": source.sha256() if with_hash else None,
+        "bytes_read": source.size if source else 0,
+        "mapped": source.mapped if source else False,
+        "exif": exif if exif else "No EXIF data",
+    }
+    image_info["read_seconds"] = time.perf_counter() - start
+    if with_phash:
+        start = time.perf_counter()
+        image_info.update(compute_hashes(img))
+        image_info["phash_seconds"] = time.perf_counter() - start
+    return image_info
+
+
+def scan_images(paths, workers: int = 8, use_processes: bool = False, window: int = None,
+                with_hash: bool = False, with_phash: bool = False):
+    """Lit les métadonnées d'une suite d'images en parallèle et les renvoie au fil de l'eau.
+
+    Au plus `window` lectures sont en cours à un instant donné : la mémoire utilisée ne
+    dépend pas du nombre de fichiers, et `paths` peut être un générateur.
+
+    Args:
+        paths: Itérable de chemins d'images
+        workers (int): Nombre de threads (ou de processus si `use_processes`)
+        use_processes (bool): Utiliser un pool de processus plutôt que de threads
+        window (int): Nombre maximal de lectures en vol (4 par worker si None)
+        with_hash (bool): Calculer aussi l'empreinte du contenu de chaque fichier
+        with_phash (bool): Calculer aussi les hashes perceptuels de chaque image
+
+    Yields:
+        dict: Métadonnées de chaque image, dans l'ordre de `paths`
+    """
+    window = window or workers * 4
+    for image_info in _scan(paths, workers, use_processes, window, with_hash, with_phash):
+        # Les durées sont mesurées dans le worker (thread ou processus) et enregistrées ici
+        if "error" in image_info:
+            METRICS.inc("image_read_errors_total")
+        else:
+            METRICS.observe("image_read_seconds", image_info["read_seconds"], hashed=with_hash)
+            METRICS.inc("image_bytes_read_total", image_info["file_size"])
+            if image_info["bytes_read"]:
+                record_read(image_info["bytes_read"], image_info["mapped"])
+            if with_phash:
+                METRICS.observe("image_decode_seconds", image_info["phash_seconds"], operation="phash")
+        yield image_info
+
+
+def _scan(paths, workers: int, use_processes: bool, window: int, with_hash: bool, with_phash: bool):
+    if use_processes:
+        # spawn plutôt que fork : l'analyse peut tourner dans un thread de tâche de fond (voir tools.jobs)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        pending = deque()
+        for path in paths:
+            pending.append(executor.submit(read_image_metadata, path, with_hash, with_phash))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
@@ -0,0 +1,382 @@
+"""Tâches de fond : traduction de dossiers, analyse et compression d'images sans bloquer les menus.
+
+Une tâche est une ligne de commande de cli.py (par exemple ["compress", "photos", "-q", "80"]),
+exécutée par un des workers du JobScheduler dans l'ordre des priorités (la plus grande
+d'abord, puis l'ordre d'arrivée). Les événements « progress » des commandes alimentent
+l'avancement (éléments traités, éléments/s, temps restant estimé) ; l'annulation est
+coopérative : elle prend effet au prochain élément traité. L'état des tâches est conservé
+dans SQLite pour consulter leurs résultats plus tard.
+
+    scheduler = JobScheduler(workers=2)
+    job = scheduler.submit(["analyze", "photos", "--recursive"], priority=1)
+    print(format_jobs(scheduler.list_jobs()))
+    scheduler.cancel(job.id)
+"""
+import os
+import json
+import time
+import heapq
+import logging
+import itertools
+import threading
+from data.db import DB
+from tools.fileio import track_io
+
+dossier_actuel = os.path.dirname(__file__)
+dossier_parent = os.path.dirname(dossier_actuel)
+DEFAULT_JOBS_PATH = os.path.join(dossier_parent, 'data', 'jobs.sqlite3')
+
+FINISHED = ("succeeded", "failed", "cancelled", "interrupted")
+# Intervalle minimal entre deux enregistrements de l'avancement d'une tâche
+PROGRESS_SAVE_INTERVAL = 1.0
+
+
+class JobCancelled(Exception):
+    """Levée dans le worker d'une tâche dont l'annulation a été demandée."""
+
+
+class Job:
+    """Une tâche de fond et son avancement."""
+
+    def __init__(self, job_id: int, name: str, argv: list, priority: int = 0, status: str = "queued",
+                 created_at: float = None) -> None:
+        self.id = job_id
+        self.name = name
+        self.argv = argv
+        self.priority = priority
+        self.status = status
+        self.created_at = created_at or time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = threading.Event()
+        self._saved_at = 0.0
+
+    @property
+    def items_per_sec(self) -> float:
+        if not self.started_at or not self.done:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> float:
+        """Temps restant estimé au débit actuel (None si le nombre total d'éléments est inconnu)."""
+        if self.status != "running" or not self.total or not self.items_per_sec:
+            return None
+        return max(0, self.total - self.done) / self.items_per_sec
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id, "name": self.name, "argv": self.argv, "priority": self.priority,
+            "status": self.status, "done": self.done, "total": self.total,
+            "items_per_sec": self.items_per_sec, "eta_seconds": self.eta_seconds,
+            "created_at": self.created_at, "started_at": self.started_at, "finished_at": self.finished_at,
+            "result": self.result, "error": self.error,
+        }
+
+
+class _JobEvents:
+    """Reçoit les événements d'une commande de cli.py à la place de l'EventWriter."""
+
+    def __init__(self, scheduler, job: Job) -> None:
+        self.scheduler = scheduler
+        self.job = job
+
+    def emit(self, event: str, job: str = None, **fields) -> None:
+        if self.job.cancel_requested.is_set():
+            raise JobCancelled()
+        if event == "progress":
+            self.job.done = fields.get("done", self.job.done + 1)
+            self.job.total = fields.get("total", self.job.total)
+            self.scheduler._save_progress(self.job)
+
+
+def run_cli_job(job: Job, events) -> dict:
+    """Exécute la commande de cli.py d'une tâche et renvoie son résumé."""
+    import cli
+
+    args = parse_job_args(job.argv)
+    try:
+        with track_io() as io_stats:
+            summary = args.handler(args, events, job.name)
+    except cli.CommandError as e:
+        raise ValueError(str(e)) from e
+    summary["io"] = io_stats.summary()
+    return summary
+
+
+def parse_job_args(argv: list):
+    """Analyse la ligne de commande d'une tâche.
+
+    Raises:
+        ValueError: Si les arguments sont invalides ou désignent une commande non prise en charge
+    """
+    import cli
+
+    try:
+        args = cli.build_parser().parse_args(argv)
+    except SystemExit:
+        raise ValueError(f"Arguments invalides : {' '.join(argv)}") from None
+    if args.command in ("run", "users"):
+        raise ValueError(f"La commande {args.command} ne peut pas être lancée en tâche de fond")
+    return args
+
+
+class JobScheduler:
+    """File de tâches à priorités, exécutées par un groupe de threads.
+
+    Args:
+        db_path (str): Base SQLite où l'état des tâches est conservé
+        workers (int): Nombre de tâches exécutées simultanément
+        runner: Fonction (Job, events) -> dict qui exécute une tâche (commandes de cli.py par défaut)
+        on_finish: Fonction appelée avec chaque tâche terminée (réussie, en échec ou annulée)
+    """
+
+    _COLUMNS = "id, name, argv, priority, status, done, total, created_at, started_at, finished_at, result, error"
+
+    def __init__(self, db_path: str = DEFAULT_JOBS_PATH, workers: int = 2, runner=run_cli_job,
+                 on_finish=None) -> None:
+        self.db = DB(db_path)
+        self.workers = max(1, workers)
+        self.runner = runner
+        self.on_finish = on_finish
+        self._queue = []
+        self._order = itertools.count()
+        self._jobs = {}
+        self._condition = threading.Condition()
+        self._threads = []
+        self._closed = False
+        self._create_table()
+        self._mark_interrupted()
+
+    def _create_table(self) -> None:
+        """Création de la table des tâches si elle n'existe pas déjà."""
+        def create(cursor) -> None:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    argv TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    result TEXT,
+                    error TEXT
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)')
+
+        if self.db.ensure_schema("jobs", create):
+            logging.info("Table 'jobs' initialisée avec succès.")
+
+    def _mark_interrupted(self) -> None:
+        """Les tâches restées en cours ou en attente à la fermeture précédente ne reprendront pas."""
+        with self.db.db_connect() as cursor:
+            cursor.execute("UPDATE jobs SET status = 'interrupted', finished_at = ? "
+                           "WHERE status IN ('queued', 'running')", (time.time(),))
+            if cursor.rowcount:
+                logging.warning(f"{cursor.rowcount} tâche(s) interrompue(s) lors de la session précédente.")
+
+    def _start_workers(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads) + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, argv: list, name: str = None, priority: int = 0) -> Job:
+        """Ajoute une tâche à la file.
+
+        Args:
+            argv (list): Ligne de commande de cli.py (sans le nom du programme)
+            name (str): Nom affiché (la commande et son premier argument par défaut)
+            priority (int): Les tâches de plus grande priorité démarrent en premier
+
+        Returns:
+            Job: La tâche, en attente
+
+        Raises:
+            ValueError: Si la ligne de commande est invalide
+        """
+        argv = [str(arg) for arg in argv]
+        if self.runner is run_cli_job:
+            parse_job_args(argv)
+        name = name or " ".join(argv[:2])
+        created_at = time.time()
+        cursor = self.db.execute(
+            "INSERT INTO jobs (name, argv, priority, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+            (name, json.dumps(argv, ensure_ascii=False), priority, created_at)
+        )
+        job = Job(cursor.lastrowid, name, argv, priority, created_at=created_at)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Le planificateur de tâches est arrêté")
+            self._jobs[job.id] = job
+            heapq.heappush(self._queue, (-priority, next(self._order), job))
+            self._start_workers()
+            self._condition.notify()
+        logging.info(f"Tâche {job.id} ({name}) ajoutée, priorité {priority}.")
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Annule une tâche en attente, ou demande l'arrêt d'une tâche en cours.
+
+        Returns:
+            bool: False si la tâche est inconnue ou déjà terminée
+        """
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job is None or job.status in FINISHED:
+                return False
+            job.cancel_requested.set()
+            if job.status == "queued":
+                self._queue = [item for item in self._queue if item[2] is not job]
+                heapq.heapify(self._queue)
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                self._condition.notify_all()
+        if job.status == "cancelled":
+            self._save(job)
+            logging.info(f"Tâche {job.id} annulée avant son démarrage.")
+        else:
+            logging.info(f"Annulation de la tâche {job.id} demandée.")
+        return True
+
+    def get(self, job_id: int) -> dict:
+        """État d'une tâche de cette session ou d'une session précédente (None si inconnue)."""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        row = self.db.execute(f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list_jobs(self, limit: int = 20, status: str = None) -> list:
+        """Tâches les plus récentes d'abord ; l'avancement des tâches de la session est celui en mémoire."""
+        sql = f"SELECT {self._COLUMNS} FROM jobs"
+        params = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        rows = self.db.execute(sql + " ORDER BY id DESC LIMIT ?", (*params, limit)).fetchall()
+        return [self._jobs[row[0]].to_dict() if row[0] in self._jobs else self._row_to_dict(row) for row in rows]
+
+    def active(self) -> list:
+        """Tâches de la session en attente ou en cours."""
+        with self._condition:
+            return [job for job in self._jobs.values() if job.status in ("queued", "running")]
+
+    def wait(self, timeout: float = None) -> bool:
+        """Attend la fin de toutes les tâches de la session.
+
+        Returns:
+            bool: False si le délai a expiré avant
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while any(job.status in ("queued", "running") for job in self._jobs.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, cancel: bool = False, timeout: float = None) -> None:
+        """Arrête les workers, après avoir annulé les tâches restantes si `cancel`, sinon après les avoir terminées."""
+        if cancel:
+            for job in self.active():
+                self.cancel(job.id)
+        self.wait(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    @staticmethod
+    def _row_to_dict(row) -> dict:
+        job = Job(row[0], row[1], json.loads(row[2]), row[3], row[4], row[7])
+        job.done, job.total, job.started_at, job.finished_at = row[5], row[6], row[8], row[9]
+        job.result = json.loads(row[10]) if row[10] else None
+        job.error = row[11]
+        return job.to_dict()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                _, _, job = heapq.heappop(self._queue)
+                job.status = "running"
+                job.started_at = time.time()
+            self._save(job)
+            logging.info(f"Démarrage de la tâche {job.id} ({job.name}).")
+            try:
+                job.result = self.runner(job, _JobEvents(self, job))
+                job.status = "succeeded"
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                logging.exception(f"Échec de la tâche {job.id} ({job.name})")
+                job.status = "failed"
+                job.error = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+            job.finished_at = time.time()
+            self._save(job)
+            logging.info(f"Tâche {job.id} ({job.name}) : {job.status} en {job.finished_at - job.started_at:.1f} s.")
+            if self.on_finish:
+                try:
+                    self.on_finish(job)
+                except Exception:
+                    logging.exception(f"Erreur après la fin de la tâche {job.id}")
+            with self._condition:
+                self._condition.notify_all()
+
+    def _save_progress(self, job: Job) -> None:
+        now = time.time()
+        if now - job._saved_at >= PROGRESS_SAVE_INTERVAL:
+            self._save(job)
+
+    def _save(self, job: Job) -> None:
+        job._saved_at = time.time()
+        self.db.execute(
+            "UPDATE jobs SET status = ?, done = ?, total = ?, started_at = ?, finished_at = ?, result = ?, error = ? "
+            "WHERE id = ?",
+            (job.status, job.done, job.total, job.started_at, job.finished_at,
+             json.dumps(job.result, ensure_ascii=False, default=str) if job.result is not None else None,
+             job.error, job.id)
+        )
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+STATUS_LABELS = {"queued": "en attente", "running": "en cours", "succeeded": "terminée", "failed": "en échec",
+                 "cancelled": "annulée", "interrupted": "interrompue"}
+
+
+def format_jobs(jobs: list) -> str:
+    """Tableau texte des tâches : état, avancement, débit et temps restant estimé."""
+    if not jobs:
+        return "Aucune tâche."
+    lines = [f"{'n°':>4}  {'tâche':<32} {'état':<12} {'avancement':>12} {'élém./s':>8} {'reste':>9}  prio"]
+    for job in jobs:
+        progress = f"{job['done']}/{job['total']}" if job["total"] else str(job["done"])
+        lines.append(f"{job['id']:>4}  {job['name'][:32]:<32} {STATUS_LABELS.get(job['status'], job['status']):<12} "
+                     f"{progress:>12} {job['items_per_sec']:>8.1f} {_format_duration(job['eta_seconds']):>9}  "
+                     f"{job['priority']:>4}")
+        if job["error"]:
+            lines.append(f"      erreur : {job['error']}")
+    return "\n".join(lines)
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import logging
+from data.db import DB
+from tools.fileio import MappedFile
+
+dossier_actuel = os.path.dirname(__file__)
+dossier_parent = os.path.dirname(dossier_actuel)
+DEFAULT_MANIFEST_PATH = os.path.join(dossier_parent, 'data', 'manifest.sqlite3')
+
+
+def file_hash(path: str) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier (projeté en mémoire s'il est volumineux)."""
+    with MappedFile(path) as source:
+        return source.sha256()
+
+
+class Manifest:
+    """Journal des fichiers déjà traités, pour ne retraiter que ce qui a changé.
+
+    Chaque entrée est indexée par (chemin source, variante) ; la variante décrit le
+    traitement appliqué (langue cible, réglages de compression...). Un fichier est
+    considéré à jour si sa sortie existe encore et que sa date de modification et
+    sa taille n'ont pas bougé, ou à défaut que son contenu a la même empreinte.
+    Un traitement qui produit plusieurs fichiers les enregistre tous (`outputs`) : le
+    fichier est retraité dès que l'un d'eux manque.
+    """
+
+    KEYS = ("mtime", "size", "content_hash", "output_path", "output_size", "status", "outputs")
+
+    def __init__(self, db_path: str = DEFAULT_MANIFEST_PATH, table: str = 'manifest') -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Nom de table invalide : {table!r}")
+        self.db_path = db_path
+        self.table = table
+        self.db = DB(db_path)
+        self._create_table()
+
+    def _create_table(self) -> None:
+        """Création de la table du manifeste si elle n'existe pas déjà."""
+        def create(cursor) -> None:
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    path TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    output_path TEXT,
+                    output_size INTEGER,
+                    status TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    outputs TEXT,
+                    PRIMARY KEY (path, variant)
+                )
+            ''')
+            # Manifestes créés avant l'enregistrement de toutes les sorties d'un fichier
+            cursor.execute(f"PRAGMA table_info({self.table})")
+            if "outputs" not in {row[1] for row in cursor.fetchall()}:
+                cursor.execute(f"ALTER TABLE {self.table} ADD COLUMN outputs TEXT")
+
+        if self.db.ensure_schema(self.table, create):
+            logging.info(f"Table '{self.table}' initialisée avec succès.")
+
+    def get(self, path: str, variant: str) -> dict:
+        """Renvoie l'entrée du manifeste pour (path, variant), ou None."""
+        with self.db.db_connect() as cursor:
+            cursor.execute(f'''
+                SELECT {", ".join(self.KEYS)}
+                FROM {self.table} WHERE path = ? AND variant = ?
+            ''', (os.path.abspath(path), variant))
+            row = cursor.fetchone()
+        return dict(zip(self.KEYS, row)) if row else None
+
+    def entries(self, variant: str, directory: str) -> dict:
+        """Charge en une requête les entrées de `variant` situées sous `directory`.
+
+        Returns:
+            dict: Entrées indexées par chemin absolu
+        """
+        prefix = os.path.join(os.path.abspath(directory), '')
+        with self.db.db_connect() as cursor:
+            cursor.execute(f'''
+                SELECT path, {", ".join(self.KEYS)}
+                FROM {self.table} WHERE variant = ? AND path >= ? AND path < ?
+            ''', (variant, prefix, prefix + '\uffff'))
+            return {row[0]: dict(zip(self.KEYS, row[1:])) for row in cursor.fetchall()}
+
+    def is_up_to_date(self, path: str, variant: str, stat: os.stat_result = None, entry: dict = None) -> bool:
+        """Indique si `path` a déjà été traité pour `variant` et n'a pas changé depuis.
+
+        Args:
+            path (str): Fichier source
+            variant (str): Traitement appliqué
+            stat (os.stat_result): Résultat de stat déjà connu (par exemple via os.scandir)
+            entry (dict): Entrée déjà chargée avec `entries` (lue dans la base si None)
+
+        Returns:
+            bool: True si le fichier peut être ignoré
+        """
+        entry = entry or self.get(path, variant)
+        if entry is None:
+            return False
+        outputs = json.loads(entry["outputs"]) if entry.get("outputs") else [entry["output_path"]]
+        if not all(os.path.exists(output) for output in outputs if output):
+            return False
+
+        stat = stat or os.stat(path)
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["mtime"] == stat.st_mtime:
+            return True
+
+        # Fichier touché mais peut-être pas modifié : on tranche sur le contenu
+        if entry["content_hash"] != file_hash(path):
+            return False
+        with self.db.db_connect() as cursor:
+            cursor.execute(f"UPDATE {self.table} SET mtime = ? WHERE path = ? AND variant = ?",
+                           (stat.st_mtime, os.path.abspath(path), variant))
+        return True
+
+    def record(self, path: str, variant: str, output_path: str = None, output_size: int = None,
+               status: str = 'done', stat: os.stat_result = None, content_hash: str = None) -> None:
+        """Enregistre (ou remplace) l'entrée d'un fichier traité."""
+        stat = stat or os.stat(path)
+        self.record_many([{
+            "path": path, "variant": variant, "mtime": stat.st_mtime, "size": stat.st_size,
+            "content_hash": content_hash or file_hash(path), "output_path": output_path,
+            "output_size": output_size, "status": status,
+        }])
+
+    def record_many(self, entries: list) -> None:
+        """Enregistre plusieurs entrées en une seule transaction.
+
+        Args:
+            entries (list): dicts avec les clés path, variant, mtime, size, content_hash,
+                output_path, output_size et status, et éventuellement outputs (liste de
+                tous les fichiers produits)
+        """
+        now = time.time()
+        with self.db.db_connect() as cursor:
+            cursor.executemany(f'''
+                INSERT OR REPLACE INTO {self.table}
+                    (path, variant, mtime, size, content_hash, output_path, output_size, status, updated_at, outputs)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                os.path.abspath(entry["path"]), entry["variant"], entry["mtime"], entry["size"],
+                entry["content_hash"], os.path.abspath(entry["output_path"]) if entry.get("output_path") else None,
+                entry.get("output_size"), entry.get("status", "done"), now,
+                json.dumps([os.path.abspath(output) for output in entry["outputs"]]) if entry.get("outputs") else None
+            ) for entry in entries])
+
+
+def iter_files(directory: str, recursive: bool = False, skip_dirs: tuple = ()):
+    """Parcourt un dossier avec os.scandir et renvoie les entrées de fichiers.
+
+    Args:
+        directory (str): Dossier à parcourir
+        recursive (bool): Descendre dans les sous-dossiers
+        skip_dirs (tuple): Noms de sous-dossiers à ignorer (par exemple un dossier de sortie)
+
+    Yields:
+        os.DirEntry: Entrées de fichiers, dont le stat est mis en cache par scandir
+    """
+    with os.scandir(directory) as entries:
+        subdirs = []
+        for entry in entries:
+            if entry.is_file():
+                yield entry
+            elif recursive and entry.is_dir(follow_symlinks=False) and entry.name not in skip_dirs:
+                subdirs.append(entry.path)
+    for subdir in subdirs:
+        yield from iter_files(subdir, recursive, skip_dirs)
@@ -0,0 +1,204 @@
+"""Instrumentation : compteurs et histogrammes de durées, résumé par exécution et export.
+
+Les modules instrumentés enregistrent leurs mesures dans le registre global METRICS :
+    with METRICS.timer("translate_request_seconds", client="sync"):
+        ...
+    METRICS.inc("image_bytes_read_total", stat.st_size)
+
+Le registre produit un résumé (nombre, débit, p50/p95/p99) et s'exporte au format texte
+de Prometheus ou en JSON (voir dump).
+"""
+import json
+import time
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+
+class LatencyHistogram:
+    """Histogramme de latences à seaux fixes (en millisecondes)."""
+
+    BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = next((i for i, bound in enumerate(self.BOUNDS_MS) if ms <= bound), len(self.BOUNDS_MS))
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> float:
+        """Estimation du percentile `q` (0-100) : borne haute du seau qui le contient."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if index < len(self.BOUNDS_MS):
+                    return min(self.BOUNDS_MS[index], self.max_ms)
+                return self.max_ms
+        return self.max_ms
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "min_ms": self.min_ms or 0.0,
+            "max_ms": self.max_ms or 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+        }
+
+    def format(self, width: int = 40) -> str:
+        """Représentation texte de l'histogramme, une ligne par seau non vide."""
+        labels = [f"<= {bound} ms" for bound in self.BOUNDS_MS] + [f"> {self.BOUNDS_MS[-1]} ms"]
+        peak = max(self.counts) or 1
+        lines = [
+            f"{label:>12} | {'#' * max(1, round(count / peak * width)):<{width}} {count}"
+            for label, count in zip(labels, self.counts) if count
+        ]
+        summary = self.summary()
+        lines.append(f"requêtes: {summary['count']}  moyenne: {summary['mean_ms']:.1f} ms  "
+                     f"p50: {summary['p50_ms']:.0f} ms  p95: {summary['p95_ms']:.0f} ms  "
+                     f"p99: {summary['p99_ms']:.0f} ms")
+        return "\n".join(lines)
+
+
+def _format_value(value) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.6g}"
+
+
+def _series_name(name: str, labels: tuple) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Registre thread-safe de compteurs et d'histogrammes, identifiés par nom et étiquettes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Incrémente un compteur (nombre d'appels, octets traités...)."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Enregistre une durée dans l'histogramme `name`."""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Mesure la durée du bloc, y compris s'il lève une exception."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        """Décorateur : mesure la durée de chaque appel de la fonction."""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+            self._started = time.perf_counter()
+
+    def summary(self) -> dict:
+        """Résumé de l'exécution : débit et percentiles de chaque histogramme, valeur de chaque compteur."""
+        elapsed = time.perf_counter() - self._started
+        with self._lock:
+            timers = {}
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                summary = histogram.summary()
+                summary["total_seconds"] = histogram.total_ms / 1000
+                summary["per_sec"] = histogram.count / elapsed if elapsed else 0.0
+                timers[_series_name(name, labels)] = summary
+            counters = {_series_name(name, labels): value for (name, labels), value in sorted(self._counters.items())}
+        return {"started_at": self.started_at, "elapsed_seconds": elapsed, "timers": timers, "counters": counters}
+
+    def format(self) -> str:
+        """Résumé texte, une ligne par mesure."""
+        summary = self.summary()
+        lines = [f"durée de l'exécution : {summary['elapsed_seconds']:.1f} s"]
+        for name, timer in summary["timers"].items():
+            lines.append(f"{name} : {timer['count']} ({timer['per_sec']:.1f}/s)  moyenne {timer['mean_ms']:.2f} ms  "
+                         f"p50 {timer['p50_ms']:.3g} ms  p95 {timer['p95_ms']:.3g} ms  p99 {timer['p99_ms']:.3g} ms")
+        for name, value in summary["counters"].items():
+            lines.append(f"{name} : {_format_value(value)}")
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        """Export au format texte de Prometheus (histogrammes en secondes, seaux cumulés)."""
+        lines = []
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        declared = set()
+        for (name, labels), histogram in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, count in zip(LatencyHistogram.BOUNDS_MS, histogram.counts):
+                cumulative += count
+                lines.append(f"{_series_name(name + '_bucket', labels + (('le', f'{bound / 1000:g}'),))} {cumulative}")
+            lines.append(f"{_series_name(name + '_bucket', labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{_series_name(name + '_sum', labels)} {histogram.total_ms / 1000:.6f}")
+            lines.append(f"{_series_name(name + '_count', labels)} {histogram.count}")
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{_series_name(name, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), ensure_ascii=False, indent=2)
+
+    def dump(self, path: str) -> None:
+        """Écrit les métriques dans `path` : JSON si l'extension est .json, format Prometheus sinon."""
+        content = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+
+# Registre global de l'application
+METRICS = MetricsRegistry()
@@ -0,0 +1,159 @@
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+# Côté de l'image réduite sur laquelle est calculée la DCT du pHash
+PHASH_SIZE = 32
+_UINT64_MASK = (1 << 64) - 1
+# Nombre de bits à 1 de chaque octet, pour compter les bits sans np.bitwise_count (NumPy < 2)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _dct_matrix(size: int) -> np.ndarray:
+    """Matrice de la DCT-II orthonormée : dct(x) = M @ x."""
+    k = np.arange(size)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.sqrt(2 / size) * np.cos(np.pi * (2 * n + 1) * k / (2 * size))
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
+
+def _grayscale(img: Image.Image, size: tuple) -> np.ndarray:
+    return np.asarray(img.convert("L").resize(size, Image.Resampling.BOX), dtype=np.float32)
+
+
+def ahash(img: Image.Image) -> int:
+    """Hash moyen : chaque bit indique si le pixel de la vignette 8x8 dépasse la moyenne."""
+    pixels = _grayscale(img, (HASH_SIZE, HASH_SIZE))
+    return _bits_to_int(pixels > pixels.mean())
+
+
+def dhash(img: Image.Image) -> int:
+    """Hash différentiel : chaque bit compare un pixel de la vignette 9x8 à son voisin de gauche."""
+    pixels = _grayscale(img, (HASH_SIZE + 1, HASH_SIZE))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(img: Image.Image) -> int:
+    """Hash perceptuel : signe des basses fréquences de la DCT 32x32 par rapport à leur médiane."""
+    pixels = _grayscale(img, (PHASH_SIZE, PHASH_SIZE))
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE]
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def compute_hashes(img: Image.Image) -> dict:
+    """Calcule aHash, dHash et pHash à partir d'un seul décodage.
+
+    Pour un JPEG, draft() fait décoder l'image directement à une résolution réduite.
+    """
+    img.draft("L", (PHASH_SIZE * 2, PHASH_SIZE * 2))
+    gray = img.convert("L")
+    return {"ahash": ahash(gray), "dhash": dhash(gray), "phash": phash(gray)}
+
+
+def to_signed(value: int) -> int:
+    """Convertit un hash 64 bits non signé en entier signé stockable dans une colonne INTEGER SQLite."""
+    if value is None:
+        return None
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return None if value is None else value & _UINT64_MASK
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Nombre de bits à 1 de chaque élément d'un tableau uint64."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(*values.shape, 8).sum(axis=-1)
+
+
+def hamming_distances(query: int, hashes: np.ndarray) -> np.ndarray:
+    """Distances de Hamming entre `query` et chaque hash du tableau (calcul vectorisé)."""
+    return popcount64(np.bitwise_xor(hashes, np.uint64(query)))
+
+
+class MultiIndexHash:
+    """Recherche des hashes proches (distance de Hamming <= max_distance) sans comparer toutes les paires.
+
+    Indexation multiple : les 64 bits sont découpés en max_distance + 1 tranches. Par le
+    principe des tiroirs, deux hashes à distance <= max_distance ont au moins une tranche
+    identique ; on ne vérifie donc que les hashes qui partagent une tranche avec la requête.
+    Chaque table est un tableau trié interrogé par np.searchsorted.
+    """
+
+    def __init__(self, hashes, max_distance: int = 6) -> None:
+        if not isinstance(hashes, np.ndarray):
+            hashes = np.fromiter((to_unsigned(int(h)) for h in hashes), dtype=np.uint64)
+        # Un tableau int64 (lu depuis SQLite) est réinterprété bit à bit en uint64
+        self.hashes = hashes.astype(np.uint64, copy=False)
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        bounds = np.linspace(0, HASH_BITS, chunks + 1).astype(int)
+        self._slices = [(int(start), int(stop - start)) for start, stop in zip(bounds[:-1], bounds[1:])]
+        self._tables = []
+        for shift, width in self._slices:
+            keys = self._keys(self.hashes, shift, width)
+            order = np.argsort(keys, kind="stable")
+            self._tables.append((keys[order], order))
+
+    @staticmethod
+    def _keys(values, shift: int, width: int):
+        return (values >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def candidates(self, query: int) -> np.ndarray:
+        """Indices des hashes partageant au moins une tranche avec `query`."""
+        query = np.uint64(to_unsigned(query))
+        found = []
+        for (shift, width), (keys, order) in zip(self._slices, self._tables):
+            key = self._keys(query, shift, width)
+            start, stop = np.searchsorted(keys, key, "left"), np.searchsorted(keys, key, "right")
+            found.append(order[start:stop])
+        return np.unique(np.concatenate(found))
+
+    def search(self, query: int, max_distance: int = None) -> list:
+        """Renvoie les (distance, indice) des hashes à distance <= max_distance de `query`, triés."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        candidates = self.candidates(query)
+        distances = hamming_distances(to_unsigned(query), self.hashes[candidates])
+        keep = distances <= max_distance
+        return sorted(zip(distances[keep].tolist(), candidates[keep].tolist()))
+
+    def pairs(self, max_distance: int = None, block_size: int = 2048):
+        """Renvoie toutes les paires (i, j, distance) avec i < j et distance <= max_distance.
+
+        Les hashes sont comparés seulement à l'intérieur de chaque seau (même valeur de
+        tranche), par blocs vectorisés d'au plus `block_size` lignes.
+        """
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        seen = set()
+        for keys, order in self._tables:
+            boundaries = np.flatnonzero(np.diff(keys)) + 1
+            starts = np.concatenate(([0], boundaries))
+            stops = np.concatenate((boundaries, [len(keys)]))
+            for start, stop in zip(starts[stops - starts > 1], stops[stops - starts > 1]):
+                bucket = np.sort(order[start:stop])
+                values = self.hashes[bucket]
+                for row in range(0, len(bucket), block_size):
+                    block = values[row:row + block_size]
+                    distances = popcount64(block[:, None] ^ values[None, :])
+                    rows, cols = np.nonzero(distances <= max_distance)
+                    rows += row
+                    upper = cols > rows
+                    for i, j, distance in zip(bucket[rows[upper]].tolist(), bucket[cols[upper]].tolist(),
+                                              distances[rows[upper] - row, cols[upper]].tolist()):
+                        if (i, j) not in seen:
+                            seen.add((i, j))
+                            yield i, j, distance
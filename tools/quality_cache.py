@@ -0,0 +1,91 @@
+import os
+import time
+import logging
+from data.db import DB
+
+dossier_actuel = os.path.dirname(__file__)
+dossier_parent = os.path.dirname(dossier_actuel)
+DEFAULT_CACHE_PATH = os.path.join(dossier_parent, 'data', 'quality_cache.sqlite3')
+
+# SQLite limite le nombre de paramètres liés par requête (999 sur les anciennes versions)
+SQL_CHUNK_SIZE = 500
+
+
+class QualityCache:
+    """Qualités d'encodage retenues par la compression adaptative, par image et par rendu.
+
+    Les entrées sont indexées par (chemin source, réglages du rendu) et ne valent que tant
+    que la source garde la même taille et la même date de modification. Une qualité connue
+    est essayée en premier : si elle respecte toujours la contrainte, l'image est encodée
+    deux fois au lieu de six ou sept.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH) -> None:
+        self.db_path = db_path
+        self.db = DB(db_path)
+        self._create_table()
+
+    def _create_table(self) -> None:
+        """Création de la table des qualités retenues si elle n'existe pas déjà."""
+        def create(cursor) -> None:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS encoder_settings (
+                    path TEXT NOT NULL,
+                    settings TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    quality INTEGER NOT NULL,
+                    output_size INTEGER,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (path, settings)
+                )
+            ''')
+
+        if self.db.ensure_schema("encoder_settings", create):
+            logging.info("Table 'encoder_settings' initialisée avec succès.")
+
+    def lookup(self, paths: list, settings: list) -> dict:
+        """Qualités connues pour des fichiers inchangés depuis leur enregistrement.
+
+        Args:
+            paths (list): Chemins des sources
+            settings (list): Réglages des rendus (Rendition.describe())
+
+        Returns:
+            dict: {chemin: {réglages: qualité}}, uniquement pour les chemins connus
+        """
+        stats = {}
+        for path in paths:
+            try:
+                stats[os.path.abspath(path)] = (path, os.stat(path))
+            except OSError:
+                continue
+        found = {}
+        keys = list(stats)
+        placeholders = ", ".join("?" * len(settings))
+        for i in range(0, len(keys), SQL_CHUNK_SIZE):
+            chunk = keys[i:i + SQL_CHUNK_SIZE]
+            cursor = self.db.execute(
+                f"SELECT path, settings, mtime, size, quality FROM encoder_settings "
+                f"WHERE settings IN ({placeholders}) AND path IN ({', '.join('?' * len(chunk))})",
+                (*settings, *chunk)
+            )
+            for abspath, rendition, mtime, size, quality in cursor.fetchall():
+                path, stat = stats[abspath]
+                if stat.st_mtime == mtime and stat.st_size == size:
+                    found.setdefault(path, {})[rendition] = quality
+        return found
+
+    def record_many(self, entries: list) -> None:
+        """Enregistre plusieurs qualités retenues en une seule transaction.
+
+        Args:
+            entries (list): dicts avec les clés path, settings, mtime, size, quality et output_size
+        """
+        now = time.time()
+        with self.db.db_connect() as cursor:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO encoder_settings (path, settings, mtime, size, quality, output_size, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(os.path.abspath(entry["path"]), entry["settings"], entry["mtime"], entry["size"],
+                   entry["quality"], entry.get("output_size"), now) for entry in entries])
@@ -0,0 +1,86 @@
+import re
+
+# Séparateur de paragraphes : au moins une ligne vide
+PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n\s*')
+# Fin de phrase : ponctuation finale, guillemets/parenthèses fermants éventuels, puis espaces
+SENTENCE_END = re.compile(r'[.!?…。！？]["»”’)\]]*(\s+)')
+WHITESPACE = re.compile(r'\s+')
+
+
+def _next_cut(buffer: str, pos: int, max_length: int, final: bool):
+    """Cherche la prochaine coupure à partir de `pos`.
+
+    Returns:
+        tuple: (fin du segment, fin du séparateur), ou None s'il faut lire davantage
+    """
+    leading = WHITESPACE.match(buffer, pos)
+    if leading:
+        if leading.end() < len(buffer) or final:
+            return pos, leading.end()
+        return None
+
+    limit = pos + max_length
+    paragraph = PARAGRAPH_BREAK.search(buffer, pos, min(len(buffer), limit + 1))
+    if paragraph and paragraph.start() <= limit:
+        return paragraph.start(), paragraph.end()
+
+    if len(buffer) - pos <= max_length:
+        if not final:
+            return None
+        end = max(pos, len(buffer.rstrip()))
+        return end, len(buffer)
+
+    cut = None
+    for match in SENTENCE_END.finditer(buffer, pos, limit + 1):
+        cut = match.start(1), match.end(1)
+    if cut is None:
+        for match in WHITESPACE.finditer(buffer, pos + 1, limit + 1):
+            cut = match.start(), match.end()
+    return cut or (limit, limit)
+
+
+def iter_segments(chunks, max_length: int = 5000):
+    """Découpe un flux de texte en segments alignés sur les paragraphes et les phrases.
+
+    Chaque paragraphe forme un segment ; un paragraphe plus long que `max_length`
+    est coupé à la dernière fin de phrase (à défaut au dernier espace) qui tient
+    dans la limite. Seul le texte non encore découpé est conservé en mémoire.
+
+    Args:
+        chunks: Itérable de morceaux de texte (par exemple des lectures successives d'un fichier)
+        max_length (int): Taille maximale d'un segment en caractères
+
+    Yields:
+        tuple: (segment, séparateur) ; concaténés dans l'ordre, ils redonnent le texte d'origine
+    """
+    buffer, pos = "", 0
+    for chunk in chunks:
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while (cut := _next_cut(buffer, pos, max_length, final=False)) is not None:
+            yield buffer[pos:cut[0]], buffer[cut[0]:cut[1]]
+            pos = cut[1]
+
+    while pos < len(buffer):
+        cut = _next_cut(buffer, pos, max_length, final=True)
+        yield buffer[pos:cut[0]], buffer[cut[0]:cut[1]]
+        pos = cut[1]
+
+
+def make_batches(segments: list, batch_size: int, max_chars: int) -> list:
+    """Regroupe des segments en lots d'au plus `batch_size` segments et `max_chars` caractères.
+
+    Returns:
+        list: Liste de lots, chaque lot étant une liste d'indices dans `segments`
+    """
+    batches = []
+    batch, batch_chars = [], 0
+    for index, segment in enumerate(segments):
+        if batch and (len(batch) >= batch_size or batch_chars + len(segment) > max_chars):
+            batches.append(batch)
+            batch, batch_chars = [], 0
+        batch.append(index)
+        batch_chars += len(segment)
+    if batch:
+        batches.append(batch)
+    return batches
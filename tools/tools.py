@@ -1,21 +1,213 @@
-import requests
 import os
+import time
 import logging
-from PIL import Image
-from PIL.ExifTags import TAGS
-from plyer import notification
+import contextvars
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from itertools import repeat
+from tools.translation_cache import TranslationCache
+from tools.segmenter import iter_segments, make_batches
+from tools.manifest import Manifest, iter_files
+from tools.fileio import MappedFile, record_read
+from tools.metrics import METRICS
+from tools.quality_cache import QualityCache
+
+# Les dépendances lourdes (requests, Pillow, numpy) ne sont chargées qu'à la première
+# utilisation de la traduction ou des outils d'images, comme plyer pour les notifications
 
 def notify_task_done(task_name: str):
     """Envoie une notification pour indiquer que la tâche est terminée."""
+    # plyer n'est chargé qu'à la première notification
+    from plyer import notification
     notification.notify(
         title="Tâche terminée",
         message=f"La tâche '{task_name}' a été exécutée avec succès.",
         timeout=5
     )
 
+TRANSLATE_URL = "https://translation.googleapis.com/language/translate/v2"
+# Codes HTTP rejoués : quota dépassé et erreurs serveur transitoires
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class TranslationError(Exception):
+    """Levée quand des segments n'ont pas pu être traduits (API injoignable, erreur persistante...)."""
+
 class Translate: 
-    def __init__(self, api_key: str) -> None:
+    # Limites de l'API v2 : 128 segments "q" par requête et ~5000 caractères conseillés par segment
+    MAX_SEGMENT_LENGTH = 5000
+    MAX_SEGMENTS_PER_REQUEST = 128
+    MAX_CHARS_PER_REQUEST = 30000
+
+    def __init__(self, api_key: str, max_workers: int = 4, batch_size: int = MAX_SEGMENTS_PER_REQUEST,
+                 url: str = TRANSLATE_URL, session: "requests.Session" = None,
+                 cache: TranslationCache = None, max_retries: int = 3) -> None:
         self.api_key = api_key
+        self.max_retries = max_retries
+        self.max_workers = max(1, max_workers)
+        self.batch_size = max(1, min(batch_size, self.MAX_SEGMENTS_PER_REQUEST))
+        self.url = url
+        self.session = session or self._create_session()
+        self.cache = cache
+        # Pool de requêtes partagé : le nombre de requêtes simultanées reste borné
+        # même quand plusieurs fichiers sont traduits en parallèle
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="translate")
+
+    def close(self) -> None:
+        """Libère le pool de requêtes et la session HTTP."""
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _create_session(self) -> "requests.Session":
+        """Crée une session HTTP dont le pool de connexions couvre tous les workers.
+
+        Les réponses 429 et 5xx sont rejouées avec un backoff exponentiel (en respectant Retry-After).
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        session = requests.Session()
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=0.5,
+            backoff_jitter=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _make_batches(self, segments: list) -> list:
+        """Regroupe les segments en lots respectant les limites d'une requête v2.
+
+        Returns:
+            list: Liste de lots, chaque lot étant une liste d'indices dans `segments`
+        """
+        return make_batches(segments, self.batch_size, self.MAX_CHARS_PER_REQUEST)
+
+    def _translate_batch(self, batch: list, target_lang: str) -> list:
+        """Traduit un lot de segments en une seule requête.
+
+        Returns:
+            list: Traductions dans l'ordre du lot, ou None pour chaque segment en cas d'échec
+        """
+        import requests
+
+        data = {
+            'q': batch,
+            'target': target_lang,
+            'key': self.api_key
+        }
+        try:
+            with METRICS.timer("translate_request_seconds", client="sync"):
+                response = self.session.post(self.url, data=data)
+            METRICS.inc("translate_requests_total", client="sync", status=response.status_code)
+            response.raise_for_status()
+            translations = response.json()['data']['translations']
+            METRICS.inc("translate_bytes_total", sum(len(segment.encode()) for segment in batch), client="sync")
+            return [translation['translatedText'] for translation in translations]
+        except requests.exceptions.HTTPError:
+            logging.warning(f"Erreur {response.status_code} lors de la traduction d'un lot de {len(batch)} segment(s)")
+        except Exception as e:
+            logging.warning(f"Erreur lors de la traduction: {e}")
+        return [None] * len(batch)
+
+    def translate_segments(self, segments: list, target_lang: str) -> list:
+        """Traduit une liste de segments par lots, en parallèle, en conservant l'ordre.
+
+        Args:
+            segments (list): Segments de texte à traduire
+            target_lang (str): Langue cible pour la traduction
+
+        Returns:
+            list: Traductions alignées sur `segments` (None pour un segment en échec)
+        """
+        if self.cache is not None:
+            results = self.cache.get_many(segments, target_lang)
+        else:
+            results = [None] * len(segments)
+
+        # Les segments identiques ne sont envoyés qu'une seule fois
+        pending = {}
+        for index, segment in enumerate(segments):
+            if results[index] is None:
+                pending.setdefault(segment, []).append(index)
+        unique_segments = list(pending)
+        batches = self._make_batches(unique_segments)
+        if not batches:
+            return results
+
+        translated = []
+        futures = {
+            self._executor.submit(self._translate_batch, [unique_segments[i] for i in batch], target_lang): batch
+            for batch in batches
+        }
+        for future in as_completed(futures):
+            for i, translation in zip(futures[future], future.result()):
+                if translation is None:
+                    continue
+                translated.append((unique_segments[i], translation))
+                for index in pending[unique_segments[i]]:
+                    results[index] = translation
+
+        if self.cache is not None:
+            self.cache.put_many(translated, target_lang)
+        return results
+
+    def _translate_group(self, group: list, target_lang: str) -> str:
+        """Traduit un groupe de couples (segment, séparateur) et recolle les séparateurs d'origine.
+
+        Raises:
+            TranslationError: Si un segment du groupe n'a pas pu être traduit
+        """
+        segments = [segment for segment, _ in group if segment]
+        translations = self.translate_segments(segments, target_lang)
+        failed = translations.count(None)
+        if failed:
+            raise TranslationError(f"{failed} segment(s) sur {len(segments)} n'ont pas pu être traduits")
+        translations = iter(translations)
+        parts = []
+        for segment, separator in group:
+            if segment:
+                parts.append(next(translations))
+            parts.append(separator)
+        return "".join(parts)
+
+    def translate_stream(self, chunks, target_lang: str):
+        """Traduit un flux de texte au fil de la lecture, segment par segment.
+
+        Les segments sont produits par `iter_segments` et traduits par groupes de
+        `batch_size * max_workers`, de sorte que la mémoire utilisée ne dépend pas
+        de la taille du flux.
+
+        Args:
+            chunks: Itérable de morceaux de texte
+            target_lang (str): Langue cible pour la traduction
+
+        Yields:
+            str: Texte traduit, dans l'ordre du flux
+
+        Raises:
+            TranslationError: Si un segment n'a pas pu être traduit
+        """
+        group_size = self.batch_size * self.max_workers
+        group = []
+        for pair in iter_segments(chunks, self.MAX_SEGMENT_LENGTH):
+            group.append(pair)
+            if len(group) >= group_size:
+                yield self._translate_group(group, target_lang)
+                group = []
+        if group:
+            yield self._translate_group(group, target_lang)
 
     def translate_text(self, text: str, target_lang: str) -> str:
         """Utilise l'API Google Translate via une requête HTTP pour traduire le texte.
@@ -27,67 +219,152 @@ class Translate:
         Returns:
             str: Texte traduit
         """
-        url = "https://translation.googleapis.com/language/translate/v2"
-        max_length = 5000
-
-        translations = []
-        for i in range(0, len(text), max_length):
-            segment = text[i:i + max_length]
-            params = {
-                'q': segment,
-                'target': target_lang,
-                'key': self.api_key
-            }
+        translation = "".join(self.translate_stream([text], target_lang))
+        notify_task_done(f"Traduction du texte en {target_lang} réalisé avec succés.")
+
+        return translation
+
+    def translate_file(self, file_path: str, output_path: str, target_lang: str, chunk_size: int = 64 * 1024) -> str:
+        """Traduit un fichier texte en streaming et écrit la traduction au fur et à mesure.
+
+        La traduction est écrite dans un fichier `.part` renommé à la fin, pour qu'une
+        interruption ne laisse jamais de sortie incomplète sous le nom définitif. Le
+        fichier source n'est lu qu'une fois : le même tampon sert à l'empreinte et au
+        découpage en segments.
+
+        Args:
+            file_path (str): Fichier .txt à traduire
+            output_path (str): Fichier de sortie
+            target_lang (str): Langue cible pour la traduction
+            chunk_size (int): Nombre d'octets décodés à chaque itération
+
+        Returns:
+            str: Empreinte SHA-256 du fichier source (pour le manifeste)
+
+        Raises:
+            TranslationError: Si un segment n'a pas pu être traduit ; la sortie existante
+                n'est alors pas remplacée
+        """
+        part_path = output_path + ".part"
+        try:
+            with MappedFile(file_path) as source, open(part_path, 'w', encoding='utf-8') as translated_file:
+                content_hash = source.sha256()
+                for translated in self.translate_stream(source.text_chunks('utf-8', chunk_size), target_lang):
+                    translated_file.write(translated)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+        os.replace(part_path, output_path)
+        return content_hash
+
+    def translate_directory(self, directory: str, target_lang: str, recursive: bool = False,
+                            max_files: int = 4, manifest: Manifest = None, progress=None) -> dict:
+        """Traduit en parallèle les fichiers .txt d'un dossier, en ignorant ceux déjà traduits.
+
+        Chaque fichier terminé est inscrit dans le manifeste : une exécution interrompue
+        reprend donc là où elle s'était arrêtée, et un fichier inchangé dont la sortie
+        `_traduit_<lang>` existe n'est pas retraduit. Un fichier dont un segment n'a pas
+        pu être traduit compte en échec et n'est pas inscrit : il sera retenté.
+
+        Args:
+            directory (str): Chemin du dossier contenant les fichiers .txt
+            target_lang (str): Langue cible pour la traduction
+            recursive (bool): Parcourir aussi les sous-dossiers
+            max_files (int): Nombre de fichiers traités simultanément
+            manifest (Manifest): Manifeste à utiliser (celui par défaut si None)
+            progress: Fonction appelée avec un dict d'avancement après chaque fichier
+
+        Returns:
+            dict: Nombre de fichiers traduits, ignorés et en échec, et durée totale
+        """
+        manifest = manifest or Manifest()
+        files = [
+            entry for entry in iter_files(directory, recursive)
+            if entry.name.endswith('.txt') and '_traduit' not in entry.name
+        ]
+        summary = {"total": len(files), "translated": 0, "skipped": 0, "failed": 0}
+        start = time.perf_counter()
+
+        def process(entry: os.DirEntry) -> str:
+            stat = entry.stat()
+            translated_path = os.path.splitext(entry.path)[0] + f"_traduit_{target_lang}.txt"
+            if manifest.is_up_to_date(entry.path, target_lang, stat):
+                return "skipped"
+            content_hash = self.translate_file(entry.path, translated_path, target_lang)
+            manifest.record(entry.path, target_lang, translated_path, os.path.getsize(translated_path),
+                            stat=stat, content_hash=content_hash)
+            # Journalisé plutôt qu'affiché : la traduction peut tourner en tâche de fond pendant que
+            # les menus attendent une saisie (l'avancement passe par `progress`)
+            logging.info(f"Contenu original de {entry.name} traduit et enregistré dans {os.path.basename(translated_path)}")
+            return "translated"
+
+        with ThreadPoolExecutor(max_workers=max(1, max_files), thread_name_prefix="translate-file") as executor:
+            # Chaque fichier est traité dans une copie du contexte, pour que ses lectures soient
+            # comptées dans la tâche en cours (tools.fileio.track_io)
+            futures = {executor.submit(contextvars.copy_context().run, process, entry): entry for entry in files}
             try:
-                response = requests.get(url, params=params)
-                response.raise_for_status() 
-                translation = response.json()['data']['translations'][0]['translatedText']
-                translations.append(translation)
-            except requests.exceptions.HTTPError as e:
-                logging.warning(f"Erreur {response.status_code} lors de la traduction pour le segment: {segment}")
-            except Exception as e:
-                logging.warning(f"Erreur lors de la traduction: {e}")
-            finally:
-                notify_task_done(f"Traduction du texte en {target_lang} réalisé avec succés.")
-
-        return " ".join(translations)
-
-    def translate_txt_files_in_directory(self, directory: str, target_lang: str):
+                for future in as_completed(futures):
+                    entry = futures[future]
+                    try:
+                        status = future.result()
+                    except Exception as e:
+                        status = "failed"
+                        logging.error(f"Erreur lors de la traduction du fichier {entry.path}: {e}")
+                    summary[status] += 1
+                    if progress:
+                        progress({"file": entry.path, "status": status,
+                                  "done": sum(summary[key] for key in ("translated", "skipped", "failed")),
+                                  "total": summary["total"]})
+            except BaseException:
+                # Arrêt demandé par `progress` (annulation) : les fichiers pas encore commencés sont abandonnés
+                for future in futures:
+                    future.cancel()
+                raise
+
+        summary["seconds"] = time.perf_counter() - start
+        logging.info(f"Traduction du dossier {directory} en {target_lang} : {summary}")
+        return summary
+
+    def translate_txt_files_in_directory(self, directory: str, target_lang: str, recursive: bool = False,
+                                         max_files: int = 4) -> dict:
         """Identifie les fichiers .txt dans un dossier, les traduit et enregistre les résultats.
 
         Args:
             directory (str): Chemin du dossier contenant les fichiers .txt
             target_lang (str): Langue cible pour la traduction
+            recursive (bool): Parcourir aussi les sous-dossiers
+            max_files (int): Nombre de fichiers traités simultanément
         """
-        for filename in os.listdir(directory):
-            if filename.endswith('.txt') and '_traduit' not in filename:
-                file_path = os.path.join(directory, filename)
-                
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    content = file.read()
-                    translation = self.translate_text(content, target_lang)
-                    translated_filename = os.path.splitext(filename)[0] + f"_traduit_{target_lang}.txt"
-                    translated_file_path = os.path.join(directory, translated_filename)
-                    with open(translated_file_path, 'w', encoding='utf-8') as translated_file:
-                        translated_file.write(translation)
-                    print(f"\nContenu original de {filename} traduit et enregistré dans {translated_filename}")
+        summary = self.translate_directory(directory, target_lang, recursive=recursive, max_files=max_files)
         notify_task_done(f"Traduction de tout les .txt dans {directory} en {target_lang} réalisé avec succés.")
+        return summary
 
 def translate_input_txt_files(api_key: str):
     """Gère la traduction des fichiers .txt dans un répertoire spécifié par l'utilisateur."""
     directory = input("Saisir le chemin du dossier contenant les fichiers .txt : ")
     target_lang = input("Saisir la langue de traduction : ")
+    recursive = input("Inclure les sous-dossiers ? [o/N] : ").strip().lower() == "o"
 
-    t = Translate(api_key)
-    t.translate_txt_files_in_directory(directory, target_lang)
+    with Translate(api_key, cache=TranslationCache()) as t:
+        summary = t.translate_txt_files_in_directory(directory, target_lang, recursive=recursive)
+    print(f"\n{summary['translated']} fichier(s) traduit(s), {summary['skipped']} déjà à jour, "
+          f"{summary['failed']} en échec ({summary['seconds']:.1f} s).")
+    logging.info(f"Mémoire de traduction : {t.cache.stats()}")
 
 def translate_input(api_key: str) -> str:
     """Gère la traduction d'un texte saisi par l'utilisateur."""
     texte = input("Saisir le texte à traduire : ")
     target_lang = input("Saisir la langue de traduction : ")
 
-    t = Translate(api_key)
-    traduction = t.translate_text(texte, target_lang)
+    with Translate(api_key, cache=TranslationCache()) as t:
+        try:
+            traduction = t.translate_text(texte, target_lang)
+        except TranslationError as e:
+            logging.error(f"Traduction du texte en {target_lang} impossible : {e}")
+            print(f"Traduction impossible : {e}")
+            return
+    logging.info(f"Mémoire de traduction : {t.cache.stats()}")
 
     print(f"""
         Voici votre texte traduit en {target_lang}:
@@ -97,87 +374,102 @@ def translate_input(api_key: str) -> str:
 
 logging.info(">> Importation du module tools réalisé avec succès")
 
-from data.db import DB
-
 class ImageAnalyzer:
-    def __init__(self, folder_path, db_path):
+    def __init__(self, folder_path, db_path, perceptual_hashes: bool = False):
+        from tools.image_index import ImageIndex
+
         self.folder_path = folder_path
         self.db_path = db_path
-        self.db = DB(db_path)
-        self._create_database()
+        self.perceptual_hashes = perceptual_hashes
+        self.index = ImageIndex(db_path)
+        self.db = self.index.db
+        self.last_scan = {}
+
+    @property
+    def INSERT_SQL(self) -> str:
+        return self.index.UPSERT_SQL
 
     def _create_database(self):
         """Création de la table dans la base de données si elle n'existe pas déjà."""
-        with self.db.db_connect() as cursor:
-            cursor.execute(''' 
-                CREATE TABLE IF NOT EXISTS images (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    filename TEXT,
-                    format TEXT,
-                    width INTEGER,
-                    height INTEGER,
-                    file_size INTEGER,
-                    mode TEXT,
-                    exif TEXT
-                )
-            ''')
-        logging.info("Table 'images' créée avec succès.")
+        self.index.create_schema()
+
+    def _image_row(self, image_info) -> tuple:
+        """Ligne de la table images correspondant aux informations d'une image."""
+        return self.index.row(image_info)
 
     def _insert_image_info(self, image_info):
-        """Insertion des informations d'une image dans la base de données."""
+        """Insertion (ou mise à jour) des informations d'une image dans la base de données."""
         with self.db.db_connect() as cursor:
-            cursor.execute(''' 
-                INSERT INTO images (filename, format, width, height, file_size, mode, exif)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                image_info['filename'],
-                image_info.get('format'),
-                image_info['size (width, height)'][0],
-                image_info['size (width, height)'][1],
-                image_info['file_size'],
-                image_info.get('mode'),
-                str(image_info.get('exif'))
-            ))
+            cursor.execute(self.INSERT_SQL, self._image_row(image_info))
+
+    def _read_image_info(self, image_path):
+        """Récupération des informations d'une image, sans écriture en base."""
+        from tools.image_scan import read_image_metadata
+        return read_image_metadata(image_path, with_hash=True, with_phash=self.perceptual_hashes)
 
     def get_image_info(self, image_path):
         """Récupération des informations d'une image et insertion dans la base de données."""
-        try:
-            with Image.open(image_path) as img:
-                image_info = {
-                    "filename": os.path.basename(image_path),
-                    "format": img.format,
-                    "size (width, height)": img.size,
-                    "mode": img.mode,
-                    "file_size": os.path.getsize(image_path),
-                }
-
-                exif_data = img._getexif()
-                if exif_data is not None:
-                    exif = {
-                        TAGS.get(tag): value for tag, value in exif_data.items() if tag in TAGS
-                    }
-                    image_info["exif"] = exif
+        image_info = self._read_image_info(image_path)
+        if 'error' not in image_info:
+            self._insert_image_info(image_info)
+        return image_info
+
+    def _changed_paths(self, recursive: bool):
+        """Chemins des images nouvelles ou modifiées depuis la dernière analyse.
+
+        Si les hashes perceptuels sont demandés, les images indexées sans eux sont relues aussi.
+        """
+        from tools.image_scan import iter_image_entries
+
+        cursor = self.db.cursor()
+        for entry in iter_image_entries(self.folder_path, recursive):
+            if self.index.is_indexed(cursor, entry.path, entry.stat(), with_phash=self.perceptual_hashes):
+                self.last_scan["unchanged"] += 1
+            else:
+                yield entry.path
+
+    def iter_images_info(self, recursive: bool = False, workers: int = 8, use_processes: bool = False,
+                         batch_size: int = 500):
+        """Analyse les images du dossier en parallèle et renvoie leurs informations au fil de l'eau.
+
+        Seuls les en-têtes sont décodés (les hashes perceptuels, s'ils sont demandés,
+        décodent l'image à résolution réduite), et seules les images nouvelles ou
+        modifiées depuis la dernière analyse sont relues. Chaque résultat est enregistré
+        par lots sur une seule connexion avant d'être renvoyé ; seuls les chemins à relire
+        sont listés d'avance, pour connaître leur nombre (`last_scan["total"]`, disponible
+        dès le premier résultat). Le décompte de l'analyse est disponible dans `last_scan`.
+
+        Args:
+            recursive (bool): Parcourir aussi les sous-dossiers
+            workers (int): Nombre de threads (ou de processus) de lecture
+            use_processes (bool): Lire dans un pool de processus plutôt que de threads
+            batch_size (int): Nombre de lignes par transaction
+
+        Yields:
+            dict: Informations de chaque image (ou erreur)
+        """
+        from tools.image_scan import scan_images
+
+        self.last_scan = {"total": 0, "indexed": 0, "unchanged": 0, "errors": 0}
+        paths = list(self._changed_paths(recursive))
+        self.last_scan["total"] = len(paths)
+        with self.db.batch_writer(self.INSERT_SQL, batch_size) as writer:
+            for image_info in scan_images(paths, workers=workers, use_processes=use_processes,
+                                          with_hash=True, with_phash=self.perceptual_hashes):
+                if 'error' in image_info:
+                    self.last_scan["errors"] += 1
                 else:
-                    image_info["exif"] = "No EXIF data"
+                    writer.write(self._image_row(image_info))
+                    self.last_scan["indexed"] += 1
+                yield image_info
 
-                self._insert_image_info(image_info)
+    def analyze_images_in_folder(self, batch_size: int = 500, recursive: bool = False, workers: int = 8):
+        """Analyse les images du dossier et renvoie la liste complète de leurs informations."""
+        return list(self.iter_images_info(recursive=recursive, workers=workers, batch_size=batch_size))
 
-                return image_info
-        except Exception as e:
-            return {"filename": os.path.basename(image_path), "error": str(e)}
-
-    def analyze_images_in_folder(self):
-        images_info = []
-        for filename in os.listdir(self.folder_path):
-            image_path = os.path.join(self.folder_path, filename)
-            image_info = self.get_image_info(image_path)
-            images_info.append(image_info)
-        return images_info
-
-def imageAnalyzer_input(folder:str, db_path:str):
-    analyzer = ImageAnalyzer(folder, db_path)
-    infos = analyzer.analyze_images_in_folder()
-    for info in infos:
+def imageAnalyzer_input(folder:str, db_path:str, recursive: bool = False, perceptual_hashes: bool = False):
+    analyzer = ImageAnalyzer(folder, db_path, perceptual_hashes=perceptual_hashes)
+    for info in analyzer.iter_images_info(recursive=recursive):
         if 'error' in info:
             print(f"Fichier: {info.get('filename')} - Erreur: {info['error']}")
         else:
@@ -191,44 +483,249 @@ def imageAnalyzer_input(folder:str, db_path:str):
             EXIF: {info.get('exif')}
             ============================================= 
             """)
+    print(f"{analyzer.last_scan['indexed']} image(s) indexée(s), {analyzer.last_scan['unchanged']} inchangée(s), "
+          f"{analyzer.last_scan['errors']} erreur(s).")
+    if perceptual_hashes:
+        for path_a, path_b, distance in analyzer.index.near_duplicates():
+            print(f"Images similaires (distance {distance}) : {path_a} <-> {path_b}")
     notify_task_done(f"Analyse des images dans {folder} réalisé avec succés.")
 
+def _compress_file(file_path: str, output_folder: str, pipeline: "TransformPipeline",
+                   hints: dict = None) -> dict:
+    """Produit les rendus d'un fichier image en ne le lisant et ne le décodant qu'une seule fois.
+
+    Les rendus sont encodés en mémoire. Un rendu qui ne fait que réencoder la source (même
+    taille, même format) ou dont la qualité est adaptative n'est écrit que s'il est plus
+    petit qu'elle ; si aucun rendu n'est écrit, le statut est 'larger'. Fonction de module
+    pour pouvoir être exécutée dans un ProcessPoolExecutor.
+
+    Args:
+        hints (dict): Qualités retenues lors d'une exécution précédente, par rendu
+
+    Returns:
+        dict: Chemin, statut ('compressed', 'larger', 'not_image' ou 'error'), stat et
+            empreinte de la source, octets lus, fichiers écrits, taille de sortie cumulée, qualités
+            retenues par rendu, durées de décodage et d'encodage (mesurées ici, enregistrées
+            dans les métriques par le processus parent)
+    """
+    from PIL import Image, UnidentifiedImageError
+
+    stat = os.stat(file_path)
+    result = {"file": file_path, "status": "compressed", "input_size": stat.st_size, "output_size": 0,
+              "outputs": [], "qualities": {}, "bytes_read": 0, "mapped": False, "mtime": stat.st_mtime,
+              "content_hash": None, "decode_seconds": None, "encode_seconds": None}
+    try:
+        basename = os.path.basename(file_path)
+        with MappedFile(file_path, record=False) as source:
+            result["bytes_read"], result["mapped"] = source.size, source.mapped
+            # Empreinte calculée avant le décodage : un fichier qui n'est pas une image est
+            # lui aussi inscrit au manifeste, et n'est pas relu à l'exécution suivante
+            result["content_hash"] = source.sha256()
+            with Image.open(source.stream()) as img:
+                source_format = img.format
+                for rendition, buffer, output_format, size, quality in pipeline.render(img, result, hints):
+                    if rendition.is_adaptive():
+                        result["qualities"][rendition.describe()] = (quality, buffer.tell())
+                    if ((rendition.is_recompression() or rendition.is_adaptive())
+                            and buffer.tell() >= result["input_size"]):
+                        continue
+                    output_path = os.path.join(output_folder, rendition.output_name(basename, source_format))
+                    with open(output_path, 'wb') as output:
+                        output.write(buffer.getbuffer())
+                    result["outputs"].append(output_path)
+                    result["output_size"] += buffer.tell()
+        if not result["outputs"]:
+            result["status"] = "larger"
+    except UnidentifiedImageError:
+        result["status"] = "not_image"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    return result
+
 class ImageCompressor:
-    def __init__(self, input_folder: str, output_folder: str, quality: int = 85):
+    # Nombre de résultats accumulés avant une écriture groupée dans le manifeste
+    MANIFEST_BATCH_SIZE = 200
+
+    def __init__(self, input_folder: str, output_folder: str, quality: int = 85, manifest: Manifest = None,
+                 renditions: list = None, quality_cache: QualityCache = None):
+        from tools.transforms import Rendition, TransformPipeline
+
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.quality = quality
+        self.manifest = manifest
+        # Rendus à produire (tools.transforms.Rendition) ; par défaut, la source est
+        # réencodée dans son format et à sa taille avec `quality`
+        self.renditions = renditions
+        self.pipeline = TransformPipeline(renditions or [Rendition(quality=quality)])
+        # Qualités retenues par les rendus adaptatifs, réessayées en premier à l'exécution suivante
+        self.quality_cache = quality_cache if self.pipeline.adaptive else None
 
         if not os.path.exists(output_folder):
             os.makedirs(output_folder)
             logging.info(f"Dossier de sortie créé : {output_folder}")
 
-    def compress_image(self, image_path: str):
+    @property
+    def variant(self) -> str:
+        """Réglages de compression et dossier de sortie, tels qu'enregistrés dans le manifeste."""
+        settings = self.pipeline.variant if self.renditions else f"quality={self.quality}"
+        return f"{settings}|output={os.path.abspath(self.output_folder)}"
+
+    def _log_result(self, result: dict) -> None:
+        if result["status"] == "compressed":
+            logging.info(f"Image compressée : {', '.join(result['outputs'])}")
+        elif result["status"] == "larger":
+            logging.info(f"{os.path.basename(result['file'])} : la version compressée serait plus lourde, sortie non écrite.")
+        elif result["status"] == "not_image":
+            logging.warning(f"{os.path.basename(result['file'])} n'est pas une image ou ne peut pas être ouverte.")
+        else:
+            logging.error(f"Erreur lors de la compression de l'image {result['file']}: {result['error']}")
+
+    def compress_image(self, image_path: str) -> dict:
         """Compresse une image et l'enregistre dans le dossier de sortie."""
-        try:
-            with Image.open(image_path) as img:
-                filename = os.path.basename(image_path)
-                output_path = os.path.join(self.output_folder, filename)
+        result = _compress_file(image_path, self.output_folder, self.pipeline)
+        self._log_result(result)
+        return result
+
+    def _pending_files(self, stats: dict) -> list:
+        """Liste les fichiers à compresser, en écartant ceux que le manifeste donne pour inchangés."""
+        entries = self.manifest.entries(self.variant, self.input_folder) if self.manifest else {}
+        files = []
+        for entry in iter_files(self.input_folder):
+            known = entries.get(os.path.abspath(entry.path))
+            if known is not None and self.manifest.is_up_to_date(entry.path, self.variant, entry.stat(), known):
+                stats["unchanged"] += 1
+            else:
+                files.append(entry.path)
+        return files
+
+    def compress_images_in_folder(self, workers: int = None, progress=None) -> dict:
+        """Parcourt le dossier d'entrée et compresse toutes les images qu'il contient.
+
+        Avec un manifeste, les images inchangées depuis la dernière exécution (mêmes
+        réglages) sont ignorées.
 
-                img.save(output_path, format=img.format, quality=self.quality)
-                logging.info(f"Image compressée : {output_path}")
-        except Exception as e:
-            logging.error(f"Erreur lors de la compression de l'image {image_path}: {e}")
+        Args:
+            workers (int): Nombre de processus (nombre de CPU si None, traitement en série si 1)
+            progress: Fonction appelée avec le résultat de chaque fichier (dont "total", le nombre
+                de fichiers à traiter) ; une exception levée par `progress` arrête la compression
 
-    def compress_images_in_folder(self):
-        """Parcourt le dossier d'entrée et compresse toutes les images qu'il contient."""
-        for filename in os.listdir(self.input_folder):
-            file_path = os.path.join(self.input_folder, filename)
-            if os.path.isfile(file_path):
+        Returns:
+            dict: Statistiques de la compression (fichiers, octets gagnés, fichiers/s)
+        """
+        workers = workers or os.cpu_count() or 1
+        stats = {"files": 0, "compressed": 0, "unchanged": 0, "larger": 0, "not_image": 0, "error": 0,
+                 "input_bytes": 0, "output_bytes": 0}
+        start = time.perf_counter()
+        files = self._pending_files(stats)
+        stats["files"] = len(files) + stats["unchanged"]
+
+        known = self.quality_cache.lookup(files, [r.describe() for r in self.pipeline.renditions]) \
+            if self.quality_cache else {}
+        hints = [known.get(path) for path in files]
+
+        if workers == 1 or len(files) <= 1:
+            results = (_compress_file(path, self.output_folder, self.pipeline, hint) for path, hint in zip(files, hints))
+            self._collect(results, stats, progress, len(files))
+        else:
+            # Processus lancés par spawn plutôt que fork : la compression peut tourner dans un thread
+            # de tâche de fond pendant que d'autres threads détiennent des verrous (SQLite, logging)
+            # qu'un fork copierait verrouillés
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                results = executor.map(_compress_file, files, repeat(self.output_folder), repeat(self.pipeline), hints,
+                                       chunksize=max(1, min(64, len(files) // (workers * 4))))
                 try:
-                    with Image.open(file_path) as img:
-                        self.compress_image(file_path)
-                except (IOError, OSError):
-                    logging.warning(f"{filename} n'est pas une image ou ne peut pas être ouverte.")
+                    self._collect(results, stats, progress, len(files))
+                except BaseException:
+                    executor.shutdown(cancel_futures=True)
+                    raise
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["bytes_saved"] = stats["input_bytes"] - stats["output_bytes"]
+        stats["files_per_sec"] = stats["files"] / stats["seconds"] if stats["seconds"] else 0.0
+        logging.info(f"Compression de {self.input_folder} ({workers} processus) : {stats}")
+        return stats
+
+    def _collect(self, results, stats: dict, progress=None, total: int = None) -> None:
+        """Agrège les résultats de compression dans `stats` au fil de leur arrivée.
+
+        Les entrées du manifeste et les qualités retenues sont enregistrées même si le
+        traitement est interrompu, pour ne pas refaire les fichiers déjà compressés.
+        """
+        pending = []
+        qualities = []
+        try:
+            self._collect_results(results, stats, progress, total, pending, qualities)
+        finally:
+            if pending:
+                self.manifest.record_many(pending)
+            if qualities:
+                self.quality_cache.record_many(qualities)
+
+    def _collect_results(self, results, stats: dict, progress, total: int, pending: list, qualities: list) -> None:
+        for result in results:
+            self._log_result(result)
+            self._record_metrics(result)
+            stats[result["status"]] += 1
+            if result["status"] == "compressed":
+                stats["input_bytes"] += result["input_size"]
+                stats["output_bytes"] += result["output_size"]
+            if self.manifest and result["status"] in ("compressed", "larger", "not_image"):
+                pending.append(self._manifest_entry(result))
+                if len(pending) >= self.MANIFEST_BATCH_SIZE:
+                    self.manifest.record_many(pending)
+                    pending.clear()
+            if self.quality_cache and result.get("qualities"):
+                qualities.extend({"path": result["file"], "settings": settings, "mtime": result["mtime"],
+                                  "size": result["input_size"], "quality": quality, "output_size": output_size}
+                                 for settings, (quality, output_size) in result["qualities"].items())
+                if len(qualities) >= self.MANIFEST_BATCH_SIZE:
+                    self.quality_cache.record_many(qualities)
+                    qualities.clear()
+            if progress:
+                result["total"] = total
+                progress(result)
+
+    @staticmethod
+    def _record_metrics(result: dict) -> None:
+        METRICS.inc("compress_files_total", status=result["status"])
+        METRICS.inc("compress_bytes_read_total", result["input_size"])
+        if result.get("bytes_read"):
+            record_read(result["bytes_read"], result["mapped"])
+        METRICS.inc("compress_bytes_written_total", result["output_size"] if result["status"] == "compressed" else 0)
+        if result.get("decode_seconds") is not None:
+            METRICS.observe("image_decode_seconds", result["decode_seconds"], operation="compress")
+        if result.get("encode_seconds") is not None:
+            METRICS.observe("image_encode_seconds", result["encode_seconds"], operation="compress")
+        if result.get("encodes"):
+            METRICS.inc("compress_quality_encodes_total", result["encodes"])
+            METRICS.inc("compress_quality_targets_missed_total", result["targets_missed"])
+
+    def _manifest_entry(self, result: dict) -> dict:
+        return {
+            "path": result["file"], "variant": self.variant, "mtime": result["mtime"],
+            "size": result["input_size"], "content_hash": result["content_hash"],
+            "output_path": result["outputs"][0] if result["outputs"] else None,
+            "output_size": result["output_size"], "status": result["status"], "outputs": result["outputs"],
+        }
+
+def compress_images_in_directory(input_folder: str, quality: int = 85, workers: int = None,
+                                 incremental: bool = True, renditions: list = None, max_bytes: int = None,
+                                 min_psnr: float = None) -> dict:
+    """Fonction utilitaire pour compresser les images dans un répertoire.
+
+    Avec `max_bytes` ou `min_psnr`, la qualité est cherchée image par image (au plus `quality`).
+    """
+    from tools.transforms import Rendition
 
-def compress_images_in_directory(input_folder: str, quality: int = 85):
-    """Fonction utilitaire pour compresser les images dans un répertoire."""
     output_folder = os.path.join(input_folder, "images_compressées")
-    compressor = ImageCompressor(input_folder, output_folder, quality)
-    compressor.compress_images_in_folder()
+    manifest = Manifest(table='compression_manifest') if incremental else None
+    if not renditions and (max_bytes or min_psnr):
+        renditions = [Rendition(quality=quality, max_bytes=max_bytes, min_psnr=min_psnr)]
+    adaptive = any(rendition.is_adaptive() for rendition in renditions or [])
+    compressor = ImageCompressor(input_folder, output_folder, quality, manifest=manifest, renditions=renditions,
+                                 quality_cache=QualityCache() if adaptive else None)
+    stats = compressor.compress_images_in_folder(workers=workers)
     notify_task_done(f"Images de {input_folder} compréssées dans {output_folder}")
+    return stats
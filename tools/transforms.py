@@ -0,0 +1,329 @@
+"""Pipeline de transformations d'images : redimensionnement, conversion de format et rendus multiples.
+
+Une image source est décodée une seule fois, à la plus petite résolution suffisante pour le
+plus grand rendu demandé : les JPEG sont réduits dès le décodage par Image.draft (mise à
+l'échelle dans le domaine DCT), les autres formats par Image.reduce (réduction entière par
+blocs) avant le redimensionnement final. Chaque rendu est ensuite encodé en mémoire.
+
+Un rendu peut viser une taille maximale en octets ou une qualité perceptuelle minimale
+(PSNR) plutôt qu'une qualité fixe : la qualité d'encodage est alors cherchée par
+dichotomie, chaque essai étant encodé dans un io.BytesIO.
+
+    pipeline = TransformPipeline([Rendition("web", 1600, "WEBP", 80), Rendition("mini", 320, "JPEG", 75)])
+    with Image.open(path) as img:
+        for rendition, buffer, output_format, size, quality in pipeline.render(img):
+            ...
+"""
+import io
+import math
+import time
+import numpy as np
+from PIL import Image
+
+# Extension des fichiers produits, par format de sortie
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "AVIF": ".avif", "GIF": ".gif",
+                     "TIFF": ".tif", "BMP": ".bmp"}
+
+# Modes que chaque format sait enregistrer ; les autres sont convertis avant l'encodage
+FORMAT_MODES = {"JPEG": ("RGB", "L", "CMYK"), "WEBP": ("RGB", "RGBA"), "AVIF": ("RGB", "RGBA")}
+
+
+def available_formats() -> set:
+    """Formats que Pillow sait enregistrer ici (AVIF si pillow-avif-plugin est installé)."""
+    try:
+        import pillow_avif  # noqa: F401 - enregistre le format AVIF auprès de Pillow
+    except ImportError:
+        pass
+    Image.init()
+    return set(Image.SAVE)
+
+
+def fit_size(size: tuple, max_size: int) -> tuple:
+    """Dimensions de `size` ramenées à `max_size` pixels sur le plus grand côté (jamais agrandies)."""
+    width, height = size
+    if not max_size or max(width, height) <= max_size:
+        return width, height
+    scale = max_size / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def psnr(reference: Image.Image, encoded: io.BytesIO) -> float:
+    """Rapport signal/bruit de crête (en dB) entre une image et sa version encodée."""
+    encoded.seek(0)
+    with Image.open(encoded) as img:
+        candidate = np.asarray(img.convert(reference.mode), dtype=np.float32)
+    encoded.seek(0, io.SEEK_END)
+    mse = float(np.mean((np.asarray(reference, dtype=np.float32) - candidate) ** 2))
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def search_quality(encode, accept, low: int, high: int, prefer_high: bool, hint: int = None) -> tuple:
+    """Recherche dichotomique de la qualité d'encodage à la limite d'une contrainte.
+
+    La contrainte est supposée monotone en qualité : avec `prefer_high`, la plus haute
+    qualité acceptée est cherchée (budget en octets) ; sinon la plus basse (seuil de PSNR).
+
+    Args:
+        encode: Fonction qualité -> io.BytesIO encodé
+        accept: Fonction io.BytesIO -> bool, vraie si l'encodage respecte la contrainte
+        low (int): Qualité minimale essayée
+        high (int): Qualité maximale essayée
+        prefer_high (bool): Chercher la plus haute qualité acceptée plutôt que la plus basse
+        hint (int): Qualité essayée en premier (réglage retenu lors d'une exécution précédente)
+
+    Returns:
+        tuple: (qualité, io.BytesIO encodé, contrainte respectée, nombre d'encodages) ; si
+            aucune qualité ne convient, la plus proche de la contrainte est renvoyée
+    """
+    tried = {}
+    found = None
+
+    def probe(quality: int) -> bool:
+        nonlocal found
+        if quality not in tried:
+            buffer = encode(quality)
+            tried[quality] = (buffer, accept(buffer))
+            if tried[quality][1] and (found is None or (quality > found) == prefer_high):
+                found = quality
+        return tried[quality][1]
+
+    lower, upper = low, high
+    if hint is not None and lower <= hint <= upper:
+        neighbour = hint + 1 if prefer_high else hint - 1
+        if probe(hint) and (not lower <= neighbour <= upper or not probe(neighbour)):
+            return hint, tried[hint][0], True, len(tried)
+        if tried[hint][1] == prefer_high:
+            lower = hint + 1
+        else:
+            upper = hint - 1
+    while lower <= upper:
+        middle = (lower + upper) // 2
+        if probe(middle) == prefer_high:
+            lower = middle + 1
+        else:
+            upper = middle - 1
+    if found is not None:
+        return found, tried[found][0], True, len(tried)
+    fallback = low if prefer_high else high
+    probe(fallback)
+    return fallback, tried[fallback][0], False, len(tried)
+
+
+class Rendition:
+    """Un rendu de sortie : taille maximale, format et options d'encodage.
+
+    Args:
+        name (str): Suffixe du fichier produit (<nom>-<name>.<ext>) ; None garde le nom de la source
+        max_size (int): Plus grand côté en pixels (None : taille d'origine)
+        format (str): Format de sortie (None : format de la source)
+        quality (int): Qualité d'encodage (JPEG, WebP, AVIF)
+        progressive (bool): JPEG progressif
+        optimize (bool): Optimisation des tables de Huffman (JPEG) ou de la compression (PNG)
+        max_bytes (int): Taille visée en octets : plus haute qualité (entre `min_quality` et
+            `quality`) dont la sortie ne dépasse pas `max_bytes`
+        min_psnr (float): Qualité perceptuelle visée : plus basse qualité (entre `min_quality`
+            et `quality`) dont le PSNR atteint `min_psnr` dB
+        min_quality (int): Borne basse de la recherche de qualité
+    """
+
+    def __init__(self, name: str = None, max_size: int = None, format: str = None, quality: int = 85,
+                 progressive: bool = False, optimize: bool = False, max_bytes: int = None,
+                 min_psnr: float = None, min_quality: int = 30):
+        self.name = name
+        self.max_size = max_size
+        self.format = format.upper() if format else None
+        self.quality = quality
+        self.progressive = progressive
+        self.optimize = optimize
+        self.max_bytes = max_bytes
+        self.min_psnr = min_psnr
+        self.min_quality = min(min_quality, quality)
+
+    def __repr__(self) -> str:
+        return f"Rendition({self.describe()})"
+
+    def describe(self) -> str:
+        """Réglages du rendu sous forme de texte stable (enregistré dans le manifeste)."""
+        parts = [f"name={self.name}" if self.name else None,
+                 f"max={self.max_size}" if self.max_size else None,
+                 f"format={self.format}" if self.format else None,
+                 f"quality={self.quality}",
+                 "progressive" if self.progressive else None,
+                 "optimize" if self.optimize else None,
+                 f"max_bytes={self.max_bytes}" if self.max_bytes else None,
+                 f"min_psnr={self.min_psnr:g}" if self.min_psnr else None,
+                 f"min_quality={self.min_quality}" if self.is_adaptive() else None]
+        return ",".join(part for part in parts if part)
+
+    def is_adaptive(self) -> bool:
+        """Vrai si la qualité est cherchée image par image (taille ou PSNR visés)."""
+        return bool(self.max_bytes or self.min_psnr)
+
+    def is_recompression(self) -> bool:
+        """Vrai si le rendu ne fait que réencoder la source (même taille, même format)."""
+        return not self.max_size and not self.format
+
+    def output_format(self, source_format: str) -> str:
+        return self.format or source_format or "PNG"
+
+    def output_name(self, basename: str, source_format: str) -> str:
+        """Nom du fichier produit pour la source `basename`.
+
+        Quand le format change, l'extension d'origine est gardée dans le nom (photo.jpg et
+        photo.png donnent photo_jpg-web.webp et photo_png-web.webp) pour que deux sources de
+        même nom ne produisent pas le même fichier.
+        """
+        stem, extension = basename.rsplit(".", 1) if "." in basename else (basename, "")
+        if self.format and self.format != source_format:
+            if extension:
+                stem = f"{stem}_{extension}"
+            extension = FORMAT_EXTENSIONS.get(self.format, "." + self.format.lower())
+        else:
+            extension = "." + extension if extension else FORMAT_EXTENSIONS.get(self.output_format(source_format), "")
+        return f"{stem}-{self.name}{extension}" if self.name else stem + extension
+
+    def save_options(self, output_format: str, quality: int = None) -> dict:
+        options = {"format": output_format, "quality": quality or self.quality}
+        if output_format == "JPEG":
+            options.update(progressive=self.progressive, optimize=self.optimize)
+        elif output_format == "PNG":
+            options["optimize"] = self.optimize
+        elif output_format == "WEBP":
+            options["method"] = 6 if self.optimize else 4
+        return options
+
+
+def parse_rendition(spec: str, **options) -> Rendition:
+    """Construit un rendu depuis « nom:taille[:format[:qualité]] » (taille 0 : taille d'origine).
+
+    Les autres réglages de Rendition (progressive, max_bytes...) sont passés par `options`.
+
+    Raises:
+        ValueError: Si la description est invalide ou le format non disponible
+    """
+    parts = spec.split(":")
+    if not 2 <= len(parts) <= 4 or not parts[0]:
+        raise ValueError(f"Rendu invalide : {spec!r} (attendu nom:taille[:format[:qualité]])")
+    name, max_size = parts[0], int(parts[1])
+    output_format = parts[2].upper() if len(parts) > 2 and parts[2] else None
+    quality = int(parts[3]) if len(parts) > 3 else 85
+    if output_format and output_format not in available_formats():
+        raise ValueError(f"Format non disponible : {output_format}")
+    if max_size < 0 or not 1 <= quality <= 100:
+        raise ValueError(f"Rendu invalide : {spec!r}")
+    return Rendition(name, max_size or None, output_format, quality, **options)
+
+
+class TransformPipeline:
+    """Produit plusieurs rendus d'une image à partir d'un seul décodage.
+
+    Args:
+        renditions (list): Rendus à produire
+        reducing_gap (float): Marge conservée lors de la réduction au décodage : l'image est
+            décodée à au moins `reducing_gap` fois la taille cible, puis redimensionnée avec un
+            filtre Lanczos (même compromis qualité/vitesse que Image.thumbnail)
+    """
+
+    def __init__(self, renditions: list, reducing_gap: float = 1.5):
+        if not renditions:
+            raise ValueError("Au moins un rendu est nécessaire")
+        names = [(rendition.name, rendition.format) for rendition in renditions]
+        if len(set(names)) != len(names):
+            raise ValueError("Deux rendus produiraient le même fichier (même nom et même format)")
+        self.renditions = list(renditions)
+        self.reducing_gap = reducing_gap
+
+    @property
+    def variant(self) -> str:
+        """Réglages du pipeline tels qu'enregistrés dans le manifeste."""
+        return "|".join(rendition.describe() for rendition in self.renditions)
+
+    def decode_size(self, size: tuple) -> tuple:
+        """Taille minimale à décoder pour servir tous les rendus (None : pleine résolution)."""
+        if any(not rendition.max_size for rendition in self.renditions):
+            return None
+        largest = fit_size(size, max(rendition.max_size for rendition in self.renditions))
+        if largest == tuple(size):
+            return None
+        return (min(size[0], math.ceil(largest[0] * self.reducing_gap)),
+                min(size[1], math.ceil(largest[1] * self.reducing_gap)))
+
+    def decode(self, img: Image.Image) -> Image.Image:
+        """Décode `img` à la plus petite résolution suffisante pour tous les rendus.
+
+        Doit être appelé avant tout accès aux pixels de `img`.
+        """
+        target = self.decode_size(img.size)
+        if target is None:
+            img.load()
+            return img
+        img.draft(None, target)
+        img.load()
+        factor = min(img.size[0] // target[0], img.size[1] // target[1])
+        if factor >= 2:
+            return img.reduce(factor)
+        return img
+
+    @property
+    def adaptive(self) -> bool:
+        return any(rendition.is_adaptive() for rendition in self.renditions)
+
+    def encode(self, img: Image.Image, rendition: Rendition, output_format: str, hint: int = None,
+               stats: dict = None) -> tuple:
+        """Encode `img` pour un rendu, en cherchant la qualité si le rendu est adaptatif.
+
+        Returns:
+            tuple: (io.BytesIO encodé, qualité retenue)
+        """
+        def encode(quality: int) -> io.BytesIO:
+            buffer = io.BytesIO()
+            img.save(buffer, **rendition.save_options(output_format, quality))
+            return buffer
+
+        if not rendition.is_adaptive():
+            return encode(rendition.quality), rendition.quality
+
+        def accept(buffer: io.BytesIO) -> bool:
+            if rendition.max_bytes and buffer.tell() > rendition.max_bytes:
+                return False
+            return not rendition.min_psnr or psnr(img, buffer) >= rendition.min_psnr
+
+        quality, buffer, met, encodes = search_quality(encode, accept, rendition.min_quality, rendition.quality,
+                                                       prefer_high=bool(rendition.max_bytes), hint=hint)
+        if stats is not None:
+            stats["encodes"] = stats.get("encodes", 0) + encodes
+            stats["targets_missed"] = stats.get("targets_missed", 0) + (not met)
+        return buffer, quality
+
+    def render(self, img: Image.Image, stats: dict = None, hints: dict = None):
+        """Décode `img` une fois et encode chaque rendu en mémoire.
+
+        Args:
+            img (Image.Image): Image ouverte et pas encore chargée
+            stats (dict): Si fourni, reçoit 'decode_seconds' et 'encode_seconds' (cumul des
+                rendus), ainsi que 'encodes' et 'targets_missed' pour les rendus adaptatifs
+            hints (dict): Qualités retenues précédemment pour cette image, par rendu
+                (Rendition.describe()), essayées en premier
+
+        Yields:
+            tuple: (Rendition, io.BytesIO encodé, format de sortie, (largeur, hauteur), qualité)
+        """
+        hints = hints or {}
+        source_format, source_size = img.format, img.size
+        start = time.perf_counter()
+        decoded = self.decode(img)
+        if stats is not None:
+            stats["decode_seconds"] = time.perf_counter() - start
+            stats["encode_seconds"] = 0.0
+        for rendition in self.renditions:
+            start = time.perf_counter()
+            output_format = rendition.output_format(source_format)
+            size = fit_size(source_size, rendition.max_size)
+            output = decoded if size == decoded.size else decoded.resize(size, Image.Resampling.LANCZOS)
+            modes = FORMAT_MODES.get(output_format)
+            if modes and output.mode not in modes:
+                output = output.convert("RGBA" if "RGBA" in modes and "A" in output.getbands() else "RGB")
+            buffer, quality = self.encode(output, rendition, output_format, hints.get(rendition.describe()), stats)
+            if stats is not None:
+                stats["encode_seconds"] += time.perf_counter() - start
+            yield rendition, buffer, output_format, size, quality
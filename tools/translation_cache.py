@@ -0,0 +1,193 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from data.db import DB
+
+dossier_actuel = os.path.dirname(__file__)
+dossier_parent = os.path.dirname(dossier_actuel)
+DEFAULT_CACHE_PATH = os.path.join(dossier_parent, 'data', 'translation_cache.sqlite3')
+
+# SQLite limite le nombre de paramètres liés par requête (999 sur les anciennes versions)
+SQL_CHUNK_SIZE = 500
+# Nombre d'insertions entre deux passes d'éviction automatiques
+EVICT_EVERY = 1000
+
+
+def segment_hash(segment: str) -> str:
+    """Empreinte SHA-256 d'un segment, utilisée comme clé de la mémoire de traduction."""
+    return hashlib.sha256(segment.encode('utf-8')).hexdigest()
+
+
+class TranslationCache:
+    """Mémoire de traduction persistante (SQLite) précédée d'un cache LRU en mémoire.
+
+    Les segments sont indexés par (empreinte du contenu, langue cible). Les entrées
+    disque sont évincées par âge (`max_age_days`) puis par ancienneté d'utilisation
+    au-delà de `max_entries`.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, memory_size: int = 10000,
+                 max_entries: int = 1_000_000, max_age_days: float = 90) -> None:
+        self.db_path = db_path
+        self.db = DB(db_path)
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._writes_since_evict = 0
+        self._create_table()
+
+    def _create_table(self) -> None:
+        """Création de la table de la mémoire de traduction si elle n'existe pas déjà."""
+        def create(cursor) -> None:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS translations (
+                    segment_hash TEXT NOT NULL,
+                    target_lang TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (segment_hash, target_lang)
+                )
+            ''')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)')
+
+        if self.db.ensure_schema("translations", create):
+            logging.info("Table 'translations' initialisée avec succès.")
+
+    def _remember(self, key: tuple, translation: str) -> None:
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, segments: list, target_lang: str) -> list:
+        """Cherche les traductions connues d'une liste de segments.
+
+        Args:
+            segments (list): Segments source
+            target_lang (str): Langue cible
+
+        Returns:
+            list: Traductions alignées sur `segments`, None pour un segment inconnu
+        """
+        results = [None] * len(segments)
+        pending = {}
+        with self._lock:
+            for index, segment in enumerate(segments):
+                key = (segment_hash(segment), target_lang)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    results[index] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    pending.setdefault(key[0], []).append(index)
+
+        if not pending:
+            return results
+
+        found = {}
+        hashes = list(pending)
+        now = time.time()
+        with self.db.db_connect() as cursor:
+            for i in range(0, len(hashes), SQL_CHUNK_SIZE):
+                chunk = hashes[i:i + SQL_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                cursor.execute(
+                    f"SELECT segment_hash, translation FROM translations "
+                    f"WHERE target_lang = ? AND segment_hash IN ({placeholders})",
+                    (target_lang, *chunk)
+                )
+                found.update(cursor.fetchall())
+            if found:
+                cursor.executemany(
+                    "UPDATE translations SET last_used = ? WHERE segment_hash = ? AND target_lang = ?",
+                    [(now, digest, target_lang) for digest in found]
+                )
+
+        with self._lock:
+            for digest, indices in pending.items():
+                if digest in found:
+                    self._remember((digest, target_lang), found[digest])
+                    for index in indices:
+                        results[index] = found[digest]
+                    self.disk_hits += len(indices)
+                else:
+                    self.misses += len(indices)
+        return results
+
+    def put_many(self, pairs: list, target_lang: str) -> None:
+        """Enregistre des couples (segment, traduction) pour une langue cible."""
+        if not pairs:
+            return
+        now = time.time()
+        rows = []
+        with self._lock:
+            for segment, translation in pairs:
+                digest = segment_hash(segment)
+                self._remember((digest, target_lang), translation)
+                rows.append((digest, target_lang, translation, now, now))
+        with self.db.db_connect() as cursor:
+            cursor.executemany('''
+                INSERT OR REPLACE INTO translations (segment_hash, target_lang, translation, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+
+        # Un seul des workers qui franchissent le seuil en même temps lance l'éviction
+        with self._lock:
+            self._writes_since_evict += len(rows)
+            evict_due = self._writes_since_evict >= EVICT_EVERY
+            if evict_due:
+                self._writes_since_evict = 0
+        if evict_due:
+            self.evict()
+
+    def evict(self) -> int:
+        """Supprime les entrées trop anciennes puis les moins récemment utilisées au-delà de `max_entries`.
+
+        Returns:
+            int: Nombre d'entrées supprimées du disque
+        """
+        removed = 0
+        with self.db.db_connect() as cursor:
+            if self.max_age_days is not None:
+                cursor.execute("DELETE FROM translations WHERE last_used < ?",
+                               (time.time() - self.max_age_days * 86400,))
+                removed += cursor.rowcount
+            cursor.execute("SELECT COUNT(*) FROM translations")
+            overflow = cursor.fetchone()[0] - self.max_entries
+            if overflow > 0:
+                cursor.execute('''
+                    DELETE FROM translations WHERE rowid IN (
+                        SELECT rowid FROM translations ORDER BY last_used LIMIT ?
+                    )
+                ''', (overflow,))
+                removed += cursor.rowcount
+        if removed:
+            logging.info(f"Mémoire de traduction : {removed} entrée(s) évincée(s).")
+        return removed
+
+    def clear_memory(self) -> None:
+        """Vide le cache LRU en mémoire (le cache disque est conservé)."""
+        with self._lock:
+            self._memory.clear()
+
+    def stats(self) -> dict:
+        """Compteurs de succès/échecs du cache depuis sa création."""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }